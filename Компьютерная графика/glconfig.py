@@ -0,0 +1,41 @@
+# Настройки PyOpenGL, которые действуют только если заданы до первого
+# импорта OpenGL.GL, поэтому лабы импортируют этот модуль раньше OpenGL.
+#
+# По умолчанию PyOpenGL после каждого вызова GL вызывает glGetError и
+# оборачивает вызовы в логирование — удобно при отладке, но это заметная
+# часть стоимости каждого glVertex/glUniform из Python. Режим production
+# (переменная окружения LABS_GL_PRODUCTION=1 или ключ --production) это
+# отключает.
+#
+# startup.py запускает лабы с LABS_STARTUP_PROBE=1: first_frame() в конце
+# display() печатает время от запуска процесса до первого кадра и завершает
+# процесс.
+
+import json
+import os
+import sys
+import time
+
+import OpenGL
+
+production = os.environ.get("LABS_GL_PRODUCTION", "") not in ("", "0") or "--production" in sys.argv
+if "--production" in sys.argv:
+    sys.argv.remove("--production")
+
+if production:
+    if "OpenGL.GL" in sys.modules:
+        print("glconfig: OpenGL.GL уже импортирован, режим production не подействует", file=sys.stderr)
+    OpenGL.ERROR_CHECKING = False
+    OpenGL.ERROR_LOGGING = False
+
+_probe = os.environ.get("LABS_STARTUP_PROBE", "") not in ("", "0")
+
+
+def first_frame():
+    """Вызывается после glutSwapBuffers(); в режиме замера — отчёт и выход"""
+    if not _probe:
+        return
+    t0 = float(os.environ.get("LABS_STARTUP_T0", "nan"))
+    print("STARTUP " + json.dumps({"first_frame_s": time.time() - t0, "production": production,
+                                   "pil_loaded": "PIL" in sys.modules}), flush=True)
+    os._exit(0)
@@ -0,0 +1,171 @@
+# Вывод текста поверх сцены через атлас глифов.
+#
+# Вместо glutBitmapCharacter на каждый символ каждой строки каждого кадра
+# шрифт GLUT один раз растеризуется в текстуру-атлас (через FBO), а все
+# строки кадра собираются в один массив четырёхугольников и рисуются одним
+# glDrawArrays. Вершины строки кэшируются по (x, y, текст, цвет, шрифт),
+# поэтому неизменившиеся строки между кадрами не пересчитываются.
+#
+# Использование в display():
+#     hud.text(20, 40, "Press 'H' for help")
+#     ...
+#     hud.flush(window_width, window_height)
+
+from OpenGL.GL import *
+from OpenGL.GLU import *
+from OpenGL.GLUT import *
+import numpy as np
+
+FIRST_CHAR, LAST_CHAR = 32, 127
+ATLAS_COLS = 16
+PAD = 2
+MAX_CACHED_STRINGS = 1024
+
+# Метрики шрифтов GLUT: (высота строки, спуск ниже базовой линии)
+FONTS = {
+    "helvetica12": (GLUT_BITMAP_HELVETICA_12, 15, 4),
+    "helvetica18": (GLUT_BITMAP_HELVETICA_18, 22, 5),
+}
+
+_atlases = {}
+_string_cache = {}
+_queue = []
+_frame_keys = None
+_frame_arrays = None
+
+
+# -------------------- Atlas --------------------
+def build_atlas(font_name):
+    """Растеризация печатных ASCII-символов шрифта GLUT в текстуру (один раз)"""
+    font, line_height, descent = FONTS[font_name]
+    advances = np.array([glutBitmapWidth(font, c) for c in range(FIRST_CHAR, LAST_CHAR)], dtype=np.float32)
+    cell_w = int(advances.max()) + 2 * PAD
+    cell_h = line_height + 2 * PAD
+    rows = (LAST_CHAR - FIRST_CHAR + ATLAS_COLS - 1) // ATLAS_COLS
+    width, height = ATLAS_COLS * cell_w, rows * cell_h
+
+    tex = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, tex)
+    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA8, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+    glBindTexture(GL_TEXTURE_2D, 0)
+
+    fbo = glGenFramebuffers(1)
+    prev_fbo = glGetIntegerv(GL_FRAMEBUFFER_BINDING)
+    glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+    glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, tex, 0)
+
+    glPushAttrib(GL_ALL_ATTRIB_BITS)
+    glUseProgram(0)
+    glDisable(GL_DEPTH_TEST); glDisable(GL_LIGHTING); glDisable(GL_TEXTURE_2D); glDisable(GL_BLEND)
+    glViewport(0, 0, width, height)
+    glClearColor(0.0, 0.0, 0.0, 0.0)
+    glClear(GL_COLOR_BUFFER_BIT)
+    glMatrixMode(GL_PROJECTION); glPushMatrix(); glLoadIdentity(); gluOrtho2D(0, width, 0, height)
+    glMatrixMode(GL_MODELVIEW); glPushMatrix(); glLoadIdentity()
+
+    glColor4f(1.0, 1.0, 1.0, 1.0)
+    for k, c in enumerate(range(FIRST_CHAR, LAST_CHAR)):
+        col, row = k % ATLAS_COLS, k // ATLAS_COLS
+        glRasterPos2i(col * cell_w + PAD, row * cell_h + PAD + descent)
+        glutBitmapCharacter(font, c)
+
+    glPopMatrix(); glMatrixMode(GL_PROJECTION); glPopMatrix(); glMatrixMode(GL_MODELVIEW)
+    glPopAttrib()
+    glBindFramebuffer(GL_FRAMEBUFFER, prev_fbo)
+    glDeleteFramebuffers(1, [fbo])
+
+    k = np.arange(LAST_CHAR - FIRST_CHAR)
+    u0 = (k % ATLAS_COLS) * cell_w + PAD
+    v0 = (k // ATLAS_COLS) * cell_h + PAD
+    return {
+        "texture": tex,
+        "advances": advances,
+        "line_height": line_height,
+        "descent": descent,
+        # Прямоугольник глифа в текстурных координатах: (u0, v0, u1, v1)
+        "uv": np.stack([u0 / width, v0 / height, (u0 + advances) / width, (v0 + line_height) / height], axis=1),
+    }
+
+
+def _atlas(font_name):
+    if font_name not in _atlases:
+        _atlases[font_name] = build_atlas(font_name)
+    return _atlases[font_name]
+
+
+# -------------------- Layout --------------------
+def layout(atlas, x, y, text, color):
+    """Вершины строки: (pos (N, 2), uv (N, 2), color (N, 3)) для GL_QUADS"""
+    codes = np.frombuffer(text.encode("ascii", "replace"), dtype=np.uint8).astype(np.int64)
+    codes = np.where((codes >= FIRST_CHAR) & (codes < LAST_CHAR), codes, ord("?")) - FIRST_CHAR
+    if codes.size == 0:
+        empty = np.zeros((0, 2), dtype=np.float32)
+        return empty, empty, np.zeros((0, 3), dtype=np.float32)
+    adv = atlas["advances"][codes]
+    x0 = x + np.concatenate([[0.0], np.cumsum(adv)[:-1]])
+    x1 = x0 + adv
+    y0 = np.full_like(x0, y - atlas["descent"])
+    y1 = y0 + atlas["line_height"]
+    u0, v0, u1, v1 = atlas["uv"][codes].T
+
+    pos = np.stack([x0, y0, x1, y0, x1, y1, x0, y1], axis=1).reshape(-1, 2)
+    uv = np.stack([u0, v0, u1, v0, u1, v1, u0, v1], axis=1).reshape(-1, 2)
+    col = np.broadcast_to(np.asarray(color, dtype=np.float32), (len(pos), 3))
+    return pos.astype(np.float32), uv.astype(np.float32), col
+
+
+# -------------------- Frame API --------------------
+def text(x, y, string, color=(1.0, 1.0, 1.0), font="helvetica12"):
+    """Добавить строку в очередь текущего кадра"""
+    _queue.append((float(x), float(y), string, tuple(color), font))
+
+
+def flush(window_width, window_height):
+    """Нарисовать все строки кадра одним вызовом на шрифт и очистить очередь"""
+    global _queue, _frame_keys, _frame_arrays
+    if not _queue:
+        return
+    keys, _queue = _queue, []
+
+    # Тот же набор строк, что и в прошлом кадре, — массивы не пересобираются
+    if keys != _frame_keys:
+        if len(_string_cache) > MAX_CACHED_STRINGS:
+            _string_cache.clear()
+        by_font = {}
+        for key in keys:
+            if key not in _string_cache:
+                x, y, string, color, font = key
+                _string_cache[key] = layout(_atlas(font), x, y, string, color)
+            by_font.setdefault(key[4], []).append(_string_cache[key])
+        _frame_arrays = {font: tuple(np.ascontiguousarray(np.concatenate(parts)) for parts in zip(*items))
+                         for font, items in by_font.items()}
+        _frame_keys = keys
+
+    glPushAttrib(GL_ENABLE_BIT | GL_TEXTURE_BIT | GL_COLOR_BUFFER_BIT)
+    glUseProgram(0)
+    glDisable(GL_DEPTH_TEST); glDisable(GL_LIGHTING); glDisable(GL_CULL_FACE)
+    glEnable(GL_TEXTURE_2D)
+    glEnable(GL_BLEND); glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+    glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE)
+
+    glMatrixMode(GL_PROJECTION); glPushMatrix(); glLoadIdentity(); gluOrtho2D(0, window_width, 0, window_height)
+    glMatrixMode(GL_MODELVIEW); glPushMatrix(); glLoadIdentity()
+
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+    glEnableClientState(GL_COLOR_ARRAY)
+    for font, (pos, uv, col) in _frame_arrays.items():
+        glBindTexture(GL_TEXTURE_2D, _atlas(font)["texture"])
+        glVertexPointer(2, GL_FLOAT, 0, pos)
+        glTexCoordPointer(2, GL_FLOAT, 0, uv)
+        glColorPointer(3, GL_FLOAT, 0, col)
+        glDrawArrays(GL_QUADS, 0, len(pos))
+    glDisableClientState(GL_COLOR_ARRAY)
+    glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+    glBindTexture(GL_TEXTURE_2D, 0)
+
+    glPopMatrix(); glMatrixMode(GL_PROJECTION); glPopMatrix(); glMatrixMode(GL_MODELVIEW)
+    glPopAttrib()
@@ -0,0 +1,306 @@
+# Инстансный рендеринг (glDrawElementsInstanced) и стресс-сцена для лаб 2/3.
+#
+# Сетка загружается в VBO/IBO один раз, а трансформация и материал каждого
+# экземпляра (цвет, specular, shininess) берутся из структурированного
+# массива NumPy (INSTANCE_DTYPE), переданного в буфер с
+# glVertexAttribDivisor = 1. Один вызов рисует все экземпляры, поэтому
+# накладные расходы Python не зависят от их числа.
+#
+# Запуск как скрипт — сравнение FPS инстансного пути с наивным циклом
+# (glPushMatrix / glutSolid* на каждый объект). На машинах без GPU:
+#     LIBGL_ALWAYS_SOFTWARE=1 python instancing.py --counts 100,1000,10000
+
+import argparse
+import csv
+import ctypes
+import sys
+import time
+
+from OpenGL.GL import *
+from OpenGL.GLU import *
+from OpenGL.GLUT import *
+import numpy as np
+
+import meshes
+import scene
+from shaders import link_program
+
+# Матрица модели хранится транспонированной (по столбцам), как ждёт mat4-атрибут
+INSTANCE_DTYPE = np.dtype([("model", np.float32, (4, 4)), ("color", np.float32, 4),
+                           ("specular", np.float32, 3), ("shininess", np.float32)])
+# Атрибуты с glVertexAttribDivisor = 1: (имя в шейдере, поле, число float на столбец, столбцов)
+INSTANCE_ATTRIBS = (("aModel", "model", 4, 4), ("aColor", "color", 4, 1),
+                    ("aSpecular", "specular", 3, 1), ("aShininess", "shininess", 1, 1))
+SHININESS_LEVELS = (5.0, 30.0, 128.0)   # матовый / стекло / полированный, как в лабах
+
+TORUS_ARGS = (0.3, 0.8, 12, 18)
+TEAPOT_SIZE = 0.6
+
+vs_instanced = """
+#version 130
+uniform mat4 uViewProj;
+
+in vec3 aPosition;
+in vec3 aNormal;
+in mat4 aModel;
+in vec4 aColor;
+in vec3 aSpecular;
+in float aShininess;
+
+out vec3 vNormal;
+out vec3 vPos;
+out vec4 vColor;
+out vec3 vSpecular;
+out float vShininess;
+
+void main() {
+    vec4 world = aModel * vec4(aPosition, 1.0);
+    vPos = world.xyz;
+    vNormal = mat3(aModel) * aNormal;
+    vColor = aColor;
+    vSpecular = aSpecular;
+    vShininess = aShininess;
+    gl_Position = uViewProj * world;
+}
+"""
+
+fs_instanced = """
+#version 130
+uniform vec3 uLightPos;
+uniform vec3 uLightColor;
+uniform vec3 uEyePos;
+
+in vec3 vNormal;
+in vec3 vPos;
+in vec4 vColor;
+in vec3 vSpecular;
+in float vShininess;
+
+void main() {
+    vec3 V = normalize(uEyePos - vPos);
+    vec3 N = normalize(vNormal);
+    N = dot(N, V) < 0.0 ? -N : N;
+    vec3 L = normalize(uLightPos - vPos);
+    float d = max(dot(N, L), 0.0);
+    float s = d > 0.0 ? pow(max(dot(N, normalize(L + V)), 0.0), vShininess) : 0.0;
+    vec3 rgb = vColor.rgb * (0.25 + 0.75 * d) + vSpecular * s;
+    gl_FragColor = vec4(rgb * uLightColor, vColor.a);
+}
+"""
+
+prog_instanced = None
+
+
+# -------------------- Instances --------------------
+def grid_instances(count, spacing=3.0, seed=0):
+    """Экземпляры на кубической решётке со случайным поворотом вокруг Y, цветом и материалом"""
+    rng = np.random.default_rng(seed)
+    side = int(np.ceil(count ** (1.0 / 3.0)))
+    idx = np.arange(count)
+    pos = np.stack([idx % side, (idx // side) % side, idx // (side * side)], axis=1).astype(np.float32)
+    pos = (pos - (side - 1) / 2.0) * spacing
+
+    angle = rng.uniform(0.0, 2.0 * np.pi, count).astype(np.float32)
+    scale = rng.uniform(0.7, 1.3, count).astype(np.float32)
+    c, s = np.cos(angle) * scale, np.sin(angle) * scale
+
+    inst = np.zeros(count, dtype=INSTANCE_DTYPE)
+    m = inst["model"]                    # m[i][column][row]
+    m[:, 0, 0], m[:, 0, 2] = c, -s
+    m[:, 1, 1] = scale
+    m[:, 2, 0], m[:, 2, 2] = s, c
+    m[:, 3, :3] = pos
+    m[:, 3, 3] = 1.0
+    inst["color"][:, :3] = rng.uniform(0.2, 1.0, (count, 3))
+    inst["color"][:, 3] = 1.0
+    inst["shininess"] = rng.choice(SHININESS_LEVELS, count)
+    inst["specular"] = (inst["shininess"] / SHININESS_LEVELS[-1])[:, None]   # блеск ярче у гладких
+    return inst
+
+
+# -------------------- GPU buffers --------------------
+def upload_batch(mesh, instances):
+    """Загрузка сетки и массива экземпляров в буферы; возвращает описание батча"""
+    instances = np.ascontiguousarray(instances)
+    vertices = np.ascontiguousarray(np.hstack([mesh["positions"], mesh["normals"]]), dtype=np.float32)
+    vbo, ibo, inst_buf = glGenBuffers(3)
+    glBindBuffer(GL_ARRAY_BUFFER, vbo)
+    glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ibo)
+    glBufferData(GL_ELEMENT_ARRAY_BUFFER, mesh["indices"].nbytes, mesh["indices"], GL_STATIC_DRAW)
+    glBindBuffer(GL_ARRAY_BUFFER, inst_buf)
+    glBufferData(GL_ARRAY_BUFFER, instances.nbytes, instances, GL_DYNAMIC_DRAW)
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
+    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+    return {"vbo": vbo, "ibo": ibo, "instances": inst_buf,
+            "index_count": len(mesh["indices"]), "instance_count": len(instances)}
+
+
+def update_instances(batch, instances):
+    """Перезапись массива экземпляров (например, при смене их числа)"""
+    instances = np.ascontiguousarray(instances)
+    glBindBuffer(GL_ARRAY_BUFFER, batch["instances"])
+    glBufferData(GL_ARRAY_BUFFER, instances.nbytes, instances, GL_DYNAMIC_DRAW)
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
+    batch["instance_count"] = len(instances)
+
+
+def init_instancing():
+    global prog_instanced
+    if prog_instanced is None:
+        prog_instanced = link_program(vs_instanced, fs_instanced)
+
+
+def eye_position(view_proj):
+    """Положение камеры по матрице вида-проекции: точка, которую перспектива переводит в w = 0 при x = y = 0"""
+    eye = np.linalg.solve(np.asarray(view_proj, dtype=np.float64), [0.0, 0.0, 1.0, 0.0])
+    return eye[:3] / eye[3]
+
+
+def draw_batches(batches, view_proj, light_pos, light_color=(1.0, 1.0, 1.0), program=None):
+    """Один glDrawElementsInstanced на батч (program — вариант шейдера с теми же атрибутами)"""
+    init_instancing()
+    p = prog_instanced if program is None else program
+    glUseProgram(p)
+    glUniformMatrix4fv(glGetUniformLocation(p, "uViewProj"), 1, GL_TRUE, np.asarray(view_proj, dtype=np.float32))
+    glUniform3f(glGetUniformLocation(p, "uLightPos"), *light_pos)
+    glUniform3f(glGetUniformLocation(p, "uLightColor"), *light_color)
+    glUniform3f(glGetUniformLocation(p, "uEyePos"), *eye_position(view_proj))
+
+    a_pos = glGetAttribLocation(p, "aPosition")
+    a_norm = glGetAttribLocation(p, "aNormal")
+    # (location, float на столбец, смещение в байтах) для каждого столбца каждого атрибута
+    per_instance = []
+    for name, field, size, columns in INSTANCE_ATTRIBS:
+        loc, offset = glGetAttribLocation(p, name), INSTANCE_DTYPE.fields[field][1]
+        per_instance += [(loc + i, size, offset + 4 * size * i) for i in range(columns)]
+
+    for batch in batches:
+        glBindBuffer(GL_ARRAY_BUFFER, batch["vbo"])
+        glEnableVertexAttribArray(a_pos)
+        glVertexAttribPointer(a_pos, 3, GL_FLOAT, GL_FALSE, 24, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(a_norm)
+        glVertexAttribPointer(a_norm, 3, GL_FLOAT, GL_FALSE, 24, ctypes.c_void_p(12))
+
+        glBindBuffer(GL_ARRAY_BUFFER, batch["instances"])
+        stride = INSTANCE_DTYPE.itemsize
+        for loc, size, offset in per_instance:
+            glEnableVertexAttribArray(loc)
+            glVertexAttribPointer(loc, size, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(offset))
+            glVertexAttribDivisor(loc, 1)
+
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, batch["ibo"])
+        glDrawElementsInstanced(GL_TRIANGLES, batch["index_count"], GL_UNSIGNED_INT, None, batch["instance_count"])
+
+        for loc, _, _ in per_instance:
+            glVertexAttribDivisor(loc, 0)
+            glDisableVertexAttribArray(loc)
+        glDisableVertexAttribArray(a_pos)
+        glDisableVertexAttribArray(a_norm)
+
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
+    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+    glUseProgram(0)
+
+
+def draw_naive(instances, draw, *args):
+    """Эталон для сравнения: отдельный вызов GLUT на каждый объект, как в лабораторных"""
+    for inst in instances:
+        glPushMatrix()
+        glMultMatrixf(inst["model"])
+        glColor4fv(inst["color"])
+        glMaterialfv(GL_FRONT_AND_BACK, GL_SPECULAR, [*inst["specular"], 1.0])
+        glMaterialf(GL_FRONT_AND_BACK, GL_SHININESS, float(inst["shininess"]))
+        draw(*args)
+        glPopMatrix()
+
+
+# -------------------- Stress scene --------------------
+def stress_scene(count, seed=0):
+    """Половина торов, половина чайников; возвращает (батчи, (торы, чайники))"""
+    inst = grid_instances(count, seed=seed)
+    tori, teapots = np.ascontiguousarray(inst[0::2]), np.ascontiguousarray(inst[1::2])
+    batches = [upload_batch(meshes.torus(*TORUS_ARGS), tori),
+               upload_batch(meshes.teapot(TEAPOT_SIZE), teapots)]
+    return batches, (tori, teapots)
+
+
+def _setup_view(count, width, height):
+    extent = 3.0 * np.ceil(count ** (1.0 / 3.0))
+    glViewport(0, 0, width, height)
+    glMatrixMode(GL_PROJECTION); glLoadIdentity()
+    gluPerspective(45.0, width / float(height), 0.5, 6.0 * extent)
+    glMatrixMode(GL_MODELVIEW); glLoadIdentity()
+    eye = (1.2 * extent, 0.8 * extent, 1.6 * extent)
+    gluLookAt(*eye, 0, 0, 0, 0, 1, 0)
+    return scene.current_view_projection(), eye
+
+
+def _measure(frames, draw_frame):
+    draw_frame()
+    glFinish()
+    start = time.perf_counter()
+    for _ in range(frames):
+        draw_frame()
+        glutSwapBuffers()
+    glFinish()
+    return frames / (time.perf_counter() - start)
+
+
+def benchmark(counts, frames, width=800, height=600):
+    """FPS инстансного и наивного пути для каждого числа объектов"""
+    glEnable(GL_DEPTH_TEST)
+    glEnable(GL_LIGHTING); glEnable(GL_LIGHT0); glEnable(GL_COLOR_MATERIAL)
+    rows = []
+    for count in counts:
+        batches, (tori, teapots) = stress_scene(count)
+        view_proj, eye = _setup_view(count, width, height)
+        glLightfv(GL_LIGHT0, GL_POSITION, [*eye, 1.0])
+
+        def instanced():
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            draw_batches(batches, view_proj, eye)
+
+        def naive():
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            draw_naive(tori, glutSolidTorus, *TORUS_ARGS)
+            draw_naive(teapots, glutSolidTeapot, TEAPOT_SIZE)
+
+        fps_inst = _measure(frames, instanced)
+        fps_naive = _measure(max(1, frames // 5), naive)
+        rows.append({"instances": count, "instanced_fps": round(fps_inst, 2),
+                     "naive_fps": round(fps_naive, 2), "speedup": round(fps_inst / fps_naive, 2)})
+        print(f"{count:>7} | {fps_inst:>13.1f} | {fps_naive:>9.1f} | x{fps_inst / fps_naive:.1f}")
+
+        for b in batches:
+            glDeleteBuffers(3, [b["vbo"], b["ibo"], b["instances"]])
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FPS: glDrawElementsInstanced против цикла по объектам")
+    parser.add_argument("--counts", default="100,1000,5000,10000")
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--csv", default="instancing_report.csv")
+    args = parser.parse_args()
+
+    glutInit(sys.argv)
+    glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH)
+    glutInitWindowSize(800, 600)
+    glutCreateWindow(b"Instancing benchmark")
+
+    print("=" * 60)
+    print(f"GL_RENDERER: {glGetString(GL_RENDERER).decode()}")
+    print(f"{'объектов':>7} | {'instanced FPS':>13} | {'naive FPS':>9} | ускорение")
+    print("=" * 60)
+    rows = benchmark([int(c) for c in args.counts.split(",")], args.frames)
+
+    with open(args.csv, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"✓ Отчёт сохранён: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
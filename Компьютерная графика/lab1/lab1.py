@@ -1,9 +1,17 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import glconfig  # до первого импорта OpenGL (режим проверки ошибок PyOpenGL)
+
 from OpenGL.GL import *
 from OpenGL.GLU import *
 from OpenGL.GLUT import *
-import sys
-import numpy as np
-from PIL import Image
+
+import hud
+import profiler
+import scheduler
+import scene
 
 window_width = 1200
 window_height = 800
@@ -17,6 +25,67 @@ rotation_x = 30.0
 rotation_y = 45.0
 zoom = 1.0
 
+# Описание сцен для четырёх заданий (каркасные объекты, цвет вместо материала)
+COLORS = {
+    "blue":   {"color": (0.0, 0.0, 1.0)},
+    "red":    {"color": (1.0, 0.0, 0.0)},
+    "green":  {"color": (0.0, 0.5, 0.0)},
+    "purple": {"color": (0.5, 0.0, 0.5)},
+    "orange": {"color": (1.0, 0.5, 0.0)},
+}
+
+TASK_SCENES = {
+    1: {
+        "title": "TASK 1: Icosahedron and Cone",
+        "camera": {"distance": 10.0},
+        "materials": COLORS,
+        "objects": [
+            # Икосаэдр слева, конус справа
+            {"mesh": "icosahedron", "wire": True, "material": "blue",
+             "translate": (-2.5, 0.0, 0.0), "scale": (1.5, 1.5, 1.5)},
+            {"mesh": "cone", "wire": True, "args": (1.2, 2.5, 20, 20), "material": "red",
+             "translate": (2.5, 0.0, 0.0)},
+        ],
+    },
+    2: {
+        "title": "TASK 2: Rotated Cone (-60 X) and Shifted Icosahedron (Z+3)",
+        "camera": {"distance": 10.0},
+        "materials": COLORS,
+        "objects": [
+            # Икосаэдр со сдвигом по Z на 3.0, конус с поворотом на -60° вокруг оси X
+            {"mesh": "icosahedron", "wire": True, "material": "blue",
+             "translate": (-2.5, 0.0, 3.0), "scale": (1.5, 1.5, 1.5)},
+            {"mesh": "cone", "wire": True, "args": (1.2, 2.5, 20, 20), "material": "red",
+             "translate": (2.5, 0.0, 0.0), "rotate": (-60.0, 1.0, 0.0, 0.0)},
+        ],
+    },
+    3: {
+        "title": "TASK 3: Teapot and Torus",
+        "camera": {"distance": 10.0},
+        "materials": COLORS,
+        "objects": [
+            # Чайник слева, тор справа
+            {"mesh": "teapot", "wire": True, "args": (1.2,), "material": "green",
+             "translate": (-2.5, -0.5, 0.0)},
+            {"mesh": "torus", "wire": True, "args": (0.5, 1.5, 20, 30), "material": "purple",
+             "translate": (2.5, 0.0, 0.0)},
+        ],
+    },
+    4: {
+        "title": "TASK 4: Teapot and Scaled Torus (scale 0.5)",
+        "camera": {"distance": 10.0},
+        "materials": COLORS,
+        "objects": [
+            # Чайник без изменений, тор с масштабированием 0.5
+            {"mesh": "teapot", "wire": True, "args": (1.2,), "material": "green",
+             "translate": (-2.5, -0.5, 0.0)},
+            {"mesh": "torus", "wire": True, "args": (0.5, 1.5, 20, 30), "material": "orange",
+             "translate": (2.5, 0.0, 0.0), "scale": (0.5, 0.5, 0.5)},
+        ],
+    },
+}
+task_scenes = {}
+
 def init_opengl():
     """Инициализация параметров OpenGL"""
     glClearColor(1.0, 1.0, 1.0, 1.0)
@@ -26,6 +95,9 @@ def init_opengl():
     gluPerspective(45, window_width / window_height, 0.1, 50.0)
     glMatrixMode(GL_MODELVIEW)
 
+    for task, description in TASK_SCENES.items():
+        task_scenes[task] = scene.load_scene(description)
+
 def draw_axes():
     """Отрисовка осей координат X, Y, Z"""
     glLineWidth(2.0)
@@ -52,30 +124,11 @@ def draw_axes():
     glEnd()
 
 def draw_text(x, y, text):
-    glDisable(GL_DEPTH_TEST)
-
-    glMatrixMode(GL_PROJECTION)
-    glPushMatrix()
-    glLoadIdentity()
-    gluOrtho2D(0, window_width, 0, window_height)
-
-    glMatrixMode(GL_MODELVIEW)
-    glPushMatrix()
-    glLoadIdentity()
-
-    glColor3f(0.0, 0.0, 0.0)
-    glRasterPos2f(x, y)
-    for char in text:
-        glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18, ord(char))
-
-    glPopMatrix()
-    glMatrixMode(GL_PROJECTION)
-    glPopMatrix()
-
-    glMatrixMode(GL_MODELVIEW)
-    glEnable(GL_DEPTH_TEST)
+    """Текст на экране (выводится вместе с остальным HUD в hud.flush)"""
+    hud.text(x, y, text, color=(0.0, 0.0, 0.0), font="helvetica18")
 
 def save_screenshot(filename):
+    from PIL import Image  # только когда действительно сохраняем кадр
     glReadBuffer(GL_FRONT)
     pixels = glReadPixels(0, 0, window_width, window_height, GL_RGB, GL_UNSIGNED_BYTE)
     image = Image.frombytes("RGB", (window_width, window_height), pixels)
@@ -85,166 +138,45 @@ def save_screenshot(filename):
 
 def apply_camera_rotation():
     """Применение вращения камеры на основе позиции мыши"""
-    distance = 10.0 * zoom
-
-    rot_x_rad = np.radians(rotation_x)
-    rot_y_rad = np.radians(rotation_y)
-
-    cam_x = distance * np.sin(rot_y_rad) * np.cos(rot_x_rad)
-    cam_y = distance * np.sin(rot_x_rad)
-    cam_z = distance * np.cos(rot_y_rad) * np.cos(rot_x_rad)
-
-    return cam_x, cam_y, cam_z
-
-def display_task_1():
-    """ЗАДАНИЕ 1: Каркасный икосаэдр и каркасный конус на одной плоскости"""
-    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-    glLoadIdentity()
-
-    cam_x, cam_y, cam_z = apply_camera_rotation()
-    gluLookAt(cam_x, cam_y, cam_z, 0, 0, 0, 0, 1, 0)
-
-    draw_axes()
-
-    # Икосаэдр слева
-    glPushMatrix()
-    glTranslatef(-2.5, 0.0, 0.0)
-    glColor3f(0.0, 0.0, 1.0)
-    glScalef(1.5, 1.5, 1.5)
-    glutWireIcosahedron()
-    glPopMatrix()
-
-    # Конус справа
-    glPushMatrix()
-    glTranslatef(2.5, 0.0, 0.0)
-    glColor3f(1.0, 0.0, 0.0)
-    glutWireCone(1.2, 2.5, 20, 20)
-    glPopMatrix()
-
-    draw_text(20, window_height - 30, "TASK 1: Icosahedron and Cone")
-
-    glutSwapBuffers()
-
-    global screenshot_taken
-    if not screenshot_taken[0]:
-        save_screenshot("zadanie_1_opengl.png")
-        screenshot_taken[0] = True
-
-def display_task_2():
-    """ЗАДАНИЕ 2: Поворот конуса на -60° вокруг оси X, сдвиг икосаэдра по Z"""
-    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-    glLoadIdentity()
-
-    cam_x, cam_y, cam_z = apply_camera_rotation()
-    gluLookAt(cam_x, cam_y, cam_z, 0, 0, 0, 0, 1, 0)
-
-    draw_axes()
+    distance = TASK_SCENES[current_task]["camera"]["distance"] * zoom
+    return scene.orbit_eye(distance, rotation_x, rotation_y)
 
-    # Икосаэдр со сдвигом по Z
-    glPushMatrix()
-    glTranslatef(-2.5, 0.0, 3.0)  # Сдвиг по Z на 3.0
-    glColor3f(0.0, 0.0, 1.0)
-    glScalef(1.5, 1.5, 1.5)
-    glutWireIcosahedron()
-    glPopMatrix()
-
-    # Конус с поворотом на -60° вокруг оси X
-    glPushMatrix()
-    glTranslatef(2.5, 0.0, 0.0)
-    glRotatef(-60.0, 1.0, 0.0, 0.0)  # Поворот на -60° вокруг оси X
-    glColor3f(1.0, 0.0, 0.0)
-    glutWireCone(1.2, 2.5, 20, 20)
-    glPopMatrix()
-
-    draw_text(20, window_height - 30, "TASK 2: Rotated Cone (-60 X) and Shifted Icosahedron (Z+3)")
-
-    glutSwapBuffers()
-
-    global screenshot_taken
-    if not screenshot_taken[1]:
-        save_screenshot("zadanie_2_opengl.png")
-        screenshot_taken[1] = True
-
-def display_task_3():
-    """ЗАДАНИЕ 3: Каркасный чайник и каркасный тор на одной плоскости"""
+def display_task(task):
+    """Отрисовка сцены задания: камера и оси общие, объекты из описания сцены"""
+    profiler.begin_frame()
     glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
     glLoadIdentity()
 
     cam_x, cam_y, cam_z = apply_camera_rotation()
     gluLookAt(cam_x, cam_y, cam_z, 0, 0, 0, 0, 1, 0)
 
-    draw_axes()
-
-    # Чайник слева
-    glPushMatrix()
-    glTranslatef(-2.5, -0.5, 0.0)
-    glColor3f(0.0, 0.5, 0.0)
-    glutWireTeapot(1.2)
-    glPopMatrix()
-
-    # Тор справа
-    glPushMatrix()
-    glTranslatef(2.5, 0.0, 0.0)
-    glColor3f(0.5, 0.0, 0.5)
-    glutWireTorus(0.5, 1.5, 20, 30)
-    glPopMatrix()
+    with profiler.section("scene"):
+        draw_axes()
+        scene.render(task_scenes[task], scene.current_view_projection(), (cam_x, cam_y, cam_z),
+                     bind_material=lambda m: glColor3f(*m["color"]))
 
-    draw_text(20, window_height - 30, "TASK 3: Teapot and Torus")
+    with profiler.section("text"):
+        draw_text(20, window_height - 30, TASK_SCENES[task]["title"])
+        profiler.draw_overlay(window_width, window_height)
+        hud.flush(window_width, window_height)
 
     glutSwapBuffers()
-
-    global screenshot_taken
-    if not screenshot_taken[2]:
-        save_screenshot("zadanie_3_opengl.png")
-        screenshot_taken[2] = True
-
-def display_task_4():
-    """ЗАДАНИЕ 4: Чайник и тор с коэффициентом масштабирования 0.5"""
-    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-    glLoadIdentity()
-
-    cam_x, cam_y, cam_z = apply_camera_rotation()
-    gluLookAt(cam_x, cam_y, cam_z, 0, 0, 0, 0, 1, 0)
-
-    draw_axes()
-
-    # Чайник слева (без изменений)
-    glPushMatrix()
-    glTranslatef(-2.5, -0.5, 0.0)
-    glColor3f(0.0, 0.5, 0.0)
-    glutWireTeapot(1.2)
-    glPopMatrix()
-
-    # Тор справа с масштабированием 0.5
-    glPushMatrix()
-    glTranslatef(2.5, 0.0, 0.0)
-    glScalef(0.5, 0.5, 0.5)  # Масштабирование с коэффициентом 0.5
-    glColor3f(1.0, 0.5, 0.0)
-    glutWireTorus(0.5, 1.5, 20, 30)
-    glPopMatrix()
-
-    draw_text(20, window_height - 30, "TASK 4: Teapot and Scaled Torus (scale 0.5)")
-
-    glutSwapBuffers()
-
-    global screenshot_taken
-    if not screenshot_taken[3]:
-        save_screenshot("zadanie_4_opengl.png")
-        screenshot_taken[3] = True
-        print("\n" + "="*70)
-        print("✓ ВСЕ ИЗОБРАЖЕНИЯ СОХРАНЕНЫ!")
-        print("="*70)
+    profiler.end_frame(scheduler.continuous)
+    scheduler.frame_presented()
+
+    if not screenshot_taken[task - 1]:
+        save_screenshot(f"zadanie_{task}_opengl.png")
+        screenshot_taken[task - 1] = True
+        if all(screenshot_taken):
+            print("\n" + "="*70)
+            print("✓ ВСЕ ИЗОБРАЖЕНИЯ СОХРАНЕНЫ!")
+            print("="*70)
+    # После сохранения кадра: в замер старта входит и загрузка PIL
+    glconfig.first_frame()
 
 def display():
     """Основная функция отображения"""
-    if current_task == 1:
-        display_task_1()
-    elif current_task == 2:
-        display_task_2()
-    elif current_task == 3:
-        display_task_3()
-    elif current_task == 4:
-        display_task_4()
+    display_task(current_task)
 
 def keyboard(key, x, y):
     """Обработка нажатий клавиш"""
@@ -252,24 +184,30 @@ def keyboard(key, x, y):
 
     if key == b'1':
         current_task = 1
-        glutPostRedisplay()
+        scheduler.request_redraw()
     elif key == b'2':
         current_task = 2
-        glutPostRedisplay()
+        scheduler.request_redraw()
     elif key == b'3':
         current_task = 3
-        glutPostRedisplay()
+        scheduler.request_redraw()
     elif key == b'4':
         current_task = 4
-        glutPostRedisplay()
+        scheduler.request_redraw()
     elif key == b's':
         save_screenshot(f"screenshot_task_{current_task}.png")
     elif key == b'r':
         rotation_x = 30.0
         rotation_y = 45.0
         zoom = 1.0
-        glutPostRedisplay()
+        scheduler.request_redraw()
         print("Вращение сброшено к начальным значениям")
+    elif key == b'f':
+        profiler.overlay = not profiler.overlay
+        scheduler.request_redraw()
+    elif key == b'g':
+        rows = profiler.export_csv("lab1_trace.csv")
+        print(f"Трасса: {rows} кадров -> lab1_trace.csv")
     elif key == b'\x1b':  # ESC
         sys.exit(0)
 
@@ -287,13 +225,18 @@ def mouse(button, state, x, y):
 
     elif button == 3:
         zoom *= 0.9
-        glutPostRedisplay()
+        scheduler.request_redraw()
     elif button == 4:
         zoom *= 1.1
-        glutPostRedisplay()
+        scheduler.request_redraw()
 
 def motion(x, y):
-    """Обработка движения мыши с нажатой кнопкой"""
+    """Обработка движения мыши с нажатой кнопкой (события сливаются до кадра)"""
+    if mouse_down:
+        scheduler.post("motion", x, y)
+
+def apply_motion(x, y):
+    """Применение последней позиции мыши к вращению камеры"""
     global mouse_x, mouse_y, rotation_x, rotation_y
 
     if mouse_down:
@@ -311,8 +254,6 @@ def motion(x, y):
         mouse_x = x
         mouse_y = y
 
-        glutPostRedisplay()
-
 def main():
     glutInit(sys.argv)
     glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH)
@@ -326,6 +267,7 @@ def main():
     glutKeyboardFunc(keyboard)
     glutMouseFunc(mouse)
     glutMotionFunc(motion)
+    scheduler.install(60, {"motion": apply_motion})
 
     print("="*70)
     print("Лабораторная работа 1 - Исправленная версия")
@@ -337,6 +279,7 @@ def main():
     print("  '4' - Задание 4: Масштабирование тора")
     print("  'S' - Сохранить текущий кадр")
     print("  'R' - Сбросить вращение к начальным значениям")
+    print("  'F' - Тайминги кадра и гистограмма, 'G' - выгрузить трассу в CSV")
     print("  'ESC' - Выход")
     print("\nУправление мышью:")
     print("  ЛКМ + движение мыши - Вращение сцены")
@@ -1,9 +1,20 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import glconfig  # до первого импорта OpenGL (режим проверки ошибок PyOpenGL)
+
 from OpenGL.GL import *
 from OpenGL.GLU import *
 from OpenGL.GLUT import *
-import sys
-import numpy as np
-from PIL import Image
+
+import hud
+import instancing
+import profiler
+import scheduler
+import scene
+import textures
 
 window_width = 1400
 window_height = 900
@@ -27,37 +38,52 @@ light_color = [1.0, 1.0, 1.0]
 texture_id = None
 use_texture = True
 
+# Сцена: материалы и расположение объектов
+SCENE_DESCRIPTION = {
+    "camera": {"distance": 12.0},
+    "lights": [{"position": (5.0, 5.0, 5.0), "color": (1.0, 1.0, 1.0), "intensity": 1.0}],
+    "materials": {
+        # СИЛЬНО ПРОЗРАЧНЫЙ (alpha = 0.3)
+        "glass":    {"ambient": (0.1, 0.4, 0.7), "diffuse": (0.2, 0.6, 1.0), "specular": (0.5, 0.5, 0.8),
+                     "shininess": 30.0, "alpha": 0.3},
+        "polished": {"ambient": (0.25, 0.0, 0.25), "diffuse": (1.0, 0.0, 1.0), "specular": (1.0, 1.0, 1.0),
+                     "shininess": 128.0, "alpha": 1.0},
+        "matte":    {"ambient": (0.3, 0.3, 0.3), "diffuse": (0.8, 0.8, 0.8), "specular": (0.1, 0.1, 0.1),
+                     "shininess": 5.0, "alpha": 1.0, "texture": True},
+    },
+    "objects": [
+        # ОБЪЕКТ 1: Прозрачный икосаэдр (alpha = 0.3)
+        {"name": "icosahedron", "mesh": "icosahedron", "material": "glass",
+         "translate": (-4.0, 0.0, 0.0), "scale": (1.8, 1.8, 1.8)},
+        # ОБЪЕКТ 2: Отполированный чайник за икосаэдром
+        {"name": "teapot", "mesh": "teapot", "args": (1.5,), "material": "polished",
+         "translate": (-4.0, 0.0, -3.0)},
+        # ОБЪЕКТ 3: Матовый тор с текстурой
+        {"name": "torus", "mesh": "torus", "args": (0.5, 1.5, 30, 40), "material": "matte",
+         "translate": (4.0, 0.0, 0.0)},
+    ],
+}
+lab_scene = None
+
+# Стресс-режим: тысячи торов и чайников одним glDrawElementsInstanced (клавиша I)
+STRESS_COUNT = 10000
+stress_batches = None
+stress_enabled = False
 
-def create_procedural_texture():
-    """Создание процедурной текстуры (шахматная доска)"""
-    width, height = 256, 256
-    data = np.zeros((height, width, 3), dtype=np.uint8)
-
-    square_size = 32
-    for i in range(height):
-        for j in range(width):
-            if ((i // square_size) + (j // square_size)) % 2 == 0:
-                data[i, j] = [255, 200, 100]
-            else:
-                data[i, j] = [50, 50, 150]
 
-    return data
+def create_procedural_texture():
+    """Создание процедурной текстуры (шахматная доска) — из кэша, если уже генерировалась"""
+    return textures.procedural("checker", width=256, height=256, square=32,
+                               color_a=(255, 200, 100), color_b=(50, 50, 150))
 
 
 def load_texture():
-    """Загрузка текстуры"""
+    """Загрузка текстуры (mip-уровни + трилинейная фильтрация)"""
     global texture_id
+    start = time.perf_counter()
     texture_data = create_procedural_texture()
-    texture_id = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, texture_id)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, 256, 256, 0,
-                 GL_RGB, GL_UNSIGNED_BYTE, texture_data)
-    glBindTexture(GL_TEXTURE_2D, 0)
-    print("✓ Текстура загружена")
+    texture_id = textures.upload(texture_data)
+    print(f"✓ Текстура загружена за {(time.perf_counter() - start) * 1000:.1f} мс")
 
 
 def init_opengl():
@@ -78,6 +104,13 @@ def init_opengl():
     glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
 
     load_texture()
+
+    global lab_scene, light_x, light_y, light_z, light_intensity, light_color
+    lab_scene = scene.load_scene(SCENE_DESCRIPTION)
+    light = lab_scene["lights"][0]
+    light_x, light_y, light_z = light["position"]
+    light_intensity = light["intensity"]
+    light_color = list(light["color"])
     print("✓ OpenGL инициализирован")
 
 
@@ -136,61 +169,15 @@ def draw_axes():
     glEnable(GL_LIGHTING)
 
 
-def draw_transparent_icosahedron():
-    """ОБЪЕКТ 1: Прозрачный икосаэдр (alpha = 0.3)"""
-    glDepthMask(GL_FALSE)
-
-    # СИЛЬНО ПРОЗРАЧНЫЙ (alpha = 0.3)
-    ambient = [0.1, 0.4, 0.7, 0.3]
-    diffuse = [0.2, 0.6, 1.0, 0.3]
-    specular = [0.5, 0.5, 0.8, 0.3]
-    shininess = [30.0]
-
-    glMaterialfv(GL_FRONT_AND_BACK, GL_AMBIENT, ambient)
-    glMaterialfv(GL_FRONT_AND_BACK, GL_DIFFUSE, diffuse)
-    glMaterialfv(GL_FRONT_AND_BACK, GL_SPECULAR, specular)
-    glMaterialfv(GL_FRONT_AND_BACK, GL_SHININESS, shininess)
-
-    glPushMatrix()
-    glTranslatef(-4.0, 0.0, 0.0)
-    glScalef(1.8, 1.8, 1.8)
-    glutSolidIcosahedron()
-    glPopMatrix()
-
-    glDepthMask(GL_TRUE)
-
-
-def draw_polished_teapot():
-    """ОБЪЕКТ 2: Отполированный чайник за икосаэдром"""
-    ambient = [0.25, 0.0, 0.25, 1.0]
-    diffuse = [1.0, 0.0, 1.0, 1.0]
-    specular = [1.0, 1.0, 1.0, 1.0]
-    shininess = [128.0]
-
-    glMaterialfv(GL_FRONT_AND_BACK, GL_AMBIENT, ambient)
-    glMaterialfv(GL_FRONT_AND_BACK, GL_DIFFUSE, diffuse)
-    glMaterialfv(GL_FRONT_AND_BACK, GL_SPECULAR, specular)
-    glMaterialfv(GL_FRONT_AND_BACK, GL_SHININESS, shininess)
-
-    glPushMatrix()
-    glTranslatef(-4.0, 0.0, -3.0)  # За икосаэдром
-    glutSolidTeapot(1.5)
-    glPopMatrix()
-
-
-def draw_textured_torus():
-    """ОБЪЕКТ 3: Матовый тор с текстурой"""
-    ambient = [0.3, 0.3, 0.3, 1.0]
-    diffuse = [0.8, 0.8, 0.8, 1.0]
-    specular = [0.1, 0.1, 0.1, 1.0]
-    shininess = [5.0]
-
-    glMaterialfv(GL_FRONT_AND_BACK, GL_AMBIENT, ambient)
-    glMaterialfv(GL_FRONT_AND_BACK, GL_DIFFUSE, diffuse)
-    glMaterialfv(GL_FRONT_AND_BACK, GL_SPECULAR, specular)
-    glMaterialfv(GL_FRONT_AND_BACK, GL_SHININESS, shininess)
+def bind_material(m):
+    """Установка материала объекта (и текстуры, если она нужна материалу)"""
+    alpha = m["alpha"]
+    glMaterialfv(GL_FRONT_AND_BACK, GL_AMBIENT, [*m["ambient"], alpha])
+    glMaterialfv(GL_FRONT_AND_BACK, GL_DIFFUSE, [*m["diffuse"], alpha])
+    glMaterialfv(GL_FRONT_AND_BACK, GL_SPECULAR, [*m["specular"], alpha])
+    glMaterialfv(GL_FRONT_AND_BACK, GL_SHININESS, [m["shininess"]])
 
-    if use_texture and texture_id:
+    if m.get("texture") and use_texture and texture_id:
         glEnable(GL_TEXTURE_2D)
         glBindTexture(GL_TEXTURE_2D, texture_id)
         glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE)
@@ -198,93 +185,75 @@ def draw_textured_torus():
         glEnable(GL_TEXTURE_GEN_T)
         glTexGeni(GL_S, GL_TEXTURE_GEN_MODE, GL_OBJECT_LINEAR)
         glTexGeni(GL_T, GL_TEXTURE_GEN_MODE, GL_OBJECT_LINEAR)
-
-    glPushMatrix()
-    glTranslatef(4.0, 0.0, 0.0)
-    glutSolidTorus(0.5, 1.5, 30, 40)
-    glPopMatrix()
-
-    if use_texture:
-        glDisable(GL_TEXTURE_GEN_S)
-        glDisable(GL_TEXTURE_GEN_T)
-        glDisable(GL_TEXTURE_2D)
+    else:
+        unbind_texture()
 
 
-def draw_text(x, y, text):
-    """Отрисовка текста на экране"""
-    glDisable(GL_DEPTH_TEST)
-    glDisable(GL_LIGHTING)
+def unbind_texture():
+    glDisable(GL_TEXTURE_GEN_S)
+    glDisable(GL_TEXTURE_GEN_T)
     glDisable(GL_TEXTURE_2D)
 
-    glMatrixMode(GL_PROJECTION)
-    glPushMatrix()
-    glLoadIdentity()
-    gluOrtho2D(0, window_width, 0, window_height)
-
-    glMatrixMode(GL_MODELVIEW)
-    glPushMatrix()
-    glLoadIdentity()
 
-    glColor3f(1.0, 1.0, 1.0)
-    glRasterPos2f(x, y)
-    for char in text:
-        glutBitmapCharacter(GLUT_BITMAP_HELVETICA_12, ord(char))
-
-    glPopMatrix()
-    glMatrixMode(GL_PROJECTION)
-    glPopMatrix()
-    glMatrixMode(GL_MODELVIEW)
-
-    glEnable(GL_DEPTH_TEST)
-    glEnable(GL_LIGHTING)
+def draw_text(x, y, text):
+    """Отрисовка текста на экране (все строки кадра выводятся одним hud.flush)"""
+    hud.text(x, y, text)
 
 
 def apply_camera_rotation():
     """Применение вращения камеры"""
-    distance = 12.0 * zoom
-    rot_x_rad = np.radians(rotation_x)
-    rot_y_rad = np.radians(rotation_y)
-    cam_x = distance * np.sin(rot_y_rad) * np.cos(rot_x_rad)
-    cam_y = distance * np.sin(rot_x_rad)
-    cam_z = distance * np.cos(rot_y_rad) * np.cos(rot_x_rad)
-    return cam_x, cam_y, cam_z
+    return scene.orbit_eye(SCENE_DESCRIPTION["camera"]["distance"] * zoom, rotation_x, rotation_y)
 
 
 def display():
     """Основная функция отображения"""
+    profiler.begin_frame()
     glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
     glLoadIdentity()
 
     cam_x, cam_y, cam_z = apply_camera_rotation()
     gluLookAt(cam_x, cam_y, cam_z, 0, 0, 0, 0, 1, 0)
 
-    setup_light()
-    draw_axes()
-    draw_light_marker()
-
-    # ПОРЯДОК: непрозрачные → прозрачные
-    draw_textured_torus()
-    draw_polished_teapot()  # За икосаэдром
-    draw_transparent_icosahedron()  # Прозрачный последним!
-
-    draw_text(20, window_height - 30, "Lab 2: Materials, Lighting, Textures")
-    draw_text(20, window_height - 50, f"Light: [{light_x:.1f}, {light_y:.1f}, {light_z:.1f}]")
-    draw_text(20, window_height - 70, f"Intensity: {light_intensity:.2f}")
-    draw_text(20, window_height - 90, f"Color: RGB({light_color[0]:.1f}, {light_color[1]:.1f}, {light_color[2]:.1f})")
-    draw_text(20, window_height - 110, f"Texture: {'ON' if use_texture else 'OFF'}")
-    draw_text(20, 120, "Objects:")
-    draw_text(20, 100, "  Left: TRANSPARENT Icosahedron (alpha=0.3) - SEE TEAPOT BEHIND!")
-    draw_text(20, 80, "  Behind: Polished PURPLE Teapot (shininess=128)")
-    draw_text(20, 60, "  Right: Matte Textured Torus (shininess=5)")
-    draw_text(20, 40, "Press 'H' for help")
+    with profiler.section("scene"):
+        setup_light()
+        draw_axes()
+        draw_light_marker()
+
+        # ПОРЯДОК: непрозрачные → прозрачные (сортировку делает рендерер сцены)
+        scene.render(lab_scene, scene.current_view_projection(), (cam_x, cam_y, cam_z),
+                     bind_material=bind_material)
+        unbind_texture()
+
+    if stress_enabled:
+        with profiler.section("stress"):
+            instancing.draw_batches(stress_batches, scene.current_view_projection(),
+                                    (light_x, light_y, light_z), light_color)
+
+    with profiler.section("text"):
+        draw_text(20, window_height - 30, "Lab 2: Materials, Lighting, Textures")
+        draw_text(20, window_height - 50, f"Light: [{light_x:.1f}, {light_y:.1f}, {light_z:.1f}]")
+        draw_text(20, window_height - 70, f"Intensity: {light_intensity:.2f}")
+        draw_text(20, window_height - 90, f"Color: RGB({light_color[0]:.1f}, {light_color[1]:.1f}, {light_color[2]:.1f})")
+        draw_text(20, window_height - 110, f"Texture: {'ON' if use_texture else 'OFF'}")
+        draw_text(20, 120, "Objects:")
+        draw_text(20, 100, "  Left: TRANSPARENT Icosahedron (alpha=0.3) - SEE TEAPOT BEHIND!")
+        draw_text(20, 80, "  Behind: Polished PURPLE Teapot (shininess=128)")
+        draw_text(20, 60, "  Right: Matte Textured Torus (shininess=5)")
+        draw_text(20, 40, "Press 'H' for help")
+        profiler.draw_overlay(window_width, window_height)
+        hud.flush(window_width, window_height)
 
     glutSwapBuffers()
+    profiler.end_frame(scheduler.continuous)
+    scheduler.frame_presented()
+    glconfig.first_frame()
 
 
 def keyboard(key, x, y):
     """Обработка нажатий клавиш"""
     global rotation_x, rotation_y, zoom, light_intensity, light_color, use_texture
     global light_x, light_y, light_z
+    global stress_batches, stress_enabled
 
     if key == b'r' or key == b'R':
         rotation_x = 30.0
@@ -333,6 +302,16 @@ def keyboard(key, x, y):
     elif key == b't' or key == b'T':
         use_texture = not use_texture
         print(f"Текстура: {'ВКЛ' if use_texture else 'ВЫКЛ'}")
+    elif key == b'i' or key == b'I':
+        if stress_batches is None:
+            stress_batches, _ = instancing.stress_scene(STRESS_COUNT)
+        stress_enabled = not stress_enabled
+        print(f"Стресс-сцена ({STRESS_COUNT} объектов): {'ВКЛ' if stress_enabled else 'ВЫКЛ'}")
+    elif key == b'f' or key == b'F':
+        profiler.overlay = not profiler.overlay
+    elif key == b'g' or key == b'G':
+        rows = profiler.export_csv("lab2_trace.csv")
+        print(f"Трасса: {rows} кадров -> lab2_trace.csv")
     elif key == b'h' or key == b'H':
         print("\n" + "=" * 80)
         print("УПРАВЛЕНИЕ")
@@ -340,11 +319,13 @@ def keyboard(key, x, y):
         print("Камера: ЛКМ+движение, колесико, R")
         print("Свет: W/A/S/D/Q/E (позиция), +/- (интенсивность), 1-5 (цвет)")
         print("Текстура: T")
+        print("Стресс-сцена (инстансинг): I")
+        print("Тайминги кадра: F, выгрузка трассы в CSV: G")
         print("=" * 80 + "\n")
     elif key == b'\x1b':
         sys.exit(0)
 
-    glutPostRedisplay()
+    scheduler.request_redraw()
 
 
 def mouse(button, state, x, y):
@@ -360,14 +341,20 @@ def mouse(button, state, x, y):
             mouse_down = False
     elif button == 3:
         zoom *= 0.9
-        glutPostRedisplay()
+        scheduler.request_redraw()
     elif button == 4:
         zoom *= 1.1
-        glutPostRedisplay()
+        scheduler.request_redraw()
 
 
 def motion(x, y):
-    """Движение мыши"""
+    """Движение мыши (события сливаются и применяются раз в кадр)"""
+    if mouse_down:
+        scheduler.post("motion", x, y)
+
+
+def apply_motion(x, y):
+    """Применение последней позиции мыши к вращению камеры"""
     global mouse_x, mouse_y, rotation_x, rotation_y
 
     if mouse_down:
@@ -378,7 +365,6 @@ def motion(x, y):
         rotation_x = max(-89.0, min(89.0, rotation_x))
         mouse_x = x
         mouse_y = y
-        glutPostRedisplay()
 
 
 def main():
@@ -393,6 +379,7 @@ def main():
     glutKeyboardFunc(keyboard)
     glutMouseFunc(mouse)
     glutMotionFunc(motion)
+    scheduler.install(60, {"motion": apply_motion})
 
     print("=" * 80)
     print("ЛАБА 2: Материалы, Освещение, Текстуры")
@@ -1,11 +1,28 @@
 # Lab 3: Shadow Mapping (Torus in front, Teapot behind it + Floor)
-# Управление: ЛКМ/колесо/R; W/A/S/D/Q/E; +/-; 1-5; O; P; [; ]
+# Управление: ЛКМ/колесо/R; W/A/S/D/Q/E; +/-; 1-5; O; P; [; ]; I; T; F; G; C
+# Запуск: python lab3.py [--no-shader-cache] [--production]  (холодный старт без кэша шейдеров; без проверки ошибок PyOpenGL)
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import glconfig  # до первого импорта OpenGL (режим проверки ошибок PyOpenGL)
 
 from OpenGL.GL import *
 from OpenGL.GLU import *
 from OpenGL.GLUT import *
 import numpy as np
-import sys
+
+import hud
+import instancing
+import oit
+import profiler
+import scheduler
+import scene
+import scenes
+import shaders
+from scene import get_matrix
 
 # -------------------- Window --------------------
 window_width = 1400
@@ -15,18 +32,12 @@ window_height = 900
 mouse_down = False
 mouse_x = 0
 mouse_y = 0
-rotation_x = 30.0
-rotation_y = 45.0
-zoom = 1.0
+rotation_x = scenes.LAB3_ROTATION_X
+rotation_y = scenes.LAB3_ROTATION_Y
+zoom = scenes.LAB3_ZOOM
 
 def apply_camera_rotation():
-    distance = 14.0 * zoom
-    rx = np.radians(rotation_x)
-    ry = np.radians(rotation_y)
-    cam_x = distance * np.sin(ry) * np.cos(rx)
-    cam_y = distance * np.sin(rx)
-    cam_z = distance * np.cos(ry) * np.cos(rx)
-    return cam_x, cam_y, cam_z
+    return scene.orbit_eye(SCENE_DESCRIPTION["camera"]["distance"] * zoom, rotation_x, rotation_y)
 
 # -------------------- Light --------------------
 light_x = 5.0
@@ -35,23 +46,33 @@ light_z = 5.0
 light_intensity = 1.0
 light_color = [1.0, 1.0, 1.0]
 
+LIGHT_NEAR, LIGHT_FAR = scenes.LAB3_LIGHT_NEAR, scenes.LAB3_LIGHT_FAR
+
 # -------------------- Shadow map --------------------
-SHADOW_MAP_SIZE = 2048
+SHADOW_MAP_SIZE = scenes.LAB3_SHADOW_MAP_SIZE
 depth_fbo = None
 depth_tex = None
 shadow_enabled = True
 pcf_enabled = True
-shadow_bias = 0.004
+shadow_bias = scenes.LAB3_SHADOW_BIAS
 
 # -------------------- Programs --------------------
 prog_depth = None
 prog_scene = None
+prog_scene_oit = None
+
+# -------------------- Scene --------------------
+# Описание сцены — в scenes.py (без OpenGL, его же рендерит softraster.py)
+SCENE_DESCRIPTION = scenes.LAB3_SCENE
+lab_scene = None
 
-# -------------------- Materials --------------------
-mat_ico   = {"ambient": (0.10, 0.40, 0.70), "diffuse": (0.20, 0.60, 1.00), "specular": (0.50, 0.50, 0.80), "shininess": 30.0,  "alpha": 0.30}
-mat_teapot= {"ambient": (0.25, 0.00, 0.25), "diffuse": (1.00, 0.00, 1.00), "specular": (1.00, 1.00, 1.00), "shininess": 128.0, "alpha": 1.00}
-mat_torus = {"ambient": (0.30, 0.30, 0.30), "diffuse": (0.80, 0.80, 0.80), "specular": (0.10, 0.10, 0.10), "shininess": 5.0,   "alpha": 1.00}
-mat_plane = {"ambient": (0.25, 0.25, 0.25), "diffuse": (0.70, 0.70, 0.70), "specular": (0.05, 0.05, 0.05), "shininess": 4.0,   "alpha": 1.00}
+# Стресс-режим: тысячи торов и чайников одним glDrawElementsInstanced (клавиша I)
+STRESS_COUNT = 10000
+stress_batches = None
+stress_enabled = False
+
+# Прозрачные объекты через weighted blended OIT вместо сортировки (клавиша T)
+oit_enabled = False
 
 # -------------------- Shaders --------------------
 vs_depth = """
@@ -145,35 +166,10 @@ void main() {
 }
 """ % (SHADOW_MAP_SIZE)
 
-# -------------------- Shader utils --------------------
-def compile_shader(src, stype):
-    s = glCreateShader(stype)
-    glShaderSource(s, src)
-    glCompileShader(s)
-    if glGetShaderiv(s, GL_COMPILE_STATUS) != GL_TRUE:
-        raise RuntimeError(glGetShaderInfoLog(s).decode())
-    return s
-
-def link_program(vs_src, fs_src):
-    vs = compile_shader(vs_src, GL_VERTEX_SHADER)
-    fs = compile_shader(fs_src, GL_FRAGMENT_SHADER)
-    p = glCreateProgram()
-    glAttachShader(p, vs); glAttachShader(p, fs)
-    glLinkProgram(p)
-    if glGetProgramiv(p, GL_LINK_STATUS) != GL_TRUE:
-        raise RuntimeError(glGetProgramInfoLog(p).decode())
-    glDeleteShader(vs); glDeleteShader(fs)
-    return p
-
 # -------------------- Matrices helpers --------------------
-def get_matrix(mode):
-    arr = (GLfloat * 16)()
-    glGetFloatv(mode, arr)
-    return np.array(arr, dtype=np.float32).reshape((4,4)).T
-
 def compute_light_vp():
     glMatrixMode(GL_PROJECTION); glLoadIdentity()
-    gluPerspective(60.0, 1.0, 0.5, 60.0)
+    gluPerspective(60.0, 1.0, LIGHT_NEAR, LIGHT_FAR)
     light_proj = get_matrix(GL_PROJECTION_MATRIX)
     glMatrixMode(GL_MODELVIEW); glLoadIdentity()
     gluLookAt(light_x, light_y, light_z, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0)
@@ -212,26 +208,6 @@ def create_shadow_fbo():
         raise RuntimeError(f"FBO incomplete: {status}")
     glBindFramebuffer(GL_FRAMEBUFFER, 0)
 
-# -------------------- Raw meshes (no transforms) --------------------
-def draw_plane_mesh():
-    size = 20.0; y = -1.5
-    glBegin(GL_QUADS)
-    glNormal3f(0,1,0)
-    glVertex3f(-size, y, -size)
-    glVertex3f( size, y, -size)
-    glVertex3f( size, y,  size)
-    glVertex3f(-size, y,  size)
-    glEnd()
-
-def draw_icosahedron_mesh():
-    glutSolidIcosahedron()
-
-def draw_teapot_mesh():
-    glutSolidTeapot(1.5)
-
-def draw_torus_mesh():
-    glutSolidTorus(0.5, 1.5, 30, 40)
-
 # -------------------- Helpers --------------------
 def draw_axes():
     glUseProgram(0)
@@ -273,25 +249,17 @@ def set_common_scene_uniforms(prog, light_vp):
 
     glUniformMatrix4fv(glGetUniformLocation(prog, "uLightVP"), 1, GL_TRUE, light_vp.astype(np.float32))
 
-def set_model_uniform_from_current(prog):
-    # ModelView = View * Model  =>  Model = inv(View) * ModelView
-    modelview = get_matrix(GL_MODELVIEW_MATRIX)
-    # Rebuild current View
-    cx, cy, cz = apply_camera_rotation()
-    glPushMatrix(); glLoadIdentity(); gluLookAt(cx, cy, cz, 0, 0, 0, 0, 1, 0)
-    view = get_matrix(GL_MODELVIEW_MATRIX); glPopMatrix()
-    inv_view = np.linalg.inv(view)
-    model = inv_view @ modelview
-    glUniformMatrix4fv(glGetUniformLocation(prog, "uModel"), 1, GL_TRUE, model.astype(np.float32))
+def set_model_uniform(prog, node):
+    glUniformMatrix4fv(glGetUniformLocation(prog, "uModel"), 1, GL_TRUE, node["model"])
 
 # -------------------- Passes --------------------
-def render_depth_pass():
+def render_depth_pass(light_vp):
     glViewport(0, 0, SHADOW_MAP_SIZE, SHADOW_MAP_SIZE)
     glBindFramebuffer(GL_FRAMEBUFFER, depth_fbo)
     glClear(GL_DEPTH_BUFFER_BIT)
 
     # Light POV
-    glMatrixMode(GL_PROJECTION); glLoadIdentity(); gluPerspective(60.0, 1.0, 0.5, 60.0)
+    glMatrixMode(GL_PROJECTION); glLoadIdentity(); gluPerspective(60.0, 1.0, LIGHT_NEAR, LIGHT_FAR)
     glMatrixMode(GL_MODELVIEW);  glLoadIdentity();  gluLookAt(light_x, light_y, light_z, 0, 0, 0, 0, 1, 0)
 
     glColorMask(GL_FALSE, GL_FALSE, GL_FALSE, GL_FALSE)
@@ -300,27 +268,8 @@ def render_depth_pass():
 
     glUseProgram(prog_depth)
 
-    # Плоскость
-    draw_plane_mesh()
-
-    # Тор (должен совпадать со сценой)
-    glPushMatrix()
-    glTranslatef(2.5, 2.0, 0.0)
-    draw_torus_mesh()
-    glPopMatrix()
-
-    # Чайник (должен совпадать со сценой)
-    glPushMatrix()
-    glTranslatef(2.5, 2.0, -3.5)
-    draw_teapot_mesh()
-    glPopMatrix()
-
-    # Икосаэдр (тот же Y, что и в сцене)
-    glPushMatrix()
-    glTranslatef(-3.0, 2.0, -0.3)
-    glScalef(1.8, 1.8, 1.8)
-    draw_icosahedron_mesh()
-    glPopMatrix()
+    # Те же объекты, что и в основном проходе (прозрачный икосаэдр тоже отбрасывает тень)
+    scene.render(lab_scene, light_vp, (light_x, light_y, light_z), shadow_pass=True)
 
     glUseProgram(0)
     glDisable(GL_POLYGON_OFFSET_FILL)
@@ -340,82 +289,77 @@ def render_scene_pass(light_vp):
     glUniform1i(glGetUniformLocation(prog_scene, "uShadowMap"), 0)
     set_common_scene_uniforms(prog_scene, light_vp)
 
-    # Непрозрачные объекты сначала
+    # Непрозрачные по состоянию, затем прозрачные от дальних к ближним
     glEnable(GL_CULL_FACE)
     glCullFace(GL_BACK)
+    view_proj = scene.current_view_projection()
+    scene.render(lab_scene, view_proj, apply_camera_rotation(),
+                 bind_material=lambda m: set_material(prog_scene, m),
+                 bind_model=lambda node: set_model_uniform(prog_scene, node),
+                 transparent=not oit_enabled)
+    glDisable(GL_CULL_FACE)
 
-    # 1) Плоскость пола — отключаем cull только на время её рисования
-    set_material(prog_scene, mat_plane)
-    glPushMatrix()
-    glDisable(GL_CULL_FACE)             # ключ к видимости пола сверху
-    set_model_uniform_from_current(prog_scene)
-    draw_plane_mesh()
-    glEnable(GL_CULL_FACE)              # вернуть как было
-    glPopMatrix()
-
-    # 2) Тор
-    set_material(prog_scene, mat_torus)
-    glPushMatrix()
-    glTranslatef(2.5, 2.0, 0.0)
-    set_model_uniform_from_current(prog_scene)
-    draw_torus_mesh()
-    glPopMatrix()
-
-    # 3) Чайник (за тором)
-    set_material(prog_scene, mat_teapot)
-    glPushMatrix()
-    glTranslatef(2.5, 2.0, -3.5)
-    set_model_uniform_from_current(prog_scene)
-    draw_teapot_mesh()
-    glPopMatrix()
-
-    # 4) Икосаэдр — ПРОЗРАЧНЫЙ, рисуем ПОСЛЕДНИМ
-    set_material(prog_scene, mat_ico)
-    glPushMatrix()
-    glTranslatef(-3.0, 2.0, -0.3)
-    glScalef(1.8, 1.8, 1.8)
-
-    glEnable(GL_BLEND)
-    glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-    glDepthMask(GL_FALSE)               # не писать глубину, чтобы прозрачность была настоящей
-    glDisable(GL_CULL_FACE)             # видеть обе стороны граней
-
-    set_model_uniform_from_current(prog_scene)
-    draw_icosahedron_mesh()
+    if stress_enabled:
+        instancing.draw_batches(stress_batches, view_proj, (light_x, light_y, light_z), light_color)
 
-    glEnable(GL_CULL_FACE)
-    glDepthMask(GL_TRUE)
-    glDisable(GL_BLEND)
-
-    glPopMatrix()
+    if oit_enabled:
+        render_transparent_oit(light_vp, view_proj)
 
     glUseProgram(0)
     draw_axes()
     draw_light_marker()
 
+def render_transparent_oit(light_vp, view_proj):
+    # Глубина непрозрачных объектов — в буфер OIT, чтобы они перекрывали прозрачные
+    oit.begin(window_width, window_height)
+    glUseProgram(prog_depth)
+    scene.render(lab_scene, view_proj, apply_camera_rotation(), transparent=False)
+    if stress_enabled:
+        instancing.draw_batches(stress_batches, view_proj, (light_x, light_y, light_z), light_color)
+
+    # Прозрачные — в порядке описания сцены, без сортировки
+    oit.accumulate()
+    glUseProgram(prog_scene_oit)
+    glActiveTexture(GL_TEXTURE0)
+    glBindTexture(GL_TEXTURE_2D, depth_tex)
+    glUniform1i(glGetUniformLocation(prog_scene_oit, "uShadowMap"), 0)
+    set_common_scene_uniforms(prog_scene_oit, light_vp)
+    scene.render_transparent_unsorted(lab_scene, view_proj,
+                                      bind_material=lambda m: set_material(prog_scene_oit, m),
+                                      bind_model=lambda node: set_model_uniform(prog_scene_oit, node))
+    oit.end()
+
+    glViewport(0, 0, window_width, window_height)
+    oit.composite()
+
 def draw_text(x, y, text):
-    glUseProgram(0)
-    glDisable(GL_DEPTH_TEST)
-    glMatrixMode(GL_PROJECTION); glPushMatrix(); glLoadIdentity(); gluOrtho2D(0, window_width, 0, window_height)
-    glMatrixMode(GL_MODELVIEW); glPushMatrix(); glLoadIdentity()
-    glColor3f(1,1,1); glRasterPos2f(x, y)
-    for ch in text: glutBitmapCharacter(GLUT_BITMAP_HELVETICA_12, ord(ch))
-    glPopMatrix(); glMatrixMode(GL_PROJECTION); glPopMatrix(); glMatrixMode(GL_MODELVIEW)
-    glEnable(GL_DEPTH_TEST)
+    hud.text(x, y, text)
 
 # -------------------- GLUT callbacks --------------------
 def display():
+    profiler.begin_frame()
     light_vp = compute_light_vp()
-    render_depth_pass()
-    render_scene_pass(light_vp)
-
-    draw_text(20, window_height - 30, "Lab 3: Shadow Mapping")
-    draw_text(20, window_height - 50, f"Light: [{light_x:.1f}, {light_y:.1f}, {light_z:.1f}]  Intensity: {light_intensity:.2f}")
-    draw_text(20, window_height - 70, f"Color: RGB({light_color[0]:.1f}, {light_color[1]:.1f}, {light_color[2]:.1f})")
-    draw_text(20, window_height - 90, f"Shadows: {'ON' if shadow_enabled else 'OFF'}  PCF: {'ON' if pcf_enabled else 'OFF'}  Bias: {shadow_bias:.4f}")
-    draw_text(20, 60, "Objects: Torus (front), Teapot (behind), Icosahedron (left), Floor plane")
-    draw_text(20, 40, "Keys: Camera(LMB/Scroll/R), Light(WASDQE,+/-), Color(1-5), Shadows(O), PCF(P), Bias([,])")
+    with profiler.section("depth"):
+        render_depth_pass(light_vp)
+    with profiler.section("scene"):
+        render_scene_pass(light_vp)
+
+    with profiler.section("text"):
+        draw_text(20, window_height - 30, "Lab 3: Shadow Mapping")
+        draw_text(20, window_height - 50, f"Light: [{light_x:.1f}, {light_y:.1f}, {light_z:.1f}]  Intensity: {light_intensity:.2f}")
+        draw_text(20, window_height - 70, f"Color: RGB({light_color[0]:.1f}, {light_color[1]:.1f}, {light_color[2]:.1f})")
+        draw_text(20, window_height - 90, f"Shadows: {'ON' if shadow_enabled else 'OFF'}  PCF: {'ON' if pcf_enabled else 'OFF'}  Bias: {shadow_bias:.4f}  Transparency: {'OIT' if oit_enabled else 'sorted'}")
+        draw_text(20, 60, "Objects: Torus (front), Teapot (behind), Icosahedron (left), Floor plane")
+        draw_text(20, 40, "Keys: Camera(LMB/Scroll/R), Light(WASDQE,+/-), Color(1-5), Shadows(O), PCF(P), Bias([,]), Stress(I), OIT(T), Stats(F), CSV(G)")
+        if profiler.overlay:
+            latency, latency_p95 = scheduler.latency_stats()
+            draw_text(20, window_height - 110, f"Input->frame: {latency:.1f} ms (p95 {latency_p95:.1f})  Redraw: {'continuous' if scheduler.continuous else 'on change'} @ {scheduler.target_fps} fps")
+        profiler.draw_overlay(window_width, window_height)
+        hud.flush(window_width, window_height)
     glutSwapBuffers()
+    profiler.end_frame(scheduler.continuous)
+    scheduler.frame_presented()
+    glconfig.first_frame()
 
 def reshape(w, h):
     global window_width, window_height
@@ -426,9 +370,10 @@ def keyboard(key, x, y):
     global rotation_x, rotation_y, zoom
     global light_x, light_y, light_z, light_intensity, light_color
     global shadow_enabled, pcf_enabled, shadow_bias
+    global stress_batches, stress_enabled, oit_enabled
 
     if key in (b'r', b'R'):
-        rotation_x = 30.0; rotation_y = 45.0; zoom = 1.0
+        rotation_x, rotation_y, zoom = scenes.LAB3_ROTATION_X, scenes.LAB3_ROTATION_Y, scenes.LAB3_ZOOM
     elif key in (b'+', b'='):
         light_intensity = min(2.0, light_intensity + 0.1)
     elif key in (b'-', b'_'):
@@ -459,6 +404,25 @@ def keyboard(key, x, y):
         shadow_enabled = not shadow_enabled
     elif key in (b'p', b'P'):
         pcf_enabled = not pcf_enabled
+    elif key in (b'i', b'I'):
+        if stress_batches is None:
+            stress_batches, _ = instancing.stress_scene(STRESS_COUNT)
+        stress_enabled = not stress_enabled
+        print(f"Stress: {STRESS_COUNT} instances {'ON' if stress_enabled else 'OFF'}")
+    elif key in (b't', b'T'):
+        if oit.supported():
+            oit_enabled = not oit_enabled
+            print(f"Transparency: {'weighted blended OIT' if oit_enabled else 'sorted back-to-front'}")
+        else:
+            print("OIT недоступна: нужен OpenGL 4.0 или GL_ARB_draw_buffers_blend")
+    elif key in (b'f', b'F'):
+        profiler.overlay = not profiler.overlay
+    elif key in (b'c', b'C'):
+        scheduler.continuous = not scheduler.continuous
+        print(f"Redraw: {'continuous' if scheduler.continuous else 'on change only'}")
+    elif key in (b'g', b'G'):
+        rows = profiler.export_csv("lab3_trace.csv")
+        print(f"Trace: {rows} frames -> lab3_trace.csv")
     elif key == b'[':
         shadow_bias = max(0.0, shadow_bias - 0.0005)
     elif key == b']':
@@ -473,7 +437,7 @@ def keyboard(key, x, y):
         # Чайник ближе к свету по направлению -Z -> его тень падает на тор
         light_x, light_y, light_z = 6.0, 8.0, -7.0
         print("Preset 8: Teapot -> Torus shadow")
-    glutPostRedisplay()
+    scheduler.request_redraw()
 
 def mouse(button, state, x, y):
     global mouse_down, mouse_x, mouse_y, zoom
@@ -483,11 +447,16 @@ def mouse(button, state, x, y):
         else:
             mouse_down = False
     elif button == 3:
-        zoom *= 0.9; glutPostRedisplay()
+        zoom *= 0.9; scheduler.request_redraw()
     elif button == 4:
-        zoom *= 1.1; glutPostRedisplay()
+        zoom *= 1.1; scheduler.request_redraw()
 
 def motion(x, y):
+    # Только запоминаем позицию: все движения за кадр применятся одним apply_motion
+    if mouse_down:
+        scheduler.post("motion", x, y)
+
+def apply_motion(x, y):
     global mouse_x, mouse_y, rotation_x, rotation_y
     if mouse_down:
         dx = x - mouse_x; dy = y - mouse_y
@@ -495,20 +464,35 @@ def motion(x, y):
         rotation_x += dy * 0.5
         rotation_x = max(-89.0, min(89.0, rotation_x))
         mouse_x = x; mouse_y = y
-        glutPostRedisplay()
 
 def init_opengl():
     glClearColor(0.18, 0.19, 0.22, 1.0)
     glEnable(GL_DEPTH_TEST)
     glEnable(GL_MULTISAMPLE)
 
-    global prog_depth, prog_scene
-    prog_depth = link_program(vs_depth, fs_depth)
-    prog_scene = link_program(vs_scene, fs_scene)
+    global prog_depth, prog_scene, prog_scene_oit, lab_scene
+    global light_x, light_y, light_z, light_intensity, light_color
+    start = time.perf_counter()
+    prog_depth = shaders.cached_program(vs_depth, fs_depth)
+    prog_scene = shaders.cached_program(vs_scene, fs_scene)
+    prog_scene_oit = shaders.cached_program(vs_scene, oit.weighted_fragment(fs_scene))
+    glFinish()
+    mode = "кэш бинарников" if shaders.cache_enabled and shaders.binary_supported() else "без кэша"
+    print(f"Шейдеры: {(time.perf_counter() - start) * 1e3:.1f} мс ({mode}: "
+          f"hits {shaders.stats['hits']}, misses {shaders.stats['misses']}, rejected {shaders.stats['rejected']})")
+
+    lab_scene = scene.load_scene(SCENE_DESCRIPTION)
+    light = lab_scene["lights"][0]
+    light_x, light_y, light_z = light["position"]
+    light_intensity = light["intensity"]
+    light_color = list(light["color"])
 
     create_shadow_fbo()
 
 def main():
+    if "--no-shader-cache" in sys.argv:
+        sys.argv.remove("--no-shader-cache")
+        shaders.cache_enabled = False
     glutInit(sys.argv)
     glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH | GLUT_MULTISAMPLE)
     glutInitWindowSize(window_width, window_height)
@@ -521,10 +505,11 @@ def main():
     glutKeyboardFunc(keyboard)
     glutMouseFunc(mouse)
     glutMotionFunc(motion)
+    scheduler.install(60, {"motion": apply_motion})
 
     print("="*80)
     print("ЛАБА 3: Динамические тени (shadow mapping). Тор спереди, чайник позади, пол-плоскость")
-    print("Клавиши: ЛКМ/колесо/R; W/A/S/D/Q/E; +/-; 1-5; O; P; [; ]")
+    print("Клавиши: ЛКМ/колесо/R; W/A/S/D/Q/E; +/-; 1-5; O; P; [; ]; I (стресс-сцена); T (OIT); F (тайминги); G (CSV); C (непрерывная перерисовка)")
     print("="*80)
 
     glutMainLoop()
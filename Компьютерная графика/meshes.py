@@ -0,0 +1,167 @@
+# Полигональные сетки в виде массивов NumPy для буферного (VBO) рендеринга.
+#
+# Тор, икосаэдр, сфера и плоскость строятся процедурно, чайник — разбиением
+# тех же бикубических патчей Безье, что рисует glutSolidTeapot. Контекст
+# OpenGL ни для одной сетки не нужен.
+#
+# Сетка — словарь {"positions": (N, 3) float32, "normals": (N, 3) float32,
+#                  "indices": (M,) uint32}.
+
+import numpy as np
+
+
+def _mesh(positions, normals, indices):
+    return {
+        "positions": np.ascontiguousarray(positions, dtype=np.float32),
+        "normals": np.ascontiguousarray(normals, dtype=np.float32),
+        "indices": np.ascontiguousarray(indices, dtype=np.uint32).ravel(),
+    }
+
+
+def _grid_indices(rows, cols):
+    """Индексы треугольников для сетки (rows+1) x (cols+1) вершин"""
+    r, c = np.meshgrid(np.arange(rows), np.arange(cols), indexing="ij")
+    a = r * (cols + 1) + c
+    b = a + cols + 1
+    return np.stack([a, b, a + 1, a + 1, b, b + 1], axis=-1).reshape(-1)
+
+
+def flat_mesh(triangles):
+    """Сетка из отдельных треугольников (T, 3, 3) с плоскими нормалями"""
+    tri = np.asarray(triangles, dtype=np.float32)
+    n = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    n /= np.maximum(np.linalg.norm(n, axis=1, keepdims=True), 1e-12)
+    normals = np.repeat(n, 3, axis=0)
+    return _mesh(tri.reshape(-1, 3), normals, np.arange(len(tri) * 3))
+
+
+def torus(inner, outer, sides, rings):
+    """Тор как у glutSolidTorus: кольцо в плоскости XY вокруг оси Z"""
+    theta = np.linspace(0.0, 2.0 * np.pi, rings + 1)[:, None]
+    phi = np.linspace(0.0, 2.0 * np.pi, sides + 1)[None, :]
+    r = outer + inner * np.cos(phi)
+    positions = np.stack(np.broadcast_arrays(r * np.cos(theta), r * np.sin(theta), inner * np.sin(phi)), axis=-1)
+    normals = np.stack(np.broadcast_arrays(np.cos(phi) * np.cos(theta), np.cos(phi) * np.sin(theta),
+                                           np.sin(phi) + 0.0 * theta), axis=-1)
+    return _mesh(positions.reshape(-1, 3), normals.reshape(-1, 3), _grid_indices(rings, sides))
+
+
+def sphere(radius, slices, stacks):
+    """UV-сфера с центром в начале координат"""
+    lat = np.linspace(0.0, np.pi, stacks + 1)[:, None]
+    lon = np.linspace(0.0, 2.0 * np.pi, slices + 1)[None, :]
+    normals = np.stack(np.broadcast_arrays(np.sin(lat) * np.cos(lon), np.cos(lat) + 0.0 * lon,
+                                           np.sin(lat) * np.sin(lon)), axis=-1).reshape(-1, 3)
+    return _mesh(normals * radius, normals, _grid_indices(stacks, slices))
+
+
+def icosahedron():
+    """Икосаэдр единичного радиуса (как glutSolidIcosahedron)"""
+    t = (1.0 + np.sqrt(5.0)) / 2.0
+    v = np.array([[-1, t, 0], [1, t, 0], [-1, -t, 0], [1, -t, 0],
+                  [0, -1, t], [0, 1, t], [0, -1, -t], [0, 1, -t],
+                  [t, 0, -1], [t, 0, 1], [-t, 0, -1], [-t, 0, 1]], dtype=np.float64)
+    v /= np.linalg.norm(v, axis=1, keepdims=True)
+    faces = np.array([[0, 11, 5], [0, 5, 1], [0, 1, 7], [0, 7, 10], [0, 10, 11],
+                      [1, 5, 9], [5, 11, 4], [11, 10, 2], [10, 7, 6], [7, 1, 8],
+                      [3, 9, 4], [3, 4, 2], [3, 2, 6], [3, 6, 8], [3, 8, 9],
+                      [4, 9, 5], [2, 4, 11], [6, 2, 10], [8, 6, 7], [9, 8, 1]])
+    return flat_mesh(v[faces])
+
+
+def plane(size=20.0, y=0.0):
+    """Квадрат пола со стороной 2*size на высоте y"""
+    positions = [[-size, y, -size], [size, y, -size], [size, y, size], [-size, y, size]]
+    return _mesh(positions, [[0, 1, 0]] * 4, [0, 2, 1, 0, 3, 2])
+
+
+# -------------------- Teapot --------------------
+# Патчи Безье чайника Ньюэлла в том виде, в каком их рисует glutSolidTeapot
+# (glut_teapot.c): 10 патчей четверти чайника, которые отражаются по Y, а
+# первые шесть (всё, кроме ручки и носика) — ещё и по X.
+TEAPOT_PATCHES = np.array([
+    [102, 103, 104, 105, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15],               # край
+    [12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27],             # корпус
+    [24, 25, 26, 27, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40],
+    [96, 96, 96, 96, 97, 98, 99, 100, 101, 101, 101, 101, 0, 1, 2, 3],            # крышка
+    [0, 1, 2, 3, 106, 107, 108, 109, 110, 111, 112, 113, 114, 115, 116, 117],
+    [118, 118, 118, 118, 124, 122, 119, 121, 123, 126, 125, 120, 40, 39, 38, 37],  # дно
+    [41, 42, 43, 44, 45, 46, 47, 48, 49, 50, 51, 52, 53, 54, 55, 56],             # ручка
+    [53, 54, 55, 56, 57, 58, 59, 60, 61, 62, 63, 64, 28, 65, 66, 67],
+    [68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78, 79, 80, 81, 82, 83],             # носик
+    [80, 81, 82, 83, 84, 85, 86, 87, 88, 89, 90, 91, 92, 93, 94, 95],
+])
+TEAPOT_POINTS = np.array([
+    (0.2, 0, 2.7), (0.2, -0.112, 2.7), (0.112, -0.2, 2.7), (0, -0.2, 2.7),
+    (1.3375, 0, 2.53125), (1.3375, -0.749, 2.53125), (0.749, -1.3375, 2.53125), (0, -1.3375, 2.53125),
+    (1.4375, 0, 2.53125), (1.4375, -0.805, 2.53125), (0.805, -1.4375, 2.53125), (0, -1.4375, 2.53125),
+    (1.5, 0, 2.4), (1.5, -0.84, 2.4), (0.84, -1.5, 2.4), (0, -1.5, 2.4),
+    (1.75, 0, 1.875), (1.75, -0.98, 1.875), (0.98, -1.75, 1.875), (0, -1.75, 1.875),
+    (2, 0, 1.35), (2, -1.12, 1.35), (1.12, -2, 1.35), (0, -2, 1.35),
+    (2, 0, 0.9), (2, -1.12, 0.9), (1.12, -2, 0.9), (0, -2, 0.9), (-2, 0, 0.9),
+    (2, 0, 0.45), (2, -1.12, 0.45), (1.12, -2, 0.45), (0, -2, 0.45),
+    (1.5, 0, 0.225), (1.5, -0.84, 0.225), (0.84, -1.5, 0.225), (0, -1.5, 0.225),
+    (1.5, 0, 0.15), (1.5, -0.84, 0.15), (0.84, -1.5, 0.15), (0, -1.5, 0.15),
+    (-1.6, 0, 2.025), (-1.6, -0.3, 2.025), (-1.5, -0.3, 2.25), (-1.5, 0, 2.25),
+    (-2.3, 0, 2.025), (-2.3, -0.3, 2.025), (-2.5, -0.3, 2.25), (-2.5, 0, 2.25),
+    (-2.7, 0, 2.025), (-2.7, -0.3, 2.025), (-3, -0.3, 2.25), (-3, 0, 2.25),
+    (-2.7, 0, 1.8), (-2.7, -0.3, 1.8), (-3, -0.3, 1.8), (-3, 0, 1.8),
+    (-2.7, 0, 1.575), (-2.7, -0.3, 1.575), (-3, -0.3, 1.35), (-3, 0, 1.35),
+    (-2.5, 0, 1.125), (-2.5, -0.3, 1.125), (-2.65, -0.3, 0.9375), (-2.65, 0, 0.9375),
+    (-2, -0.3, 0.9), (-1.9, -0.3, 0.6), (-1.9, 0, 0.6),
+    (1.7, 0, 1.425), (1.7, -0.66, 1.425), (1.7, -0.66, 0.6), (1.7, 0, 0.6),
+    (2.6, 0, 1.425), (2.6, -0.66, 1.425), (3.1, -0.66, 0.825), (3.1, 0, 0.825),
+    (2.3, 0, 2.1), (2.3, -0.25, 2.1), (2.4, -0.25, 2.025), (2.4, 0, 2.025),
+    (2.7, 0, 2.4), (2.7, -0.25, 2.4), (3.3, -0.25, 2.4), (3.3, 0, 2.4),
+    (2.8, 0, 2.475), (2.8, -0.25, 2.475), (3.525, -0.25, 2.49375), (3.525, 0, 2.49375),
+    (2.9, 0, 2.475), (2.9, -0.15, 2.475), (3.45, -0.15, 2.5125), (3.45, 0, 2.5125),
+    (2.8, 0, 2.4), (2.8, -0.15, 2.4), (3.2, -0.15, 2.4), (3.2, 0, 2.4),
+    (0, 0, 3.15), (0.8, 0, 3.15), (0.8, -0.45, 3.15), (0.45, -0.8, 3.15), (0, -0.8, 3.15),
+    (0, 0, 2.85),
+    (1.4, 0, 2.4), (1.4, -0.784, 2.4), (0.784, -1.4, 2.4), (0, -1.4, 2.4),
+    (0.4, 0, 2.55), (0.4, -0.224, 2.55), (0.224, -0.4, 2.55), (0, -0.4, 2.55),
+    (1.3, 0, 2.55), (1.3, -0.728, 2.55), (0.728, -1.3, 2.55), (0, -1.3, 2.55),
+    (1.3, 0, 2.4), (1.3, -0.728, 2.4), (0.728, -1.3, 2.4), (0, -1.3, 2.4),
+    (0, 0, 0), (1.425, -0.798, 0), (1.5, 0, 0.075), (1.425, 0, 0), (0.798, -1.425, 0),
+    (0, -1.5, 0.075), (0, -1.425, 0), (1.5, -0.84, 0.075), (0.84, -1.5, 0.075)
+], dtype=np.float64)
+
+
+def _bernstein(t):
+    """Базис Бернштейна третьей степени и его производная в точках t: (len(t), 4) каждый"""
+    s = 1.0 - t
+    basis = np.stack([s ** 3, 3.0 * t * s ** 2, 3.0 * t ** 2 * s, t ** 3], axis=1)
+    deriv = np.stack([-3.0 * s ** 2, 3.0 * s ** 2 - 6.0 * t * s, 6.0 * t * s - 3.0 * t ** 2, 3.0 * t ** 2], axis=1)
+    return basis, deriv
+
+
+def teapot(size, grid=14):
+    """Чайник как у glutSolidTeapot(size): те же патчи, сетка grid x grid на патч, без OpenGL"""
+    quarter = TEAPOT_POINTS[TEAPOT_PATCHES].reshape(-1, 4, 4, 3)
+    # Отражения с обратным порядком по u, чтобы обход граней не менялся
+    patches = np.concatenate([quarter,
+                              quarter[:, :, ::-1] * (1.0, -1.0, 1.0),
+                              quarter[:6, :, ::-1] * (-1.0, 1.0, 1.0),
+                              quarter[:6] * (-1.0, -1.0, 1.0)])
+
+    t = np.linspace(0.0, 1.0, grid + 1)
+    basis, _ = _bernstein(t)
+    # Нормали — по касательным чуть внутри патча: на полюсах крышки и дна ряд точек вырожден
+    dbasis, deriv = _bernstein(np.clip(t, 1e-4, 1.0 - 1e-4))
+    positions = np.einsum("vj,uk,pjkc->pvuc", basis, basis, patches)
+    du = np.einsum("vj,uk,pjkc->pvuc", dbasis, deriv, patches)
+    dv = np.einsum("vj,uk,pjkc->pvuc", deriv, dbasis, patches)
+    normals = np.cross(du, dv)
+    normals /= np.maximum(np.linalg.norm(normals, axis=-1, keepdims=True), 1e-12)
+
+    # glRotatef(270, 1, 0, 0); glScalef(size / 2); glTranslatef(0, 0, -1.5)
+    positions = positions.reshape(-1, 3)
+    normals = normals.reshape(-1, 3)
+    positions = np.stack([positions[:, 0], positions[:, 2] - 1.5, -positions[:, 1]], axis=1) * (0.5 * size)
+    normals = np.stack([normals[:, 0], normals[:, 2], -normals[:, 1]], axis=1)
+
+    per_patch = (grid + 1) ** 2
+    # Обход против часовой стрелки снаружи, нормали наружу (у GLUT грани обходятся по часовой)
+    indices = _grid_indices(grid, grid).reshape(-1, 3)[:, ::-1].ravel()
+    indices = indices[None, :] + per_patch * np.arange(len(patches))[:, None]
+    return _mesh(positions, normals, indices)
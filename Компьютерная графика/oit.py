@@ -0,0 +1,296 @@
+# Прозрачность без сортировки: weighted blended order-independent transparency
+# (McGuire, Bavoil 2013).
+#
+# Прозрачные объекты рисуются в любом порядке в две цели одного FBO:
+#   accumulation (RGBA16F) += (C * a, a) * w      — glBlendFunci(0, ONE, ONE)
+#   revealage    (R16F)    *= (1 - a)             — glBlendFunci(1, ZERO, ONE_MINUS_SRC_COLOR)
+# где w — вес по глубине фрагмента. Затем один полноэкранный проход composite()
+# смешивает средний цвет accum.rgb / accum.a с уже нарисованной сценой в
+# пропорции (1 - revealage). Стоимость линейна по числу объектов, сортировки
+# на CPU нет.
+#
+# Непрозрачная геометрия должна перекрывать прозрачную, поэтому между
+# begin() и accumulate() вызывающий рисует непрозрачные объекты в глубину
+# (цвет при этом отключён).
+#
+# Запуск как скрипт — сравнение с сортировкой на CPU для N прозрачных
+# икосаэдров, камера вращается, так что порядок меняется каждый кадр:
+#     LIBGL_ALWAYS_SOFTWARE=1 python oit.py --counts 100,1000,10000
+
+import argparse
+import csv
+import re
+import sys
+import time
+
+from OpenGL.GL import *
+from OpenGL.GLU import *
+from OpenGL.GLUT import *
+import numpy as np
+
+import instancing
+import meshes
+import scene
+from shaders import link_program
+
+# Вес по глубине (формула 7 из статьи); |z| в пространстве камеры = 1 / gl_FragCoord.w
+WEIGHTED_OUTPUT = """vec4 oitColor = %s;
+    float oitDepth = 1.0 / gl_FragCoord.w;
+    float oitWeight = oitColor.a * clamp(10.0 / (1e-5 + pow(oitDepth / 5.0, 2.0) + pow(oitDepth / 200.0, 6.0)), 1e-2, 3e3);
+    gl_FragData[0] = vec4(oitColor.rgb * oitColor.a, oitColor.a) * oitWeight;
+    gl_FragData[1] = vec4(oitColor.a);
+"""
+
+_FRAG_COLOR = re.compile(r"gl_FragColor\s*=\s*(.+?);\s*\n", re.S)
+
+vs_composite = """
+#version 130
+void main() { gl_Position = gl_Vertex; }
+"""
+
+fs_composite = """
+#version 130
+uniform sampler2D uAccum;
+uniform sampler2D uReveal;
+
+void main() {
+    ivec2 p = ivec2(gl_FragCoord.xy);
+    float revealage = texelFetch(uReveal, p, 0).r;
+    if (revealage >= 1.0) discard;
+    vec4 accum = texelFetch(uAccum, p, 0);
+    gl_FragColor = vec4(accum.rgb / max(accum.a, 1e-5), revealage);
+}
+"""
+
+prog_composite = None
+_supported = None
+_targets = None
+
+
+# -------------------- Shaders --------------------
+def weighted_fragment(source):
+    """Вариант фрагментного шейдера для OIT: запись gl_FragColor заменяется записью в две цели"""
+    result, n = _FRAG_COLOR.subn(lambda m: WEIGHTED_OUTPUT % m.group(1), source)
+    if n != 1:
+        raise ValueError("ожидалась ровно одна запись gl_FragColor, найдено: %d" % n)
+    return result
+
+
+def supported():
+    """glBlendFunci: ядро OpenGL 4.0+ или расширение ARB_draw_buffers_blend"""
+    global _supported
+    if _supported is None:
+        version = glGetString(GL_VERSION).decode().split()[0]
+        major, minor = (int(v) for v in version.split(".")[:2])
+        extensions = (glGetString(GL_EXTENSIONS) or b"").decode()
+        _supported = (major, minor) >= (4, 0) or "GL_ARB_draw_buffers_blend" in extensions
+    return _supported
+
+
+# -------------------- Targets --------------------
+def _texture(internal_format, fmt, width, height):
+    tex = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, tex)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+    glTexImage2D(GL_TEXTURE_2D, 0, internal_format, width, height, 0, fmt, GL_FLOAT, None)
+    glBindTexture(GL_TEXTURE_2D, 0)
+    return tex
+
+
+def _release_targets():
+    global _targets
+    if _targets is not None:
+        glDeleteFramebuffers(1, [_targets["fbo"]])
+        glDeleteTextures([_targets["accum"], _targets["reveal"]])
+        glDeleteRenderbuffers(1, [_targets["depth"]])
+        _targets = None
+
+
+def _ensure_targets(width, height):
+    """FBO с целями accumulation/revealage и своим буфером глубины; пересоздаётся при смене размера"""
+    global _targets
+    if _targets is not None and _targets["size"] == (width, height):
+        return _targets
+    _release_targets()
+
+    accum = _texture(GL_RGBA16F, GL_RGBA, width, height)
+    reveal = _texture(GL_R16F, GL_RED, width, height)
+    depth = glGenRenderbuffers(1)
+    glBindRenderbuffer(GL_RENDERBUFFER, depth)
+    glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+    glBindRenderbuffer(GL_RENDERBUFFER, 0)
+
+    fbo = glGenFramebuffers(1)
+    glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+    glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, accum, 0)
+    glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT1, GL_TEXTURE_2D, reveal, 0)
+    glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, depth)
+    status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+    glBindFramebuffer(GL_FRAMEBUFFER, 0)
+    if status != GL_FRAMEBUFFER_COMPLETE:
+        raise RuntimeError("OIT FBO incomplete: 0x%X" % status)
+
+    _targets = {"fbo": fbo, "accum": accum, "reveal": reveal, "depth": depth, "size": (width, height)}
+    return _targets
+
+
+# -------------------- Passes --------------------
+def begin(width, height):
+    """Привязать и очистить цели OIT; дальше — непрозрачные объекты только в глубину"""
+    t = _ensure_targets(width, height)
+    glBindFramebuffer(GL_FRAMEBUFFER, t["fbo"])
+    glViewport(0, 0, width, height)
+    glDrawBuffers(2, [GL_COLOR_ATTACHMENT0, GL_COLOR_ATTACHMENT1])
+    glClearBufferfv(GL_COLOR, 0, np.array([0.0, 0.0, 0.0, 0.0], dtype=np.float32))
+    glClearBufferfv(GL_COLOR, 1, np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32))
+    glClear(GL_DEPTH_BUFFER_BIT)
+    glColorMask(GL_FALSE, GL_FALSE, GL_FALSE, GL_FALSE)
+
+
+def accumulate():
+    """Состояние для прозрачных объектов: тест глубины без записи, аддитивное накопление"""
+    glColorMask(GL_TRUE, GL_TRUE, GL_TRUE, GL_TRUE)
+    glPushAttrib(GL_ENABLE_BIT | GL_DEPTH_BUFFER_BIT | GL_COLOR_BUFFER_BIT)
+    glEnable(GL_DEPTH_TEST)
+    glDepthMask(GL_FALSE)
+    glDisable(GL_CULL_FACE)
+    glEnable(GL_BLEND)
+    glBlendFunci(0, GL_ONE, GL_ONE)
+    glBlendFunci(1, GL_ZERO, GL_ONE_MINUS_SRC_COLOR)
+
+
+def end():
+    glPopAttrib()
+    glBindFramebuffer(GL_FRAMEBUFFER, 0)
+
+
+def composite():
+    """Полноэкранный проход: смешать накопленный цвет с текущим кадровым буфером"""
+    global prog_composite
+    if prog_composite is None:
+        prog_composite = link_program(vs_composite, fs_composite)
+
+    glPushAttrib(GL_ENABLE_BIT | GL_DEPTH_BUFFER_BIT | GL_COLOR_BUFFER_BIT | GL_TEXTURE_BIT)
+    glDisable(GL_DEPTH_TEST); glDisable(GL_CULL_FACE); glDisable(GL_LIGHTING)
+    glEnable(GL_BLEND)
+    glBlendFunc(GL_ONE_MINUS_SRC_ALPHA, GL_SRC_ALPHA)
+
+    glUseProgram(prog_composite)
+    glActiveTexture(GL_TEXTURE1)
+    glBindTexture(GL_TEXTURE_2D, _targets["reveal"])
+    glActiveTexture(GL_TEXTURE0)
+    glBindTexture(GL_TEXTURE_2D, _targets["accum"])
+    glUniform1i(glGetUniformLocation(prog_composite, "uAccum"), 0)
+    glUniform1i(glGetUniformLocation(prog_composite, "uReveal"), 1)
+
+    glBegin(GL_QUADS)
+    glVertex2f(-1.0, -1.0); glVertex2f(1.0, -1.0); glVertex2f(1.0, 1.0); glVertex2f(-1.0, 1.0)
+    glEnd()
+
+    glUseProgram(0)
+    glActiveTexture(GL_TEXTURE1); glBindTexture(GL_TEXTURE_2D, 0)
+    glActiveTexture(GL_TEXTURE0); glBindTexture(GL_TEXTURE_2D, 0)
+    glPopAttrib()
+
+
+# -------------------- Benchmark --------------------
+def _orbit_view(extent, frame, width, height):
+    """Камера на орбите: угол меняется каждый кадр, порядок объектов по глубине тоже"""
+    glViewport(0, 0, width, height)
+    glMatrixMode(GL_PROJECTION); glLoadIdentity()
+    gluPerspective(45.0, width / float(height), 0.5, 6.0 * extent)
+    glMatrixMode(GL_MODELVIEW); glLoadIdentity()
+    a = 0.05 * frame
+    eye = (2.0 * extent * np.cos(a), 0.8 * extent, 2.0 * extent * np.sin(a))
+    gluLookAt(*eye, 0, 0, 0, 0, 1, 0)
+    return scene.current_view_projection(), np.array(eye)
+
+
+def _measure(frames, draw_frame):
+    draw_frame(0)
+    glFinish()
+    start = time.perf_counter()
+    for frame in range(1, frames + 1):
+        draw_frame(frame)
+        glutSwapBuffers()
+    glFinish()
+    return frames / (time.perf_counter() - start)
+
+
+def benchmark(counts, frames, width=800, height=600):
+    """FPS прозрачных икосаэдров: сортировка на CPU + обычное смешивание против OIT"""
+    prog_oit = link_program(instancing.vs_instanced, weighted_fragment(instancing.fs_instanced))
+    glEnable(GL_DEPTH_TEST)
+    rows = []
+    for count in counts:
+        inst = instancing.grid_instances(count)
+        inst["color"][:, 3] = 0.35
+        centers = inst["model"][:, 3, :3].astype(np.float64)
+        extent = 3.0 * np.ceil(count ** (1.0 / 3.0))
+        batch = instancing.upload_batch(meshes.icosahedron(), inst)
+        sort_ms = []
+
+        def cpu_sorted(frame):
+            view_proj, eye = _orbit_view(extent, frame, width, height)
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            start = time.perf_counter()
+            order = np.argsort(-np.linalg.norm(centers - eye, axis=1), kind="stable")
+            instancing.update_instances(batch, inst[order])
+            sort_ms.append((time.perf_counter() - start) * 1e3)
+            glPushAttrib(GL_ENABLE_BIT | GL_DEPTH_BUFFER_BIT | GL_COLOR_BUFFER_BIT)
+            glEnable(GL_BLEND); glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+            glDepthMask(GL_FALSE)
+            instancing.draw_batches([batch], view_proj, eye)
+            glPopAttrib()
+
+        def weighted(frame):
+            view_proj, eye = _orbit_view(extent, frame, width, height)
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            begin(width, height)
+            accumulate()
+            instancing.draw_batches([batch], view_proj, eye, program=prog_oit)
+            end()
+            composite()
+
+        fps_sorted = _measure(frames, cpu_sorted)
+        instancing.update_instances(batch, inst)
+        fps_oit = _measure(frames, weighted)
+        rows.append({"objects": count, "sorted_fps": round(fps_sorted, 2), "oit_fps": round(fps_oit, 2),
+                     "sort_upload_ms": round(float(np.mean(sort_ms)), 3),
+                     "speedup": round(fps_oit / fps_sorted, 2)})
+        print(f"{count:>7} | {fps_sorted:>10.1f} | {fps_oit:>7.1f} | {np.mean(sort_ms):>14.3f} | x{fps_oit / fps_sorted:.2f}")
+
+        glDeleteBuffers(3, [batch["vbo"], batch["ibo"], batch["instances"]])
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FPS: weighted blended OIT против сортировки на CPU")
+    parser.add_argument("--counts", default="100,1000,5000,10000")
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--csv", default="oit_report.csv")
+    args = parser.parse_args()
+
+    glutInit(sys.argv)
+    glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH)
+    glutInitWindowSize(800, 600)
+    glutCreateWindow(b"OIT benchmark")
+    if not supported():
+        sys.exit("glBlendFunci недоступна: нужен OpenGL 4.0 или GL_ARB_draw_buffers_blend")
+
+    print("=" * 70)
+    print(f"GL_RENDERER: {glGetString(GL_RENDERER).decode()}")
+    print(f"{'объектов':>7} | {'sorted FPS':>10} | {'OIT FPS':>7} | {'sort+upload, мс':>14} | ускорение")
+    print("=" * 70)
+    rows = benchmark([int(c) for c in args.counts.split(",")], args.frames)
+
+    with open(args.csv, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"✓ Отчёт сохранён: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
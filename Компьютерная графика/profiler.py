@@ -0,0 +1,230 @@
+# Замеры времени кадра для лабораторных: CPU-таймеры участков, GPU-запросы
+# GL_TIME_ELAPSED (если драйвер их поддерживает), скользящая гистограмма
+# времени кадра в HUD и выгрузка трассы в CSV.
+#
+# Использование в display():
+#     profiler.begin_frame()
+#     with profiler.section("depth"):
+#         render_depth_pass(...)
+#     ...
+#     profiler.draw_overlay(window_width, window_height)   # до hud.flush()
+#     glutSwapBuffers()
+#     profiler.end_frame(scheduler.continuous)
+#
+# Время кадра — интервал между соседними end_frame(), но только при
+# непрерывной перерисовке: в режиме «по изменению» (scheduler.continuous =
+# False) в этот интервал входит простой между событиями ввода, поэтому
+# окно и гистограмма строятся по времени display(), а FPS не показывается.
+#
+# CPU-время участка — это время Python на выдачу команд GL, GPU-время —
+# реальное время их выполнения драйвером (результат запроса читается с
+# задержкой в несколько кадров, без остановки конвейера).
+
+import csv
+import time
+from contextlib import contextmanager
+
+from OpenGL.GL import *
+from OpenGL.GLU import *
+import numpy as np
+
+import hud
+
+HISTORY = 240                 # кадров в скользящем окне
+HIST_BINS = 25
+HIST_MAX_MS = 50.0
+TRACE_LIMIT = 100000
+
+enabled = True
+overlay = False
+
+_gpu_supported = None
+_gpu_active = False
+_query_pool = []
+_pending = []                 # (номер кадра, участок, id запроса)
+
+_frame = 0
+_frame_start = None
+_last_end = None
+_frame_times = np.zeros(HISTORY, dtype=np.float64)   # frame_ms или display_ms, см. _window_continuous
+_frame_count = 0
+_window_continuous = True
+_current = {}
+_trace = []
+_sections = []
+
+
+# -------------------- GPU queries --------------------
+def gpu_timer_supported():
+    """GL_TIME_ELAPSED: ядро OpenGL 3.3+ или расширение ARB/EXT_timer_query"""
+    global _gpu_supported
+    if _gpu_supported is None:
+        version = glGetString(GL_VERSION).decode().split()[0]
+        major, minor = (int(v) for v in version.split(".")[:2])
+        extensions = (glGetString(GL_EXTENSIONS) or b"").decode()
+        _gpu_supported = (major, minor) >= (3, 3) or "timer_query" in extensions
+    return _gpu_supported
+
+
+def _collect_queries():
+    """Забрать готовые результаты запросов, не дожидаясь остальных"""
+    still_pending = []
+    for frame, name, q in _pending:
+        if glGetQueryObjectiv(q, GL_QUERY_RESULT_AVAILABLE):
+            ns = int(glGetQueryObjectuiv(q, GL_QUERY_RESULT))
+            if frame < len(_trace):
+                _trace[frame][name + "_gpu_ms"] = ns / 1e6
+            _query_pool.append(q)
+        else:
+            still_pending.append((frame, name, q))
+    _pending[:] = still_pending
+
+
+# -------------------- Frame API --------------------
+def begin_frame():
+    global _frame_start, _current
+    if not enabled:
+        return
+    _frame_start = time.perf_counter()
+    _current = {"frame": _frame}
+    if gpu_timer_supported():
+        _collect_queries()
+
+
+@contextmanager
+def section(name):
+    """CPU-таймер участка кадра и, если возможно, GPU-запрос GL_TIME_ELAPSED"""
+    global _gpu_active
+    if not enabled:
+        yield
+        return
+    if name not in _sections:
+        _sections.append(name)
+
+    query = None
+    if not _gpu_active and gpu_timer_supported():
+        query = _query_pool.pop() if _query_pool else glGenQueries(1)
+        glBeginQuery(GL_TIME_ELAPSED, query)
+        _gpu_active = True
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current[name + "_cpu_ms"] = _current.get(name + "_cpu_ms", 0.0) + (time.perf_counter() - start) * 1e3
+        if query is not None:
+            glEndQuery(GL_TIME_ELAPSED)
+            _gpu_active = False
+            _pending.append((_frame, name, query))
+
+
+def end_frame(continuous=True):
+    """Закрыть кадр: время display() и, при непрерывной перерисовке, время кадра (между end_frame)"""
+    global _frame, _last_end, _frame_count, _window_continuous
+    if not enabled or _frame_start is None:
+        return
+    now = time.perf_counter()
+    display_ms = (now - _frame_start) * 1e3
+    _current["display_ms"] = display_ms
+    if continuous != _window_continuous:
+        # В окне не смешиваются интервалы кадров и времена display()
+        _window_continuous = continuous
+        _frame_count = 0
+    if not continuous:
+        _frame_times[_frame_count % HISTORY] = display_ms
+        _frame_count += 1
+        _last_end = None
+    elif _last_end is not None:
+        frame_ms = (now - _last_end) * 1e3
+        _current["frame_ms"] = frame_ms
+        _frame_times[_frame_count % HISTORY] = frame_ms
+        _frame_count += 1
+        _last_end = now
+    else:
+        _last_end = now
+    _current["t"] = now
+    if len(_trace) < TRACE_LIMIT:
+        _trace.append(_current)
+    _frame += 1
+
+
+def recent_frame_times():
+    n = min(_frame_count, HISTORY)
+    return _frame_times[:n] if _frame_count <= HISTORY else np.roll(_frame_times, -(_frame_count % HISTORY))
+
+
+def summary():
+    """Средние по скользящему окну: fps (None в режиме «по изменению»), p95 окна и миллисекунды по участкам"""
+    times = recent_frame_times()
+    fps = 1000.0 / times.mean() if len(times) else 0.0
+    result = {"fps": fps if _window_continuous else None,
+              "p95_ms": float(np.percentile(times, 95)) if len(times) else 0.0}
+    rows = _trace[-HISTORY:]
+    for name in _sections:
+        for kind in ("cpu", "gpu"):
+            values = [r[f"{name}_{kind}_ms"] for r in rows if f"{name}_{kind}_ms" in r]
+            if values:
+                result[f"{name}_{kind}_ms"] = float(np.mean(values))
+    return result
+
+
+# -------------------- Overlay --------------------
+def draw_overlay(window_width, window_height, x=None, y=None):
+    """Гистограмма времени кадра и строки с таймингами (текст уходит в hud)"""
+    if not overlay:
+        return
+    x = window_width - 320 if x is None else x
+    y = window_height - 30 if y is None else y
+    s = summary()
+
+    if _window_continuous:
+        hud.text(x, y, f"FPS: {s['fps']:.1f}   p95 frame: {s['p95_ms']:.2f} ms")
+    else:
+        hud.text(x, y, f"FPS: n/a (on change)   p95 display: {s['p95_ms']:.2f} ms")
+    line = y - 18
+    for name in _sections:
+        cpu = s.get(f"{name}_cpu_ms")
+        gpu = s.get(f"{name}_gpu_ms")
+        gpu_str = f"{gpu:.2f}" if gpu is not None else "n/a"
+        hud.text(x, line, f"{name}: CPU {cpu or 0.0:.2f} ms / GPU {gpu_str} ms")
+        line -= 16
+
+    # Столбцы гистограммы: 0..HIST_MAX_MS, последний столбец — всё, что дольше
+    times = np.minimum(recent_frame_times(), HIST_MAX_MS - 1e-6)
+    counts, _ = np.histogram(times, bins=HIST_BINS, range=(0.0, HIST_MAX_MS))
+    if counts.max() == 0:
+        return
+    w, h = 300.0, 60.0
+    bx0 = x + np.arange(HIST_BINS) * (w / HIST_BINS)
+    bx1 = bx0 + w / HIST_BINS - 1.0
+    by0 = np.full(HIST_BINS, line - h)
+    by1 = by0 + h * counts / counts.max()
+    quads = np.stack([bx0, by0, bx1, by0, bx1, by1, bx0, by1], axis=1).reshape(-1, 2).astype(np.float32)
+    kind = "frame" if _window_continuous else "display"
+    hud.text(x, line - h - 16, f"{kind} time histogram, 0..{HIST_MAX_MS:.0f} ms")
+
+    glPushAttrib(GL_ENABLE_BIT | GL_CURRENT_BIT)
+    glUseProgram(0)
+    glDisable(GL_DEPTH_TEST); glDisable(GL_LIGHTING); glDisable(GL_TEXTURE_2D); glDisable(GL_CULL_FACE)
+    glMatrixMode(GL_PROJECTION); glPushMatrix(); glLoadIdentity(); gluOrtho2D(0, window_width, 0, window_height)
+    glMatrixMode(GL_MODELVIEW); glPushMatrix(); glLoadIdentity()
+    glColor3f(0.2, 0.9, 0.3)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(2, GL_FLOAT, 0, quads)
+    glDrawArrays(GL_QUADS, 0, len(quads))
+    glDisableClientState(GL_VERTEX_ARRAY)
+    glPopMatrix(); glMatrixMode(GL_PROJECTION); glPopMatrix(); glMatrixMode(GL_MODELVIEW)
+    glPopAttrib()
+
+
+# -------------------- Export --------------------
+def export_csv(path):
+    """Трасса по кадрам: frame, t, frame_ms, display_ms, <участок>_cpu_ms, <участок>_gpu_ms"""
+    columns = ["frame", "t", "frame_ms", "display_ms"]
+    for name in _sections:
+        columns += [f"{name}_cpu_ms", f"{name}_gpu_ms"]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(_trace)
+    return len(_trace)
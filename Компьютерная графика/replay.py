@@ -0,0 +1,195 @@
+# Воспроизводимый прогон лабораторных по заданному сценарию камеры и света.
+#
+# Вместо ручного перетаскивания мышью сценарий меняет те же глобальные
+# переменные модуля лабы, что и callback-и GLUT (rotation_x, rotation_y, zoom,
+# light_*), и нажимает те же клавиши через lab.keyboard() (пресеты света 7/8,
+# тени O, PCF P, текстура T). Каждый кадр рисуется настоящим display(), затем
+# фиксируются время кадра и контрольные суммы изображения:
+#   sha1   — точная, по всем пикселям;
+#   coarse — по сетке 16x16 средних цветов (4 бита на канал), устойчива к
+#            отличиям растеризации в последних битах между драйверами.
+# С --baseline прогон сравнивается с предыдущим CSV: расхождение coarse или
+# замедление сверх --tolerance даёт код возврата 1.
+#
+#     python replay.py lab3 --csv replay_lab3.csv
+#     python replay.py lab3 --baseline replay_lab3.csv
+
+import argparse
+import csv
+import hashlib
+import importlib.util
+import os
+import sys
+import time
+
+import glconfig  # до первого импорта OpenGL: --production отключает проверку ошибок PyOpenGL
+from OpenGL.GL import *
+from OpenGL.GLUT import *
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Сегмент: name, frames, keys (нажимаются в начале сегмента),
+# lerp: {глобальная переменная: (начало, конец)} — линейно по кадрам сегмента
+LAB2_SCRIPT = [
+    {"name": "orbit", "keys": b"r", "frames": 120, "lerp": {"rotation_y": (45.0, 405.0)}},
+    {"name": "dolly", "frames": 60, "lerp": {"rotation_x": (30.0, 75.0), "zoom": (1.0, 0.6)}},
+    {"name": "light-sweep", "keys": b"r", "frames": 60, "lerp": {"light_x": (-6.0, 6.0)}},
+    {"name": "red-light", "keys": b"1", "frames": 20},
+    {"name": "no-texture", "keys": b"5t", "frames": 20},
+    {"name": "restore", "keys": b"t", "frames": 10},
+]
+
+LAB3_SCRIPT = [
+    {"name": "orbit", "keys": b"r", "frames": 120, "lerp": {"rotation_y": (45.0, 405.0)}},
+    {"name": "dolly", "frames": 60, "lerp": {"rotation_x": (30.0, 75.0), "zoom": (1.0, 0.6)}},
+    {"name": "preset-7", "keys": b"r7", "frames": 60, "lerp": {"rotation_y": (45.0, 135.0)}},
+    {"name": "preset-8", "keys": b"8", "frames": 60, "lerp": {"rotation_y": (135.0, 225.0)}},
+    {"name": "light-rise", "keys": b"r", "frames": 40, "lerp": {"light_y": (4.0, 12.0)}},
+    {"name": "no-pcf", "keys": b"p", "frames": 30},
+    {"name": "no-shadows", "keys": b"o", "frames": 30},
+    {"name": "restore", "keys": b"op", "frames": 10},
+]
+
+LABS = {
+    "lab2": {"path": "lab2/lab2.py", "mode": GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH | GLUT_ALPHA, "script": LAB2_SCRIPT},
+    "lab3": {"path": "lab3/lab3.py", "mode": GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH | GLUT_MULTISAMPLE, "script": LAB3_SCRIPT},
+}
+
+
+# -------------------- Checksums --------------------
+def read_frame(width, height):
+    """Только что показанный кадр (передний буфер), (H, W, 3) uint8 снизу вверх"""
+    glReadBuffer(GL_FRONT)
+    glPixelStorei(GL_PACK_ALIGNMENT, 1)
+    pixels = glReadPixels(0, 0, width, height, GL_RGB, GL_UNSIGNED_BYTE)
+    return np.frombuffer(pixels, dtype=np.uint8).reshape(height, width, 3)
+
+
+def coarse_hash(image, grid=16):
+    """Хэш средних цветов по сетке grid x grid, 4 бита на канал"""
+    h, w = image.shape[0] // grid * grid, image.shape[1] // grid * grid
+    blocks = image[:h, :w].reshape(grid, h // grid, grid, w // grid, 3).mean(axis=(1, 3))
+    return hashlib.sha1((blocks.astype(np.uint8) >> 4).tobytes()).hexdigest()[:16]
+
+
+# -------------------- Replay --------------------
+def load_lab(name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, LABS[name]["path"]))
+    lab = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(lab)
+    return lab
+
+
+def frames_of(script):
+    """(номер сегмента, сегмент, t в [0, 1]) для каждого кадра сценария"""
+    for i, segment in enumerate(script):
+        n = segment.get("frames", 1)
+        for k in range(n):
+            yield i, segment, (k / (n - 1) if n > 1 else 1.0)
+
+
+def apply(lab, segment, t, first):
+    """Изменить состояние лабы так же, как это сделали бы callback-и"""
+    if first:
+        for key in segment.get("keys", b""):
+            lab.keyboard(bytes([key]), 0, 0)
+    for name, (a, b) in segment.get("lerp", {}).items():
+        setattr(lab, name, a + (b - a) * t)
+
+
+def replay(lab, script, warmup=5):
+    """Прогон сценария; строки: frame, segment, display_ms, finish_ms, frame_ms, sha1, coarse"""
+    width, height = lab.window_width, lab.window_height
+    for _ in range(warmup):
+        lab.display()
+    glFinish()
+
+    rows = []
+    prev = None
+    for frame, (i, segment, t) in enumerate(frames_of(script)):
+        apply(lab, segment, t, first=(i != prev))
+        prev = i
+        start = time.perf_counter()
+        lab.display()
+        issued = time.perf_counter()
+        glFinish()
+        done = time.perf_counter()
+
+        image = read_frame(width, height)
+        rows.append({"frame": frame, "segment": segment["name"],
+                     "display_ms": round((issued - start) * 1e3, 3),
+                     "finish_ms": round((done - issued) * 1e3, 3),
+                     "frame_ms": round((done - start) * 1e3, 3),
+                     "sha1": hashlib.sha1(image.tobytes()).hexdigest(),
+                     "coarse": coarse_hash(image)})
+    return rows
+
+
+def compare(rows, baseline_path, tolerance):
+    """Расхождения изображений и времени кадра с прошлым прогоном; True, если всё в порядке"""
+    with open(baseline_path, newline="") as f:
+        baseline = list(csv.DictReader(f))
+    if len(baseline) != len(rows):
+        print(f"✗ Число кадров отличается: {len(rows)} против {len(baseline)} в {baseline_path}")
+        return False
+
+    changed = [r["frame"] for r, b in zip(rows, baseline) if r["coarse"] != b["coarse"]]
+    exact = sum(r["sha1"] == b["sha1"] for r, b in zip(rows, baseline))
+    print(f"Изображения: {exact}/{len(rows)} совпадают побитово, {len(changed)} отличаются по coarse")
+    if changed:
+        print(f"  кадры: {changed[:20]}{' ...' if len(changed) > 20 else ''}")
+
+    ok = not changed
+    print(f"{'сегмент':>12} | {'было, мс':>9} | {'стало, мс':>9} | изменение")
+    for name in dict.fromkeys(r["segment"] for r in rows):
+        before = np.median([float(b["frame_ms"]) for b in baseline if b["segment"] == name])
+        after = np.median([r["frame_ms"] for r in rows if r["segment"] == name])
+        delta = after / before - 1.0 if before > 0 else 0.0
+        flag = "  ✗" if delta > tolerance else ""
+        ok = ok and delta <= tolerance
+        print(f"{name:>12} | {before:>9.2f} | {after:>9.2f} | {delta * 100:+.1f}%{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Воспроизводимый прогон лабы по сценарию камеры и света")
+    parser.add_argument("lab", choices=sorted(LABS))
+    parser.add_argument("--csv", default=None, help="по умолчанию replay_<lab>.csv")
+    parser.add_argument("--baseline", default=None, help="CSV прошлого прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое замедление сегмента (доля)")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--size", default=None, help="размер окна WxH")
+    args = parser.parse_args()
+
+    lab = load_lab(args.lab)
+    if args.size:
+        lab.window_width, lab.window_height = (int(v) for v in args.size.lower().split("x"))
+
+    glutInit([sys.argv[0]])
+    glutInitDisplayMode(LABS[args.lab]["mode"])
+    glutInitWindowSize(lab.window_width, lab.window_height)
+    glutCreateWindow(f"Replay: {args.lab}".encode())
+    lab.init_opengl()
+    if hasattr(lab, "reshape"):
+        lab.reshape(lab.window_width, lab.window_height)
+
+    rows = replay(lab, LABS[args.lab]["script"], args.warmup)
+    times = np.array([r["frame_ms"] for r in rows])
+    print(f"{args.lab}: {len(rows)} кадров, frame {times.mean():.2f} ms (p95 {np.percentile(times, 95):.2f} ms)")
+
+    path = args.csv or f"replay_{args.lab}.csv"
+    ok = True
+    if args.baseline:
+        ok = compare(rows, args.baseline, args.tolerance)
+    if not args.baseline or os.path.abspath(path) != os.path.abspath(args.baseline):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"✓ Отчёт сохранён: {path}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Общее описание сцен для лабораторных по компьютерной графике.
+#
+# Сцена задаётся декларативно (словарь: камера, источники света, материалы,
+# объекты с трансформациями) и загружается один раз через load_scene().
+# Рендерер обходит загруженную сцену для любого прохода (теневого или
+# основного): отсекает объекты по пирамиде видимости, сортирует непрозрачные
+# по состоянию (меш, материал), а прозрачные — от дальних к ближним.
+#
+# Разбор описания и порядок отрисовки — в scenegraph.py (без OpenGL); здесь
+# к объектам добавляются функции отрисовки GLUT и сам проход по ним.
+
+from OpenGL.GL import *
+from OpenGL.GLUT import *
+import numpy as np
+
+import scenegraph
+from scenegraph import draw_order, visible
+
+
+# -------------------- Meshes --------------------
+def draw_plane(size=20.0, y=0.0):
+    """Горизонтальная плоскость (пол) с нормалью вверх"""
+    glBegin(GL_QUADS)
+    glNormal3f(0, 1, 0)
+    glVertex3f(-size, y, -size)
+    glVertex3f( size, y, -size)
+    glVertex3f( size, y,  size)
+    glVertex3f(-size, y,  size)
+    glEnd()
+
+
+# mesh -> (сплошная отрисовка, каркасная отрисовка)
+MESHES = {
+    "icosahedron": (glutSolidIcosahedron, glutWireIcosahedron),
+    "teapot":      (glutSolidTeapot, glutWireTeapot),
+    "torus":       (glutSolidTorus, glutWireTorus),
+    "cone":        (glutSolidCone, glutWireCone),
+    "sphere":      (glutSolidSphere, glutWireSphere),
+    "plane":       (draw_plane, draw_plane),
+}
+
+
+# -------------------- Matrices --------------------
+def get_matrix(mode):
+    """Текущая матрица OpenGL (GL_*_MATRIX) в строчном виде numpy"""
+    arr = (GLfloat * 16)()
+    glGetFloatv(mode, arr)
+    return np.array(arr, dtype=np.float32).reshape((4, 4)).T
+
+
+def current_view_projection():
+    """Projection * ModelView для текущего состояния матричных стеков"""
+    return get_matrix(GL_PROJECTION_MATRIX) @ get_matrix(GL_MODELVIEW_MATRIX)
+
+
+# Камера лабораторных (scene.orbit_eye) считается без GL
+orbit_eye = scenegraph.orbit_eye
+
+
+# -------------------- Loading --------------------
+def load_scene(description):
+    """scenegraph.load_scene() и функция отрисовки GLUT для каждого объекта"""
+    loaded = scenegraph.load_scene(description)
+    for node in loaded["nodes"]:
+        solid, wire = MESHES[node["mesh"]]
+        node["draw"] = wire if node["wire"] else solid
+    return loaded
+
+
+# -------------------- Traversal --------------------
+def _draw_nodes(scene, indices, bind_material, bind_model, cull_enabled):
+    current = None
+    for i in indices:
+        node = scene["nodes"][i]
+        if bind_material is not None and node["material_key"] != current:
+            bind_material(node["material"])
+            current = node["material_key"]
+        if cull_enabled and not node["cull"]:
+            glDisable(GL_CULL_FACE)
+        glPushMatrix()
+        glMultMatrixf(node["gl_matrix"])
+        if bind_model is not None:
+            bind_model(node)
+        node["draw"](*node["args"])
+        glPopMatrix()
+        if cull_enabled and not node["cull"]:
+            glEnable(GL_CULL_FACE)
+
+
+def render(scene, view_proj, eye, bind_material=None, bind_model=None, shadow_pass=False, transparent=True):
+    """Отрисовка сцены; возвращает число нарисованных объектов.
+
+    bind_material(material) вызывается только при смене материала,
+    bind_model(node) — перед каждым объектом (например, для uniform uModel).
+    transparent=False — только непрозрачные (прозрачные рисует, например, OIT-проход).
+    """
+    opaque, blended = draw_order(scene, view_proj, eye, shadow_pass)
+    cull_enabled = bool(glIsEnabled(GL_CULL_FACE))
+
+    _draw_nodes(scene, opaque, None if shadow_pass else bind_material, bind_model, cull_enabled)
+
+    if transparent and len(blended):
+        # Прозрачные: без записи глубины, видны обе стороны граней
+        glPushAttrib(GL_ENABLE_BIT | GL_DEPTH_BUFFER_BIT | GL_COLOR_BUFFER_BIT)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        glDepthMask(GL_FALSE)
+        glDisable(GL_CULL_FACE)
+        _draw_nodes(scene, blended, bind_material, bind_model, False)
+        glPopAttrib()
+
+    return len(opaque) + len(blended)
+
+
+def render_transparent_unsorted(scene, view_proj, bind_material=None, bind_model=None):
+    """Прозрачные объекты в порядке описания, без сортировки и без смены состояния смешивания.
+
+    Для order-independent transparency, где порядок отрисовки не влияет на результат.
+    """
+    idx = np.flatnonzero(visible(scene, view_proj) & scene["transparent"])
+    _draw_nodes(scene, idx, bind_material, bind_model, False)
+    return len(idx)
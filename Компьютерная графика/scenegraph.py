@@ -0,0 +1,133 @@
+# Загрузка и обход декларативной сцены без OpenGL (только NumPy).
+#
+# Здесь всё, что не требует контекста GL: матрицы моделей, ограничивающие
+# сферы, пирамида видимости, разбор описания сцены и порядок отрисовки.
+# Этим пользуются и GL-рендерер (scene.py, добавляет к объектам функции
+# отрисовки GLUT), и программный растеризатор softraster.py, которому
+# PyOpenGL, libGL и GLUT не нужны.
+
+import numpy as np
+
+
+# -------------------- Bounds --------------------
+# mesh -> радиус ограничивающей сферы по аргументам отрисовки
+BOUNDS = {
+    "icosahedron": lambda *a: 1.0,
+    "teapot":      lambda size=1.0: 2.0 * size,
+    "torus":       lambda inner, outer, *a: inner + outer,
+    "cone":        lambda base, height, *a: float(np.hypot(base, height)),
+    "sphere":      lambda radius, *a: radius,
+    "plane":       lambda size=20.0, y=0.0: float(np.hypot(size * np.sqrt(2.0), y)),
+}
+
+
+# -------------------- Matrices --------------------
+def model_matrix(translate=None, rotate=None, scale=None):
+    """Матрица модели в порядке OpenGL: glTranslate -> glRotate -> glScale"""
+    m = np.identity(4, dtype=np.float64)
+    if translate is not None:
+        t = np.identity(4)
+        t[:3, 3] = translate
+        m = m @ t
+    if rotate is not None:
+        angle, x, y, z = rotate
+        axis = np.array([x, y, z], dtype=np.float64)
+        axis /= np.linalg.norm(axis)
+        a = np.radians(angle)
+        k = np.array([[0, -axis[2], axis[1]],
+                      [axis[2], 0, -axis[0]],
+                      [-axis[1], axis[0], 0]])
+        r = np.identity(4)
+        r[:3, :3] = np.identity(3) + np.sin(a) * k + (1.0 - np.cos(a)) * (k @ k)
+        m = m @ r
+    if scale is not None:
+        s = np.identity(4)
+        s[0, 0], s[1, 1], s[2, 2] = scale
+        m = m @ s
+    return m.astype(np.float32)
+
+
+def orbit_eye(distance, rotation_x, rotation_y):
+    """Позиция камеры, вращающейся вокруг начала координат"""
+    rx = np.radians(rotation_x)
+    ry = np.radians(rotation_y)
+    cam_x = distance * np.sin(ry) * np.cos(rx)
+    cam_y = distance * np.sin(rx)
+    cam_z = distance * np.cos(ry) * np.cos(rx)
+    return cam_x, cam_y, cam_z
+
+
+def frustum_planes(view_proj):
+    """Шесть плоскостей пирамиды видимости (a, b, c, d), нормали внутрь"""
+    m = np.asarray(view_proj, dtype=np.float64)
+    planes = np.array([m[3] + m[0], m[3] - m[0],
+                       m[3] + m[1], m[3] - m[1],
+                       m[3] + m[2], m[3] - m[2]])
+    return planes / np.linalg.norm(planes[:, :3], axis=1)[:, None]
+
+
+# -------------------- Loading --------------------
+def load_scene(description):
+    """Разбор описания сцены: матрицы, границы и ключи сортировки считаются один раз"""
+    materials = description.get("materials", {})
+    nodes = []
+    for obj in description["objects"]:
+        args = tuple(obj.get("args", ()))
+        model = model_matrix(obj.get("translate"), obj.get("rotate"), obj.get("scale"))
+        material = materials[obj["material"]] if "material" in obj else {}
+        scale = float(np.max(np.linalg.norm(model[:3, :3], axis=0)))
+        nodes.append({
+            "name": obj.get("name", obj["mesh"]),
+            "mesh": obj["mesh"],
+            "wire": obj.get("wire", False),
+            "args": args,
+            "material_key": obj.get("material"),
+            "material": material,
+            "transparent": material.get("alpha", 1.0) < 1.0,
+            "cull": obj.get("cull", True),
+            "cast_shadow": obj.get("cast_shadow", True),
+            "model": model,
+            "gl_matrix": np.ascontiguousarray(model.T),
+            "center": model[:3, 3].astype(np.float64),
+            "radius": BOUNDS[obj["mesh"]](*args) * scale,
+        })
+
+    # Ранг по состоянию: одинаковые меш+материал идут подряд
+    keys = sorted({(n["mesh"], str(n["material_key"]), n["cull"]) for n in nodes})
+    rank = {k: i for i, k in enumerate(keys)}
+
+    return {
+        "camera": dict(description.get("camera", {})),
+        "lights": [dict(l) for l in description.get("lights", [])],
+        "materials": materials,
+        "nodes": nodes,
+        "centers": np.array([n["center"] for n in nodes], dtype=np.float64).reshape(-1, 3),
+        "radii": np.array([n["radius"] for n in nodes], dtype=np.float64),
+        "transparent": np.array([n["transparent"] for n in nodes], dtype=bool),
+        "cast_shadow": np.array([n["cast_shadow"] for n in nodes], dtype=bool),
+        "state_rank": np.array([rank[(n["mesh"], str(n["material_key"]), n["cull"])] for n in nodes], dtype=np.int64),
+    }
+
+
+# -------------------- Traversal --------------------
+def visible(scene, view_proj):
+    """Маска объектов, пересекающих пирамиду видимости (векторно по всем объектам)"""
+    planes = frustum_planes(view_proj)
+    dist = scene["centers"] @ planes[:, :3].T + planes[:, 3]
+    return np.all(dist >= -scene["radii"][:, None], axis=1)
+
+
+def draw_order(scene, view_proj, eye, shadow_pass=False):
+    """Индексы видимых объектов: (непрозрачные по состоянию, прозрачные от дальних к ближним)"""
+    mask = visible(scene, view_proj)
+    if shadow_pass:
+        idx = np.flatnonzero(mask & scene["cast_shadow"])
+        return idx[np.argsort(scene["state_rank"][idx], kind="stable")], idx[:0]
+
+    idx = np.flatnonzero(mask)
+    transparent = scene["transparent"][idx]
+    opaque = idx[~transparent]
+    opaque = opaque[np.argsort(scene["state_rank"][opaque], kind="stable")]
+    blended = idx[transparent]
+    depth = np.linalg.norm(scene["centers"][blended] - np.asarray(eye, dtype=np.float64), axis=1)
+    return opaque, blended[np.argsort(-depth, kind="stable")]
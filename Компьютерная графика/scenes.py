@@ -0,0 +1,34 @@
+# Описания сцен лабораторных — только данные, без OpenGL.
+#
+# Отдельно от самих лабораторных, чтобы их можно было загрузить без PyOpenGL
+# и GLUT: softraster.py рендерит сцену lab3 через scenegraph.py на NumPy,
+# lab3.py — через scene.py.
+
+
+# -------------------- Lab 3 --------------------
+# Начальное состояние камеры (к нему же возвращает клавиша R) и параметры тени
+LAB3_ROTATION_X, LAB3_ROTATION_Y, LAB3_ZOOM = 30.0, 45.0, 1.0
+LAB3_LIGHT_NEAR, LAB3_LIGHT_FAR = 0.5, 60.0
+LAB3_SHADOW_MAP_SIZE = 2048
+LAB3_SHADOW_BIAS = 0.004
+
+LAB3_MATERIALS = {
+    "ico":    {"ambient": (0.10, 0.40, 0.70), "diffuse": (0.20, 0.60, 1.00), "specular": (0.50, 0.50, 0.80), "shininess": 30.0,  "alpha": 0.30},
+    "teapot": {"ambient": (0.25, 0.00, 0.25), "diffuse": (1.00, 0.00, 1.00), "specular": (1.00, 1.00, 1.00), "shininess": 128.0, "alpha": 1.00},
+    "torus":  {"ambient": (0.30, 0.30, 0.30), "diffuse": (0.80, 0.80, 0.80), "specular": (0.10, 0.10, 0.10), "shininess": 5.0,   "alpha": 1.00},
+    "plane":  {"ambient": (0.25, 0.25, 0.25), "diffuse": (0.70, 0.70, 0.70), "specular": (0.05, 0.05, 0.05), "shininess": 4.0,   "alpha": 1.00},
+}
+
+# Единое описание для теневого и основного проходов
+LAB3_SCENE = {
+    "camera": {"distance": 14.0},
+    "lights": [{"position": (5.0, 8.0, 5.0), "color": (1.0, 1.0, 1.0), "intensity": 1.0}],
+    "materials": LAB3_MATERIALS,
+    "objects": [
+        {"name": "floor", "mesh": "plane", "args": (20.0, -1.5), "material": "plane", "cull": False},
+        {"name": "torus", "mesh": "torus", "args": (0.5, 1.5, 30, 40), "material": "torus", "translate": (2.5, 2.0, 0.0)},
+        {"name": "teapot", "mesh": "teapot", "args": (1.5,), "material": "teapot", "translate": (2.5, 2.0, -3.5)},
+        {"name": "icosahedron", "mesh": "icosahedron", "material": "ico",
+         "translate": (-3.0, 2.0, -0.3), "scale": (1.8, 1.8, 1.8)},
+    ],
+}
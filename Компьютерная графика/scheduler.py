@@ -0,0 +1,96 @@
+# Планировщик перерисовки для лабораторных.
+#
+# Callback-и GLUT больше не вызывают glutPostRedisplay на каждое событие:
+# события складываются в очередь (для каждого вида хранится только
+# последнее — например, последняя позиция мыши), а таймер glutTimerFunc с
+# частотой target_fps применяет их одним обновлением состояния и запрашивает
+# не больше одного кадра за тик. В режиме без простоя (continuous=False,
+# по умолчанию) кадр рисуется только если что-то изменилось.
+#
+# Задержка «ввод -> кадр» меряется от первого необработанного события до
+# конца display() (вызов frame_presented() после glutSwapBuffers).
+
+import time
+
+from OpenGL.GLUT import *
+import numpy as np
+
+LATENCY_HISTORY = 256
+
+target_fps = 60
+continuous = False
+
+_handlers = {}
+_pending = {}                 # вид события -> последние аргументы
+_dirty = False
+_input_since = None           # время первого события, ещё не попавшего в кадр
+_frame_input_since = None     # то же для кадра, который сейчас рисуется
+_latencies = np.zeros(LATENCY_HISTORY, dtype=np.float64)
+_latency_count = 0
+
+
+def install(fps=60, handlers=None, continuous_mode=False):
+    """Запуск таймера; handlers: вид события -> функция, применяющая его к состоянию"""
+    global target_fps, continuous
+    target_fps = fps
+    continuous = continuous_mode
+    _handlers.update(handlers or {})
+    glutTimerFunc(_interval_ms(), _tick, 0)
+
+
+def _interval_ms():
+    return max(1, int(round(1000.0 / target_fps)))
+
+
+def _mark_input():
+    global _input_since
+    if _input_since is None:
+        _input_since = time.perf_counter()
+
+
+def post(kind, *args):
+    """Событие ввода: применится на ближайшем тике, повторные события того же вида сливаются"""
+    _pending[kind] = args
+    _mark_input()
+
+
+def request_redraw():
+    """Состояние изменилось — нужен новый кадр (не чаще target_fps)"""
+    global _dirty
+    _dirty = True
+    _mark_input()
+
+
+def _tick(value):
+    global _dirty, _input_since, _frame_input_since
+    glutTimerFunc(_interval_ms(), _tick, 0)
+
+    if _pending:
+        events = dict(_pending)
+        _pending.clear()
+        for kind, args in events.items():
+            _handlers[kind](*args)
+        _dirty = True
+
+    if _dirty or continuous:
+        _dirty = False
+        _frame_input_since, _input_since = _input_since, None
+        glutPostRedisplay()
+
+
+def frame_presented():
+    """Вызывается в конце display(): фиксирует задержку от ввода до кадра"""
+    global _frame_input_since, _latency_count
+    if _frame_input_since is not None:
+        _latencies[_latency_count % LATENCY_HISTORY] = (time.perf_counter() - _frame_input_since) * 1e3
+        _latency_count += 1
+        _frame_input_since = None
+
+
+def latency_stats():
+    """(среднее, p95) задержки ввод -> кадр в мс по последним кадрам"""
+    n = min(_latency_count, LATENCY_HISTORY)
+    if n == 0:
+        return 0.0, 0.0
+    values = _latencies[:n]
+    return float(values.mean()), float(np.percentile(values, 95))
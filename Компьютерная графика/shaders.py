@@ -0,0 +1,132 @@
+# Общие функции компиляции и линковки GLSL-программ для лабораторных.
+#
+# cached_program() хранит слинкованные программы в .shader_cache/<хэш>.npz
+# (glGetProgramBinary) и при следующем запуске загружает их через
+# glProgramBinary без компиляции. Ключ — хэш исходников, #define-ов и строк
+# драйвера (GL_VENDOR/GL_RENDERER/GL_VERSION), так что смена драйвера или
+# шейдера даёт новый ключ. Если драйвер отверг бинарник (обновился
+# компилятор и т. п.), программа собирается из исходников и кэш перезаписывается.
+
+import hashlib
+import os
+
+from OpenGL.GL import *
+from OpenGL.error import GLError
+import numpy as np
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".shader_cache")
+
+cache_enabled = True
+stats = {"hits": 0, "misses": 0, "rejected": 0}
+
+_binary_supported = None
+
+
+def compile_shader(src, stype):
+    s = glCreateShader(stype)
+    glShaderSource(s, src)
+    glCompileShader(s)
+    if glGetShaderiv(s, GL_COMPILE_STATUS) != GL_TRUE:
+        raise RuntimeError(glGetShaderInfoLog(s).decode())
+    return s
+
+def link_program(vs_src, fs_src, retrievable=False):
+    vs = compile_shader(vs_src, GL_VERTEX_SHADER)
+    fs = compile_shader(fs_src, GL_FRAGMENT_SHADER)
+    p = glCreateProgram()
+    glAttachShader(p, vs); glAttachShader(p, fs)
+    if retrievable:
+        glProgramParameteri(p, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
+    glLinkProgram(p)
+    if glGetProgramiv(p, GL_LINK_STATUS) != GL_TRUE:
+        raise RuntimeError(glGetProgramInfoLog(p).decode())
+    glDeleteShader(vs); glDeleteShader(fs)
+    return p
+
+
+# -------------------- Defines --------------------
+def with_defines(src, defines):
+    """Вставка #define после строки #version (она обязана быть первой)"""
+    if not defines:
+        return src
+    lines = "".join(f"#define {name} {value}\n" for name, value in sorted(defines.items()))
+    head, sep, rest = src.lstrip().partition("\n")
+    if head.startswith("#version"):
+        return head + sep + lines + rest
+    return lines + src
+
+
+# -------------------- Binary cache --------------------
+def binary_supported():
+    """glProgramBinary: ядро OpenGL 4.1+ / ARB_get_program_binary и хотя бы один формат"""
+    global _binary_supported
+    if _binary_supported is None:
+        try:
+            _binary_supported = int(glGetIntegerv(GL_NUM_PROGRAM_BINARY_FORMATS)) > 0
+        except GLError:
+            _binary_supported = False
+    return _binary_supported
+
+
+def program_key(vs_src, fs_src, defines=None):
+    """Хэш исходников, #define-ов и драйвера"""
+    h = hashlib.sha1()
+    for part in (vs_src, fs_src, repr(sorted((defines or {}).items()))):
+        h.update(part.encode())
+        h.update(b"\0")
+    for name in (GL_VENDOR, GL_RENDERER, GL_VERSION):
+        h.update(glGetString(name) or b"")
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _load_binary(path):
+    with np.load(path) as data:
+        fmt, blob = int(data["format"]), data["binary"]
+    p = glCreateProgram()
+    glProgramBinary(p, fmt, blob, len(blob))
+    if glGetProgramiv(p, GL_LINK_STATUS) != GL_TRUE:
+        glDeleteProgram(p)
+        return None
+    return p
+
+
+def _save_binary(path, p):
+    size = int(glGetProgramiv(p, GL_PROGRAM_BINARY_LENGTH))
+    if size <= 0:
+        return
+    length = np.zeros(1, dtype=np.int32)
+    fmt = np.zeros(1, dtype=np.uint32)
+    blob = np.zeros(size, dtype=np.uint8)
+    glGetProgramBinary(p, size, length, fmt, blob)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, format=fmt[0], binary=blob[:length[0]])
+    os.replace(tmp, path)
+
+
+def cached_program(vs_src, fs_src, defines=None):
+    """Программа из кэша бинарников, иначе компиляция из исходников с сохранением в кэш"""
+    vs_src, fs_src = with_defines(vs_src, defines), with_defines(fs_src, defines)
+    if not (cache_enabled and binary_supported()):
+        return link_program(vs_src, fs_src)
+
+    path = os.path.join(CACHE_DIR, program_key(vs_src, fs_src, defines) + ".npz")
+    if os.path.exists(path):
+        try:
+            p = _load_binary(path)
+        except (OSError, ValueError, KeyError, GLError):
+            p = None
+        if p is not None:
+            stats["hits"] += 1
+            return p
+        stats["rejected"] += 1
+    else:
+        stats["misses"] += 1
+
+    p = link_program(vs_src, fs_src, retrievable=True)
+    try:
+        _save_binary(path, p)
+    except (OSError, GLError):
+        pass
+    return p
@@ -0,0 +1,489 @@
+# Программный растеризатор на NumPy — эталонный рендер сцены lab3 без GPU.
+#
+# Нужен там, где нет контекста OpenGL (CI): та же сцена (scenes.LAB3_SCENE
+# через scenegraph.py, сетки из meshes.py), то же освещение по Фонгу, что и в fs_scene,
+# и та же выборка из карты теней (смещение uBias, PCF 3x3).
+#
+# Конвейер:
+#   1. треугольники всех объектов в мировых координатах, отсечение задних
+#      граней по нормалям (для теневого прохода — передних, как glCullFace(GL_FRONT));
+#   2. проекция, отсечение ближней плоскостью (векторно: 0, 1 или 2
+#      треугольника на выходе), переход в экранные координаты;
+#   3. разбиение экрана на плитки TILE x TILE; треугольники раскладываются по
+#      плиткам их ограничивающих прямоугольников, и в каждой плитке
+#      барицентрические координаты считаются сразу для пачки треугольников на
+#      все пиксели плитки (K x 3 x P), z-тест — argmin по пачке;
+#   4. результат — буфер видимости (глубина, треугольник, барицентрические),
+#      освещение считается один раз на пиксель, с перспективной коррекцией;
+#   5. прозрачные объекты — от дальних к ближним (scenegraph.draw_order), по
+#      треугольнику в порядке отправки, со смешиванием SRC_ALPHA/ONE_MINUS_SRC_ALPHA.
+# Оси, маркер света и текст HUD не рисуются.
+#
+#     python softraster.py --out softraster_lab3.png
+#     python softraster.py --compare lab3_gl.png
+#     python softraster.py --benchmark
+
+import argparse
+import csv
+import os
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+import meshes
+import scenegraph
+import scenes
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+TILE = 32
+BATCH = 256
+CLEAR_COLOR = (0.18, 0.19, 0.22)
+CAMERA_FOVY, CAMERA_NEAR, CAMERA_FAR = 45.0, 0.1, 80.0     # как в lab3.begin_camera_view
+
+MESH_BUILDERS = {
+    "torus": meshes.torus,
+    "teapot": meshes.teapot,
+    "sphere": meshes.sphere,
+    "icosahedron": meshes.icosahedron,
+    "plane": meshes.plane,
+}
+
+
+# -------------------- Matrices --------------------
+def perspective(fovy, aspect, near, far):
+    """То же, что gluPerspective"""
+    f = 1.0 / np.tan(np.radians(fovy) / 2.0)
+    m = np.zeros((4, 4))
+    m[0, 0], m[1, 1] = f / aspect, f
+    m[2, 2], m[2, 3] = (far + near) / (near - far), 2.0 * far * near / (near - far)
+    m[3, 2] = -1.0
+    return m
+
+
+def look_at(eye, target=(0.0, 0.0, 0.0), up=(0.0, 1.0, 0.0)):
+    """То же, что gluLookAt"""
+    eye = np.asarray(eye, dtype=np.float64)
+    f = np.asarray(target, dtype=np.float64) - eye
+    f /= np.linalg.norm(f)
+    s = np.cross(f, up)
+    s /= np.linalg.norm(s)
+    u = np.cross(s, f)
+    m = np.identity(4)
+    m[0, :3], m[1, :3], m[2, :3] = s, u, -f
+    m[:3, 3] = -m[:3, :3] @ eye
+    return m
+
+
+# -------------------- Geometry --------------------
+def mesh_for(name, args):
+    """Сетка из meshes.py для меша описания сцены"""
+    if name not in MESH_BUILDERS:
+        raise KeyError(f"меш '{name}' не поддерживается программным растеризатором")
+    return MESH_BUILDERS[name](*args)
+
+
+def build_geometry(loaded):
+    """Треугольники всех объектов загруженной сцены в мировых координатах"""
+    built = {}
+    positions, normals, owner = [], [], []
+    for i, node in enumerate(loaded["nodes"]):
+        key = (node["mesh"], node["args"])
+        if key not in built:
+            built[key] = mesh_for(*key)
+        mesh = built[key]
+        model = node["model"].astype(np.float64)
+        pos = mesh["positions"] @ model[:3, :3].T + model[:3, 3]
+        nrm = mesh["normals"] @ np.linalg.inv(model[:3, :3])
+        nrm /= np.maximum(np.linalg.norm(nrm, axis=1, keepdims=True), 1e-12)
+        idx = mesh["indices"].reshape(-1, 3)
+        positions.append(pos[idx])
+        normals.append(nrm[idx])
+        owner.append(np.full(len(idx), i))
+
+    nodes = loaded["nodes"]
+    return {
+        "positions": np.concatenate(positions),
+        "normals": np.concatenate(normals),
+        "node": np.concatenate(owner),
+        "cull": np.array([n["cull"] for n in nodes], dtype=bool),
+        "ka": np.array([n["material"]["ambient"] for n in nodes], dtype=np.float64),
+        "kd": np.array([n["material"]["diffuse"] for n in nodes], dtype=np.float64),
+        "ks": np.array([n["material"]["specular"] for n in nodes], dtype=np.float64),
+        "shininess": np.array([n["material"]["shininess"] for n in nodes], dtype=np.float64),
+        "alpha": np.array([n["material"].get("alpha", 1.0) for n in nodes], dtype=np.float64),
+    }
+
+
+def _facing(geometry, viewpoint):
+    """Грань обращена к точке viewpoint (по средней нормали вершин — не зависит от обхода)"""
+    centroid = geometry["positions"].mean(axis=1)
+    n = geometry["normals"].sum(axis=1)
+    return np.einsum("ij,ij->i", n, np.asarray(viewpoint) - centroid) > 0.0
+
+
+# -------------------- Projection --------------------
+def clip_near(clip, attrs):
+    """Отсечение ближней плоскостью (z + w >= 0); возвращает (clip, attrs, исходный треугольник)"""
+    d = clip[..., 2] + clip[..., 3]
+    inside = d >= 0.0
+    n_in = inside.sum(axis=1)
+    src = np.arange(len(clip))
+    out = [(clip[n_in == 3], attrs[n_in == 3], src[n_in == 3])]
+
+    for count, lone_inside in ((1, True), (2, False)):
+        sel = n_in == count
+        if not sel.any():
+            continue
+        # Поворот вершин: «одинокая» вершина — первая (обход сохраняется)
+        lone = np.argmax(inside[sel] == lone_inside, axis=1)
+        order = (lone[:, None] + np.arange(3)) % 3
+        v = np.take_along_axis(np.concatenate([clip[sel], attrs[sel]], axis=2), order[..., None], axis=1)
+        dd = np.take_along_axis(d[sel], order, axis=1)
+        t01 = (dd[:, 0] / (dd[:, 0] - dd[:, 1]))[:, None]
+        t02 = (dd[:, 0] / (dd[:, 0] - dd[:, 2]))[:, None]
+        p01 = v[:, 0] + (v[:, 1] - v[:, 0]) * t01
+        p02 = v[:, 0] + (v[:, 2] - v[:, 0]) * t02
+        if count == 1:
+            tris = np.stack([v[:, 0], p01, p02], axis=1)
+            tsrc = src[sel]
+        else:
+            tris = np.concatenate([np.stack([p01, v[:, 1], v[:, 2]], axis=1),
+                                   np.stack([p01, v[:, 2], p02], axis=1)])
+            tsrc = np.concatenate([src[sel], src[sel]])
+        out.append((tris[..., :4], tris[..., 4:], tsrc))
+
+    return tuple(np.concatenate(parts) for parts in zip(*out))
+
+
+def project(positions, attrs, view_proj, width, height):
+    """Экранные треугольники: sx, sy, sz (T, 3), 1/w, атрибуты, исходный треугольник, рёбра"""
+    vp = np.asarray(view_proj, dtype=np.float64)
+    clip = positions @ vp[:, :3].T + vp[:, 3]
+    clip, attrs, src = clip_near(clip, attrs)
+
+    inv_w = 1.0 / clip[..., 3]
+    sx = (clip[..., 0] * inv_w * 0.5 + 0.5) * width
+    sy = (clip[..., 1] * inv_w * 0.5 + 0.5) * height
+    sz = clip[..., 2] * inv_w * 0.5 + 0.5
+
+    # Обход против часовой стрелки для всех треугольников (отсечение граней уже сделано)
+    area = (sx[:, 1] - sx[:, 0]) * (sy[:, 2] - sy[:, 0]) - (sx[:, 2] - sx[:, 0]) * (sy[:, 1] - sy[:, 0])
+    swap = np.where(area[:, None] < 0.0, [[0, 2, 1]], [[0, 1, 2]])
+    sx, sy, sz, inv_w = (np.take_along_axis(a, swap, axis=1) for a in (sx, sy, sz, inv_w))
+    attrs = np.take_along_axis(attrs, swap[..., None], axis=1)
+
+    keep = ((np.abs(area) > 1e-9) & (sx.max(1) >= 0) & (sx.min(1) < width)
+            & (sy.max(1) >= 0) & (sy.min(1) < height))
+    tri = {"sx": sx[keep], "sy": sy[keep], "sz": sz[keep], "inv_w": inv_w[keep],
+           "attrs": attrs[keep], "src": src[keep]}
+    tri.update(_edges(tri["sx"], tri["sy"]))
+    return tri
+
+
+def _edges(sx, sy):
+    """Коэффициенты b_i(x, y) = A_i x + B_i y + C_i — барицентрические координаты"""
+    x0, x1, x2 = sx.T
+    y0, y1, y2 = sy.T
+    area = ((x1 - x0) * (y2 - y0) - (x2 - x0) * (y1 - y0))[:, None]
+    return {
+        "A": np.stack([y1 - y2, y2 - y0, y0 - y1], axis=1) / area,
+        "B": np.stack([x2 - x1, x0 - x2, x1 - x0], axis=1) / area,
+        "C": np.stack([x1 * y2 - x2 * y1, x2 * y0 - x0 * y2, x0 * y1 - x1 * y0], axis=1) / area,
+    }
+
+
+# -------------------- Rasterization --------------------
+def _cover(tri, k, x0, x1, y0, y1):
+    """Барицентрические (K, 3, P) и глубина (K, P) пачки треугольников k в прямоугольнике; inf — мимо"""
+    xs = np.arange(x0, x1) + 0.5
+    ys = np.arange(y0, y1) + 0.5
+    px = np.tile(xs, len(ys))
+    py = np.repeat(ys, len(xs))
+    b = tri["A"][k][:, :, None] * px + tri["B"][k][:, :, None] * py + tri["C"][k][:, :, None]
+    z = np.einsum("kip,ki->kp", b, tri["sz"][k])
+    inside = (b >= 0.0).all(axis=1) & (z >= 0.0) & (z <= 1.0)
+    return b, np.where(inside, z, np.inf)
+
+
+def _bins(tri, width, height, tile):
+    """Пары (плитка, треугольник), сгруппированные по плиткам в порядке отправки треугольников"""
+    ntx = (width + tile - 1) // tile
+    tx0 = np.clip(np.floor(tri["sx"].min(1)), 0, width - 1).astype(np.int64) // tile
+    tx1 = np.clip(np.floor(tri["sx"].max(1)), 0, width - 1).astype(np.int64) // tile
+    ty0 = np.clip(np.floor(tri["sy"].min(1)), 0, height - 1).astype(np.int64) // tile
+    ty1 = np.clip(np.floor(tri["sy"].max(1)), 0, height - 1).astype(np.int64) // tile
+
+    span_x = tx1 - tx0 + 1
+    counts = span_x * (ty1 - ty0 + 1)
+    ids = np.repeat(np.arange(len(counts)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    tiles = (np.repeat(ty0, counts) + local // np.repeat(span_x, counts)) * ntx \
+        + np.repeat(tx0, counts) + local % np.repeat(span_x, counts)
+
+    order = np.argsort(tiles, kind="stable")
+    tiles, ids = tiles[order], ids[order]
+    starts = np.flatnonzero(np.r_[True, tiles[1:] != tiles[:-1]])
+    ends = np.r_[starts[1:], len(tiles)]
+    return ntx, [(int(tiles[s]), ids[s:e]) for s, e in zip(starts, ends)]
+
+
+def rasterize(tri, width, height, tile=TILE, batch=BATCH):
+    """Z-буфер по плиткам: (глубина (H, W), треугольник (H, W) или -1, барицентрические (H, W, 3))"""
+    depth = np.ones((height, width), dtype=np.float64)
+    ids = np.full((height, width), -1, dtype=np.int64)
+    bary = np.zeros((height, width, 3), dtype=np.float64)
+    if len(tri["sx"]) == 0:
+        return depth, ids, bary
+
+    ntx, bins = _bins(tri, width, height, tile)
+    for tile_id, tris in bins:
+        ty, tx = divmod(tile_id, ntx)
+        x0, y0 = tx * tile, ty * tile
+        x1, y1 = min(x0 + tile, width), min(y0 + tile, height)
+        zt = depth[y0:y1, x0:x1].reshape(-1).copy()
+        it = ids[y0:y1, x0:x1].reshape(-1).copy()
+        bt = bary[y0:y1, x0:x1].reshape(-1, 3).copy()
+        pixels = np.arange(len(zt))
+        for s in range(0, len(tris), batch):
+            k = tris[s:s + batch]
+            b, z = _cover(tri, k, x0, x1, y0, y1)
+            nearest = np.argmin(z, axis=0)          # при равенстве — раньше отправленный, как GL_LESS
+            zn = z[nearest, pixels]
+            hit = np.flatnonzero(zn < zt)
+            zt[hit] = zn[hit]
+            it[hit] = k[nearest[hit]]
+            bt[hit] = b[nearest[hit], :, hit]
+        depth[y0:y1, x0:x1] = zt.reshape(y1 - y0, x1 - x0)
+        ids[y0:y1, x0:x1] = it.reshape(y1 - y0, x1 - x0)
+        bary[y0:y1, x0:x1] = bt.reshape(y1 - y0, x1 - x0, 3)
+    return depth, ids, bary
+
+
+def interpolate(tri, t, b):
+    """Атрибуты вершин в пикселях с перспективной коррекцией (по 1/w)"""
+    w = b * tri["inv_w"][t]
+    w /= w.sum(axis=1, keepdims=True)
+    return np.einsum("ni,nic->nc", w, tri["attrs"][t])
+
+
+# -------------------- Shading --------------------
+def shadow_factor(pos, light_vp, shadow_map, bias, pcf):
+    """Как computeShadow() в fs_scene: 0 — освещено, 1 — в тени"""
+    vp = np.asarray(light_vp, dtype=np.float64)
+    h = pos @ vp[:, :3].T + vp[:, 3]
+    proj = h[:, :3] / h[:, 3:4] * 0.5 + 0.5
+    size = shadow_map.shape[0]
+    outside = (proj[:, :2] < 0.0).any(axis=1) | (proj[:, :2] > 1.0).any(axis=1) | (proj[:, 2] > 1.0)
+
+    taps = [(x, y) for x in (-1, 0, 1) for y in (-1, 0, 1)] if pcf else [(0, 0)]
+    s = np.zeros(len(pos))
+    for x, y in taps:
+        u = np.clip(np.floor((proj[:, 0] + x / size) * size), 0, size - 1).astype(np.int64)
+        v = np.clip(np.floor((proj[:, 1] + y / size) * size), 0, size - 1).astype(np.int64)
+        s += (proj[:, 2] - bias) > shadow_map[v, u]
+    return np.where(outside, 0.0, s / len(taps))
+
+
+def phong(geometry, node, pos, normal, eye, light, shadow):
+    """Освещение как в main() fs_scene (в мировых координатах — результат тот же)"""
+    n = normal / np.maximum(np.linalg.norm(normal, axis=1, keepdims=True), 1e-12)
+    v = np.asarray(eye) - pos
+    v /= np.linalg.norm(v, axis=1, keepdims=True)
+    l = np.asarray(light["position"]) - pos
+    l /= np.linalg.norm(l, axis=1, keepdims=True)
+
+    ndl_raw = np.einsum("ij,ij->i", n, l)
+    ndl = np.maximum(ndl_raw, 0.0)
+    r = 2.0 * ndl_raw[:, None] * n - l
+    spec = np.where(ndl > 0.0, np.maximum(np.einsum("ij,ij->i", r, v), 0.0) ** geometry["shininess"][node], 0.0)
+
+    color = geometry["ka"][node] + (1.0 - shadow)[:, None] * (geometry["kd"][node] * ndl[:, None]
+                                                             + geometry["ks"][node] * spec[:, None])
+    return np.clip(color * np.asarray(light["color"]) * light["intensity"], 0.0, 1.0)
+
+
+# -------------------- Frame --------------------
+def render_shadow_map(geometry, loaded, light_vp, light_pos, size, tile=TILE):
+    """Глубина из точки света; как в lab3 — отсекаются передние грани"""
+    node = geometry["node"]
+    mask = loaded["cast_shadow"][node] & (~_facing(geometry, light_pos) | ~geometry["cull"][node])
+    tri = project(geometry["positions"][mask], geometry["positions"][mask], light_vp, size, size)
+    depth, _, _ = rasterize(tri, size, size, tile)
+    return depth, len(tri["sx"])
+
+
+def render(geometry, loaded, camera, light, width, height, shadow_map=None, bias=0.004, pcf=True, tile=TILE):
+    """Кадр (H, W, 3) float в [0, 1], строки снизу вверх как у glReadPixels; и число треугольников"""
+    node = geometry["node"]
+    eye, view_proj = camera["eye"], camera["view_proj"]
+    transparent = geometry["alpha"][node] < 1.0
+    attrs = np.concatenate([geometry["positions"], geometry["normals"]], axis=2)
+
+    def shade(tri, t, b):
+        values = interpolate(tri, t, b)
+        owner = node[tri["src"][t]]
+        shadow = (shadow_factor(values[:, :3], light["view_proj"], shadow_map, bias, pcf)
+                  if shadow_map is not None else np.zeros(len(t)))
+        return phong(geometry, owner, values[:, :3], values[:, 3:], eye, light, shadow), owner
+
+    # Непрозрачные: буфер видимости, освещение по одному разу на пиксель
+    mask = ~transparent & (_facing(geometry, eye) | ~geometry["cull"][node])
+    tri = project(geometry["positions"][mask], attrs[mask], view_proj, width, height)
+    tri["src"] = np.flatnonzero(mask)[tri["src"]]
+    depth, ids, bary = rasterize(tri, width, height, tile)
+    triangles = len(tri["sx"])
+
+    image = np.empty((height, width, 3))
+    image[:] = CLEAR_COLOR
+    covered = ids >= 0
+    image[covered] = shade(tri, ids[covered], bary[covered])[0]
+
+    # Прозрачные: объекты от дальних к ближним, треугольники в порядке отправки, без записи глубины
+    _, blended = scenegraph.draw_order(loaded, view_proj, eye)
+    for index in blended:
+        sel = np.flatnonzero(node == index)
+        tri = project(geometry["positions"][sel], attrs[sel], view_proj, width, height)
+        tri["src"] = sel[tri["src"]]
+        triangles += len(tri["sx"])
+        for t in range(len(tri["sx"])):
+            x0 = max(int(np.floor(tri["sx"][t].min())), 0)
+            x1 = min(int(np.floor(tri["sx"][t].max())) + 1, width)
+            y0 = max(int(np.floor(tri["sy"][t].min())), 0)
+            y1 = min(int(np.floor(tri["sy"][t].max())) + 1, height)
+            b, z = _cover(tri, np.array([t]), x0, x1, y0, y1)
+            region = (slice(y0, y1), slice(x0, x1))
+            hit = np.flatnonzero(z[0] < depth[region].reshape(-1))
+            if len(hit) == 0:
+                continue
+            color, owner = shade(tri, np.full(len(hit), t), b[0][:, hit].T)
+            alpha = geometry["alpha"][owner][:, None]
+            ys, xs = y0 + hit // (x1 - x0), x0 + hit % (x1 - x0)
+            image[ys, xs] = color * alpha + image[ys, xs] * (1.0 - alpha)
+    return image, triangles
+
+
+# -------------------- Lab 3 scene --------------------
+def lab3_frame(width, height, shadows=True, pcf=True, shadow_size=None, tile=TILE):
+    """Кадр lab3 в начальном состоянии (камера, свет, смещение тени); (изображение, статистика)"""
+    loaded = scenegraph.load_scene(scenes.LAB3_SCENE)
+    geometry = build_geometry(loaded)
+
+    start = time.perf_counter()
+    eye = scenegraph.orbit_eye(loaded["camera"]["distance"] * scenes.LAB3_ZOOM,
+                               scenes.LAB3_ROTATION_X, scenes.LAB3_ROTATION_Y)
+    camera = {"eye": np.array(eye),
+              "view_proj": perspective(CAMERA_FOVY, width / float(height), CAMERA_NEAR, CAMERA_FAR) @ look_at(eye)}
+    light = dict(loaded["lights"][0])
+    light["view_proj"] = perspective(60.0, 1.0, scenes.LAB3_LIGHT_NEAR, scenes.LAB3_LIGHT_FAR) @ look_at(light["position"])
+
+    shadow_map, shadow_tris = None, 0
+    if shadows:
+        shadow_map, shadow_tris = render_shadow_map(geometry, loaded, light["view_proj"], light["position"],
+                                                    shadow_size or scenes.LAB3_SHADOW_MAP_SIZE, tile)
+    shadow_done = time.perf_counter()
+    image, triangles = render(geometry, loaded, camera, light, width, height,
+                              shadow_map, scenes.LAB3_SHADOW_BIAS, pcf, tile)
+    stats = {"triangles": triangles, "shadow_triangles": shadow_tris,
+             "shadow_seconds": shadow_done - start, "seconds": time.perf_counter() - shadow_done}
+    return image, stats
+
+
+# -------------------- Images --------------------
+def to_rgb8(image):
+    """float [0, 1] снизу вверх -> uint8 сверху вниз (как в файле изображения)"""
+    return (np.clip(image[::-1], 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+
+def write_png(path, rgb):
+    """PNG без зависимостей (RGB, 8 бит)"""
+    height, width = rgb.shape[:2]
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), rgb.reshape(height, -1)]).tobytes()
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw, 6)))
+        f.write(chunk(b"IEND", b""))
+
+
+def compare(rgb, path):
+    """Средняя абсолютная ошибка и PSNR относительно изображения GL (.png через PIL или .npy)"""
+    if path.endswith(".npy"):
+        other = np.load(path)
+    else:
+        from PIL import Image
+        other = np.asarray(Image.open(path).convert("RGB"))
+    if other.shape != rgb.shape:
+        raise ValueError(f"размеры отличаются: {other.shape} против {rgb.shape}")
+    diff = rgb.astype(np.float64) - other.astype(np.float64)
+    mse = float(np.mean(diff ** 2))
+    psnr = float("inf") if mse == 0 else 10.0 * np.log10(255.0 ** 2 / mse)
+    return float(np.mean(np.abs(diff))), psnr
+
+
+# -------------------- Benchmark --------------------
+def benchmark(sizes, repeat=3):
+    """Основной проход при растущем разрешении; карта теней фиксированного размера — отдельно"""
+    rows = []
+    for width, height in sizes:
+        best = None
+        for _ in range(repeat):
+            _, stats = lab3_frame(width, height)
+            best = stats if best is None or stats["seconds"] < best["seconds"] else best
+        rows.append({"width": width, "height": height, "triangles": best["triangles"],
+                     "ms": round(best["seconds"] * 1e3, 2),
+                     "mtri_per_s": round(best["triangles"] / best["seconds"] / 1e6, 4),
+                     "mpix_per_s": round(width * height / best["seconds"] / 1e6, 3),
+                     "shadow_ms": round(best["shadow_seconds"] * 1e3, 2)})
+        r = rows[-1]
+        print(f"{width:>5}x{height:<5} | {r['triangles']:>7} | {r['ms']:>8.1f} | {r['mtri_per_s']:>9.3f} | "
+              f"{r['mpix_per_s']:>7.2f} | {r['shadow_ms']:>8.1f}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Эталонный программный рендер сцены lab3 (NumPy)")
+    parser.add_argument("--size", default="700x450")
+    parser.add_argument("--out", default="softraster_lab3.png")
+    parser.add_argument("--no-shadows", action="store_true")
+    parser.add_argument("--no-pcf", action="store_true")
+    parser.add_argument("--compare", default=None, help="снимок GL того же размера (.png/.npy)")
+    parser.add_argument("--min-psnr", type=float, default=25.0)
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--csv", default="softraster_report.csv")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print("=" * 72)
+        print(f"{'размер':>11} | {'треуг.':>7} | {'мс/кадр':>8} | {'Мтреуг./с':>9} | {'Мпикс/с':>7} | {'тень, мс':>8}")
+        print("=" * 72)
+        rows = benchmark([(160, 100), (320, 200), (640, 400), (1280, 800)])
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"✓ Отчёт сохранён: {args.csv}")
+        return
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    image, stats = lab3_frame(width, height, not args.no_shadows, not args.no_pcf)
+    rgb = to_rgb8(image)
+    write_png(args.out, rgb)
+    print(f"✓ {args.out}: {width}x{height}, {stats['triangles']} + {stats['shadow_triangles']} (тень) треугольников, "
+          f"{stats['seconds'] * 1e3:.1f} + {stats['shadow_seconds'] * 1e3:.1f} (тень) мс")
+
+    if args.compare:
+        mae, psnr = compare(rgb, args.compare)
+        print(f"Сравнение с {args.compare}: MAE {mae:.2f}, PSNR {psnr:.1f} dB (порог {args.min_psnr:.1f})")
+        sys.exit(0 if psnr >= args.min_psnr else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# Замеры старта лабораторных: что импортируется, сколько времени до первого
+# кадра и сколько стоит один вызов GL из Python — в обычном режиме PyOpenGL
+# (проверка glGetError после каждого вызова) и в режиме production (glconfig).
+#
+#     python startup.py                      # все замеры для lab1..lab3
+#     python startup.py lab3 --importtime    # только профиль импорта
+#
+# Каждый замер — отдельный процесс: режим PyOpenGL фиксируется при импорте
+# OpenGL.GL, а импорт после первого раза берётся из sys.modules.
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LABS = {"lab1": "lab1/lab1.py", "lab2": "lab2/lab2.py", "lab3": "lab3/lab3.py"}
+MODES = {"debug": "0", "production": "1"}
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+# -------------------- Import profile --------------------
+def import_profile(lab):
+    """Разбор `python -X importtime`: {пакет верхнего уровня: собственное время его модулей, мс}, всего, мс"""
+    lab_dir, module = os.path.split(os.path.join(HERE, LABS[lab]))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module[:-3]}"],
+                            cwd=lab_dir, capture_output=True, text=True)
+    packages = {}
+    total = 0.0
+    for line in result.stderr.splitlines():
+        m = _IMPORT_LINE.match(line)
+        if not m:
+            continue
+        self_ms = int(m.group(1)) / 1e3
+        top = m.group(3).split(".")[0]
+        packages[top] = packages.get(top, 0.0) + self_ms
+        total += self_ms
+    return packages, total
+
+
+# -------------------- First frame --------------------
+def first_frame(lab, mode, timeout=60.0):
+    """Время от запуска процесса до конца первого display() (glconfig.first_frame)"""
+    env = dict(os.environ, LABS_GL_PRODUCTION=MODES[mode], LABS_STARTUP_PROBE="1", LABS_STARTUP_T0=repr(time.time()))
+    path = os.path.join(HERE, LABS[lab])
+    result = subprocess.run([sys.executable, path], cwd=os.path.dirname(path), env=env,
+                            capture_output=True, text=True, timeout=timeout)
+    for line in result.stdout.splitlines():
+        if line.startswith("STARTUP "):
+            return json.loads(line[len("STARTUP "):])
+    raise RuntimeError(f"{lab}: первый кадр не получен\n{result.stderr[-2000:]}")
+
+
+# -------------------- Per-call overhead --------------------
+def call_overhead(mode, calls=100000):
+    """Наносекунды на вызов GL из Python в режиме mode (в отдельном процессе)"""
+    env = dict(os.environ, LABS_GL_PRODUCTION=MODES[mode])
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure-calls", str(calls)],
+                            env=env, capture_output=True, text=True, timeout=120)
+    for line in result.stdout.splitlines():
+        if line.startswith("CALLS "):
+            return json.loads(line[len("CALLS "):])
+    raise RuntimeError(f"замер вызовов не удался\n{result.stderr[-2000:]}")
+
+
+def _measure_calls(calls):
+    sys.path.insert(0, HERE)
+    import glconfig
+    from OpenGL.GL import glColor3f, glIsEnabled, glNormal3f, GL_DEPTH_TEST
+    from OpenGL.GLUT import glutInit, glutInitDisplayMode, glutCreateWindow, GLUT_RGB, GLUT_DOUBLE
+
+    glutInit([sys.argv[0]])
+    glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB)
+    glutCreateWindow(b"startup calls")
+
+    results = {"production": glconfig.production}
+    for name, call in (("glColor3f", lambda: glColor3f(0.5, 0.5, 0.5)),
+                       ("glIsEnabled", lambda: glIsEnabled(GL_DEPTH_TEST)),
+                       ("glNormal3f", lambda: glNormal3f(0.0, 1.0, 0.0))):
+        call()
+        start = time.perf_counter()
+        for _ in range(calls):
+            call()
+        results[name] = (time.perf_counter() - start) / calls * 1e9
+    print("CALLS " + json.dumps(results), flush=True)
+
+
+# -------------------- Report --------------------
+def main():
+    parser = argparse.ArgumentParser(description="Время старта лабораторных и стоимость вызовов PyOpenGL")
+    parser.add_argument("labs", nargs="*", default=sorted(LABS), help="lab1 lab2 lab3")
+    parser.add_argument("--importtime", action="store_true", help="только профиль импорта")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--measure-calls", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure_calls:
+        _measure_calls(args.measure_calls)
+        return
+    unknown = set(args.labs) - set(LABS)
+    if unknown:
+        parser.error(f"неизвестные лабы: {', '.join(sorted(unknown))}")
+
+    print("=" * 70)
+    print("Импорт модуля лабы (python -X importtime), собственное время модулей по пакетам, мс")
+    print("=" * 70)
+    for lab in args.labs:
+        packages, total = import_profile(lab)
+        top = sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]
+        print(f"{lab}: {total:.1f} мс всего; " + ", ".join(f"{name} {ms:.1f}" for name, ms in top))
+    if args.importtime:
+        return
+
+    print("\n" + "=" * 70)
+    print(f"Время до первого кадра, лучшее из {args.repeat}, мс")
+    print("=" * 70)
+    print(f"{'лаба':>6} | {'debug':>8} | {'production':>10} | PIL загружен")
+    for lab in args.labs:
+        best = {}
+        for mode in MODES:
+            runs = [first_frame(lab, mode) for _ in range(args.repeat)]
+            best[mode] = min(r["first_frame_s"] for r in runs) * 1e3
+        pil = runs[-1]["pil_loaded"]
+        print(f"{lab:>6} | {best['debug']:>8.1f} | {best['production']:>10.1f} | {'да' if pil else 'нет'}")
+
+    print("\n" + "=" * 70)
+    print("Стоимость одного вызова, нс")
+    print("=" * 70)
+    results = {mode: call_overhead(mode) for mode in MODES}
+    print(f"{'вызов':>12} | {'debug':>8} | {'production':>10} | ускорение")
+    for name in ("glColor3f", "glIsEnabled", "glNormal3f"):
+        d, p = results["debug"][name], results["production"][name]
+        print(f"{name:>12} | {d:>8.0f} | {p:>10.0f} | x{d / p:.2f}")
+
+
+if __name__ == "__main__":
+    main()
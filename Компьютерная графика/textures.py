@@ -0,0 +1,147 @@
+# Процедурные текстуры на NumPy и их дисковый кэш.
+#
+# Узоры (шахматная доска, шум, градиент) строятся broadcasting-ом по сетке
+# координат без циклов Python, в любом разрешении. Готовый массив
+# сохраняется в .texture_cache/<хэш параметров>.npy, так что при следующем
+# запуске он просто читается с диска. upload() загружает текстуру вместе с
+# mip-уровнями (glGenerateMipmap) и трилинейной фильтрацией.
+#
+# Запуск как скрипт — замер времени генерации: старый вложенный цикл,
+# векторизованная версия и чтение из кэша.
+
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".texture_cache")
+
+
+# -------------------- Patterns --------------------
+def checker(width=256, height=256, square=32, color_a=(255, 200, 100), color_b=(50, 50, 150)):
+    """Шахматная доска с клетками square x square"""
+    i = np.arange(height)[:, None] // square
+    j = np.arange(width)[None, :] // square
+    even = ((i + j) % 2 == 0)[..., None]
+    return np.where(even, np.array(color_a, dtype=np.uint8), np.array(color_b, dtype=np.uint8))
+
+
+def noise(width=256, height=256, cell=16, seed=0, color_a=(0, 0, 0), color_b=(255, 255, 255)):
+    """Value noise: случайная решётка с шагом cell и гладкой билинейной интерполяцией"""
+    rng = np.random.default_rng(seed)
+    gh, gw = height // cell + 2, width // cell + 2
+    lattice = rng.random((gh, gw))
+
+    y = np.arange(height) / cell
+    x = np.arange(width) / cell
+    y0, x0 = y.astype(int), x.astype(int)
+    ty, tx = y - y0, x - x0
+    ty, tx = ty * ty * (3 - 2 * ty), tx * tx * (3 - 2 * tx)   # smoothstep
+
+    top = lattice[y0][:, x0] * (1 - tx) + lattice[y0][:, x0 + 1] * tx
+    bottom = lattice[y0 + 1][:, x0] * (1 - tx) + lattice[y0 + 1][:, x0 + 1] * tx
+    t = (top * (1 - ty[:, None]) + bottom * ty[:, None])[..., None]
+    return _mix(color_a, color_b, t)
+
+
+def gradient(width=256, height=256, angle=0.0, color_a=(0, 0, 0), color_b=(255, 255, 255)):
+    """Линейный градиент под углом angle (градусы, 0 — слева направо)"""
+    a = np.radians(angle)
+    u = np.linspace(0.0, 1.0, width)[None, :]
+    v = np.linspace(0.0, 1.0, height)[:, None]
+    t = u * np.cos(a) + v * np.sin(a)
+    t = (t - t.min()) / max(t.max() - t.min(), 1e-12)
+    return _mix(color_a, color_b, t[..., None])
+
+
+def _mix(color_a, color_b, t):
+    a = np.array(color_a, dtype=np.float32)
+    b = np.array(color_b, dtype=np.float32)
+    return np.clip(a + (b - a) * t, 0, 255).astype(np.uint8)
+
+
+PATTERNS = {"checker": checker, "noise": noise, "gradient": gradient}
+
+
+# -------------------- Cache --------------------
+def cache_key(pattern, params):
+    """Ключ кэша: хэш имени узора и всех его параметров"""
+    blob = json.dumps({"pattern": pattern, "params": params}, sort_keys=True, default=list)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+def procedural(pattern, **params):
+    """Текстура (H, W, 3) uint8 из кэша, либо сгенерированная и сохранённая в кэш"""
+    path = os.path.join(CACHE_DIR, cache_key(pattern, params) + ".npy")
+    if os.path.exists(path):
+        return np.load(path)
+    data = PATTERNS[pattern](**params)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    np.save(path, data)
+    return data
+
+
+# -------------------- Upload --------------------
+def upload(data, wrap=None):
+    """Загрузка RGB-текстуры с mip-уровнями и трилинейной фильтрацией; возвращает id"""
+    from OpenGL.GL import (glGenTextures, glBindTexture, glTexParameteri, glTexImage2D,
+                           glGenerateMipmap, glPixelStorei, GL_TEXTURE_2D, GL_TEXTURE_WRAP_S,
+                           GL_TEXTURE_WRAP_T, GL_TEXTURE_MAG_FILTER, GL_TEXTURE_MIN_FILTER,
+                           GL_LINEAR, GL_LINEAR_MIPMAP_LINEAR, GL_REPEAT, GL_RGB,
+                           GL_UNSIGNED_BYTE, GL_UNPACK_ALIGNMENT)
+
+    height, width = data.shape[:2]
+    wrap = GL_REPEAT if wrap is None else wrap
+    tex = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, tex)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, wrap)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, wrap)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, width, height, 0,
+                 GL_RGB, GL_UNSIGNED_BYTE, np.ascontiguousarray(data))
+    glGenerateMipmap(GL_TEXTURE_2D)
+    glBindTexture(GL_TEXTURE_2D, 0)
+    return tex
+
+
+# -------------------- Benchmark --------------------
+def checker_loop(width=256, height=256, square=32):
+    """Прежняя реализация из lab2 (попиксельный цикл) — только для сравнения"""
+    data = np.zeros((height, width, 3), dtype=np.uint8)
+    for i in range(height):
+        for j in range(width):
+            if ((i // square) + (j // square)) % 2 == 0:
+                data[i, j] = [255, 200, 100]
+            else:
+                data[i, j] = [50, 50, 150]
+    return data
+
+
+def _timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    print("=" * 70)
+    print(f"{'размер':>10} | {'цикл, мс':>10} | {'NumPy, мс':>10} | {'кэш, мс':>10}")
+    print("=" * 70)
+    for size in (256, 512, 1024):
+        t_loop, ref = _timed(lambda: checker_loop(size, size), repeat=1)
+        t_vec, vec = _timed(lambda: checker(size, size))
+        procedural("checker", width=size, height=size)
+        t_cache, _ = _timed(lambda: procedural("checker", width=size, height=size))
+        assert np.array_equal(ref, vec)
+        print(f"{size:>5}x{size:<4} | {t_loop * 1e3:>10.1f} | {t_vec * 1e3:>10.2f} | {t_cache * 1e3:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# Данные CIFAR-10 для CIFAR10_CNN_Lab_Report.ipynb без копий в float64.
+#
+# В ноутбуке train_images / 255.0 превращает uint8-массивы в float64
+# (50000×32×32×3×8 байт ≈ 1.2 ГБ для обучающей выборки и ещё 0.25 ГБ для
+# тестовой), и model.fit получает их целиком. Здесь выборки один раз
+# сохраняются в кэш .npy и дальше открываются через np.load(mmap_mode='r'):
+# в памяти только те страницы, которые читаются, и в uint8. Перевод в
+# float32 [0, 1] делается по батчу внутри tf.data (параллельный map), а
+# следующие батчи готовятся, пока модель считает текущий (prefetch).
+#
+# Для работы без сети есть синтетическая замена CIFAR-10 той же формы и
+# типа: у каждого класса свой средний цвет и направление градиента, у
+# каждого изображения — случайный сдвиг цвета и шум; модель обучается на
+# ней заметно выше случайного уровня, но не до 100%.
+#
+#     python cifar_data.py                          # сравнение с / 255.0 на CIFAR-10
+#     python cifar_data.py --synthetic 5000 1000    # то же на синтетических данных
+#
+# Каждый способ замеряется в отдельном процессе: пиковый RSS процесса
+# (ru_maxrss) только растёт и после первого замера был бы уже занят.
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get('CIFAR10_CACHE', os.path.join(HERE, 'cifar10_cache'))
+SPLITS = ('train_images', 'train_labels', 'test_images', 'test_labels')
+IMAGE_SHAPE = (32, 32, 3)
+NUM_CLASSES = 10
+BATCH_SIZE = 32  # как у model.fit по умолчанию
+MODES = {'numpy': '/ 255.0, float64 целиком', 'tf.data': 'uint8 mmap + tf.data'}
+
+
+# -------------------- Синтетические данные --------------------
+def synthetic(n_train=5000, n_test=1000, seed=0):
+    """Замена cifar10.load_data(): изображения uint8 (N, 32, 32, 3) и метки uint8 (N, 1)"""
+    rng = np.random.default_rng(seed)
+    colors = rng.uniform(100, 155, size=(NUM_CLASSES, 3))
+    angles = np.linspace(0, np.pi, NUM_CLASSES, endpoint=False)
+    yy, xx = np.mgrid[0:IMAGE_SHAPE[0], 0:IMAGE_SHAPE[1]] / (IMAGE_SHAPE[0] - 1) - 0.5
+
+    def make(n, chunk=1024):
+        labels = rng.integers(0, NUM_CLASSES, size=(n, 1)).astype(np.uint8)
+        images = np.empty((n,) + IMAGE_SHAPE, dtype=np.uint8)
+        # Кусками, чтобы промежуточный float64 не занимал памяти больше, чем готовый uint8
+        for start in range(0, n, chunk):
+            y = labels[start:start + chunk, 0]
+            ramp = np.cos(angles[y])[:, None, None] * xx + np.sin(angles[y])[:, None, None] * yy
+            # Случайный сдвиг цвета у каждого изображения: по одному среднему цвету класс не угадать
+            tint = colors[y] + rng.normal(0, 20, (len(y), 3))
+            pixels = tint[:, None, None, :] + 60 * ramp[..., None] + rng.normal(0, 40, (len(y),) + IMAGE_SHAPE)
+            images[start:start + len(y)] = np.clip(pixels, 0, 255).astype(np.uint8)
+        return images, labels
+
+    return make(n_train), make(n_test)
+
+
+# -------------------- Кэш .npy --------------------
+def _paths(cache_dir, prefix):
+    return {name: os.path.join(cache_dir, f'{prefix}{name}.npy') for name in SPLITS}
+
+
+def _save(paths, arrays):
+    """Каждый файл пишется во временный и переименовывается: оборванная запись не выглядит готовым кэшем"""
+    for name, array in zip(SPLITS, arrays):
+        tmp = paths[name] + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.save(f, np.ascontiguousarray(array, dtype=np.uint8))
+        os.replace(tmp, paths[name])
+
+
+def load(cache_dir=CACHE_DIR, synthetic_size=None, seed=0):
+    """
+    Выборки CIFAR-10 в uint8, открытые из кэша .npy через mmap (только чтение).
+
+    Параметры:
+    ----------
+    cache_dir : str
+        Каталог кэша; при первом вызове туда сохраняется cifar10.load_data()
+    synthetic_size : (int, int) или None
+        (n_train, n_test) — синтетические данные вместо CIFAR-10, без сети и TensorFlow
+
+    Возвращает:
+    -----------
+    (train_images, train_labels), (test_images, test_labels) — как cifar10.load_data()
+    """
+    prefix = '' if synthetic_size is None else 'synthetic_{}_{}_{}_'.format(*synthetic_size, seed)
+    paths = _paths(cache_dir, prefix)
+    if not all(os.path.exists(path) for path in paths.values()):
+        os.makedirs(cache_dir, exist_ok=True)
+        if synthetic_size is None:
+            from tensorflow.keras import datasets
+            (train_images, train_labels), (test_images, test_labels) = datasets.cifar10.load_data()
+        else:
+            (train_images, train_labels), (test_images, test_labels) = synthetic(*synthetic_size, seed=seed)
+        _save(paths, (train_images, train_labels, test_images, test_labels))
+        del train_images, test_images
+    arrays = {name: np.load(path, mmap_mode='r') for name, path in paths.items()}
+    return (arrays['train_images'], arrays['train_labels']), (arrays['test_images'], arrays['test_labels'])
+
+
+# -------------------- tf.data --------------------
+def _rows(idx):
+    """Номера строк батча: подряд — срез (чтение одним куском), иначе по возрастанию для mmap"""
+    if len(idx) and idx[-1] - idx[0] == len(idx) - 1 and np.all(np.diff(idx) == 1):
+        return slice(int(idx[0]), int(idx[-1]) + 1)
+    return np.sort(idx)
+
+
+def dataset(images, labels=None, batch_size=BATCH_SIZE, shuffle=False, seed=None):
+    """
+    Конвейер tf.data по массивам uint8 (обычно memmap из load()).
+
+    Из массива читается только батч (индексы перемешиваются, данные — нет),
+    перевод в float32 [0, 1] — параллельный map, дальше prefetch.
+
+    Параметры:
+    ----------
+    images : ndarray (N, 32, 32, 3) uint8
+    labels : ndarray (N, 1) или None
+        Без меток датасет отдаёт только изображения (для predict)
+    shuffle : bool
+        Новый порядок на каждой эпохе
+
+    Возвращает:
+    -----------
+    tf.data.Dataset батчей (x float32, y int32) или x
+    """
+    import tensorflow as tf
+
+    indices = tf.data.Dataset.range(len(images))
+    if shuffle:
+        indices = indices.shuffle(len(images), seed=seed, reshuffle_each_iteration=True)
+    indices = indices.batch(batch_size)
+
+    def read(idx):
+        rows = _rows(idx)
+        if labels is None:
+            return np.ascontiguousarray(images[rows])
+        return np.ascontiguousarray(images[rows]), np.asarray(labels[rows], dtype=np.int32)
+
+    def read_batch(idx):
+        if labels is None:
+            x = tf.numpy_function(read, [idx], tf.uint8)
+            x.set_shape((None,) + images.shape[1:])
+            return x
+        x, y = tf.numpy_function(read, [idx], (tf.uint8, tf.int32))
+        x.set_shape((None,) + images.shape[1:])
+        y.set_shape((None,) + labels.shape[1:])
+        return x, y
+
+    def normalize(x, y=None):
+        x = tf.cast(x, tf.float32) / 255.0
+        return x if y is None else (x, y)
+
+    return (indices
+            .map(read_batch, num_parallel_calls=tf.data.AUTOTUNE)
+            .map(normalize, num_parallel_calls=tf.data.AUTOTUNE)
+            .prefetch(tf.data.AUTOTUNE))
+
+
+# -------------------- Сравнение --------------------
+def build_model():
+    """Та же CNN, что в ноутбуке (разделы 4–5)"""
+    import tensorflow as tf
+    from tensorflow.keras import layers, models
+
+    model = models.Sequential([
+        layers.Input(shape=IMAGE_SHAPE),
+        layers.Conv2D(32, (3, 3), activation='relu'),
+        layers.MaxPooling2D((2, 2)),
+        layers.Conv2D(64, (3, 3), activation='relu'),
+        layers.MaxPooling2D((2, 2)),
+        layers.Conv2D(64, (3, 3), activation='relu'),
+        layers.Flatten(),
+        layers.Dense(64, activation='relu'),
+        layers.Dense(NUM_CLASSES),
+    ])
+    model.compile(optimizer='adam',
+                  loss=tf.keras.losses.SparseCategoricalCrossentropy(from_logits=True),
+                  metrics=['accuracy'])
+    return model
+
+
+def _measure(mode, synthetic_size, epochs):
+    """Подготовка данных и model.fit способом mode; печатает строку MEASURE <json>"""
+    start = time.perf_counter()
+    if mode == 'numpy':
+        # Как в ноутбуке: массивы целиком в памяти и деление на 255.0 (float64)
+        if synthetic_size is None:
+            from tensorflow.keras import datasets
+            (train_images, train_labels), (test_images, test_labels) = datasets.cifar10.load_data()
+        else:
+            (train_images, train_labels), (test_images, test_labels) = \
+                [tuple(np.array(a) for a in split) for split in load(synthetic_size=synthetic_size)]
+        train_images, test_images = train_images / 255.0, test_images / 255.0
+        fit_args = dict(x=train_images, y=train_labels, batch_size=BATCH_SIZE,
+                        validation_data=(test_images, test_labels))
+    else:
+        (train_images, train_labels), (test_images, test_labels) = load(synthetic_size=synthetic_size)
+        fit_args = dict(x=dataset(train_images, train_labels, shuffle=True, seed=0),
+                        validation_data=dataset(test_images, test_labels))
+    prepare_s = time.perf_counter() - start
+
+    import tensorflow as tf
+    tf.keras.utils.set_random_seed(0)
+    model = build_model()
+    start = time.perf_counter()
+    history = model.fit(epochs=epochs, verbose=0, **fit_args)
+    fit_s = time.perf_counter() - start
+
+    print('MEASURE ' + json.dumps({
+        'prepare_s': prepare_s,
+        'fit_s': fit_s,
+        'samples_per_s': len(train_images) * epochs / fit_s,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'val_accuracy': history.history['val_accuracy'][-1],
+    }), flush=True)
+
+
+def compare(mode, synthetic_size=None, epochs=1, timeout=3600):
+    """Замер способа mode в отдельном процессе"""
+    cmd = [sys.executable, os.path.abspath(__file__), '--measure', mode, '--epochs', str(epochs)]
+    if synthetic_size is not None:
+        cmd += ['--synthetic'] + [str(n) for n in synthetic_size]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    for line in result.stdout.splitlines():
+        if line.startswith('MEASURE '):
+            return json.loads(line[len('MEASURE '):])
+    raise RuntimeError(f"{mode}: замер не удался\n{result.stderr[-2000:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Память и скорость обучения: / 255.0 против uint8 mmap + tf.data')
+    parser.add_argument('--synthetic', type=int, nargs=2, metavar=('N_TRAIN', 'N_TEST'), default=None,
+                        help='синтетические данные вместо CIFAR-10')
+    parser.add_argument('--epochs', type=int, default=1)
+    parser.add_argument('--measure', choices=MODES, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    synthetic_size = tuple(args.synthetic) if args.synthetic else None
+
+    if args.measure:
+        _measure(args.measure, synthetic_size, args.epochs)
+        return
+
+    # Кэш создаётся заранее, чтобы загрузка и запись .npy не попали в замер
+    (train_images, _), (test_images, _) = load(synthetic_size=synthetic_size)
+    source = 'синтетические' if synthetic_size else 'CIFAR-10'
+
+    print("=" * 90)
+    print(f"CNN из ноутбука, эпох: {args.epochs}, batch {BATCH_SIZE}; "
+          f"{len(train_images)} / {len(test_images)} изображений ({source})")
+    print("=" * 90)
+    print(f"{'способ':>26} | {'подготовка, с':>13} | {'пик RSS, МБ':>11} | {'обучение, с':>11} | "
+          f"{'образцов/с':>10} | val acc")
+    results = {}
+    for mode, title in MODES.items():
+        r = results[mode] = compare(mode, synthetic_size, args.epochs)
+        print(f"{title:>26} | {r['prepare_s']:>13.2f} | {r['peak_rss_mb']:>11.0f} | {r['fit_s']:>11.1f} | "
+              f"{r['samples_per_s']:>10.0f} | {r['val_accuracy']:.4f}")
+    old, new = results['numpy'], results['tf.data']
+    print(f"\nПик RSS: {new['peak_rss_mb'] - old['peak_rss_mb']:+.0f} МБ, "
+          f"скорость обучения: x{new['samples_per_s'] / old['samples_per_s']:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+# Пакетное распознавание изображений CIFAR-10 обученной моделью.
+#
+# recognize_image() в ноутбуке вызывает model.predict на одном изображении,
+# и на каждый вызов приходится вся обвязка Keras (адаптер данных, callbacks,
+# цикл predict), которая для входа 1×32×32×3 дороже самой свёртки. Здесь
+# изображения идут батчами фиксированного размера (последний дополняется
+# нулями) через одну tf.function над model(x, training=False): граф
+# трассируется один раз на размер батча, а перевод uint8 -> float32 [0, 1],
+# softmax и argmax считаются в нём же — наружу выходят только класс и
+# уверенность. Модель, как в ноутбуке, отдаёт логиты.
+#
+#     python inference.py                                      # скорость по размеру батча, CPU
+#     python inference.py --model cifar10_cnn_model.keras --batch-sizes 1 32 256
+#     python inference.py --synthetic 2000                     # без CIFAR-10 и обученной модели
+
+import argparse
+import functools
+import os
+import time
+import weakref
+
+import numpy as np
+
+import cifar_data
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(HERE, 'cifar10_cnn_model.keras')
+BATCH_SIZE = 256
+BENCH_BATCH_SIZES = (1, 8, 32, 128, 256, 1024)
+
+# tf.function на модель. Замыкание держит модель через weakref.proxy: иначе
+# значение словаря ссылалось бы на ключ, и модели никогда не освобождались бы
+_compiled = weakref.WeakKeyDictionary()
+
+
+# -------------------- Распознавание --------------------
+def _classify(model):
+    """Батч -> (классы, уверенность); без tf.function — операция за операцией в eager-режиме"""
+    import tensorflow as tf
+
+    def classify(x):
+        x = tf.convert_to_tensor(x)
+        if x.dtype == tf.uint8:
+            x = tf.cast(x, tf.float32) / 255.0
+        probs = tf.nn.softmax(model(x, training=False))
+        return tf.argmax(probs, axis=-1, output_type=tf.int32), tf.reduce_max(probs, axis=-1)
+    return classify
+
+
+def compile_model(model):
+    """tf.function над моделью: батч (uint8 или float32 [0, 1]) -> (классы int32, уверенность float32)"""
+    fn = _compiled.get(model)
+    if fn is None:
+        import tensorflow as tf
+        fn = _compiled[model] = tf.function(_classify(weakref.proxy(model)))
+    return fn
+
+
+def _indices(indices, n):
+    """Номера изображений: None — все, int, range, slice или массив"""
+    if indices is None:
+        return np.arange(n)
+    if isinstance(indices, slice):
+        return np.arange(n)[indices]
+    indices = np.atleast_1d(np.asarray(indices, dtype=np.int64))
+    bad = indices[(indices < 0) | (indices >= n)]
+    if len(bad):
+        raise IndexError(f"индекс должен быть в диапазоне 0-{n - 1}: {bad[0]}")
+    return indices
+
+
+def _take(images, idx):
+    """images[idx]; подряд идущие номера читаются срезом (для memmap — одним куском)"""
+    if len(idx) > 1 and idx[-1] - idx[0] == len(idx) - 1 and np.all(np.diff(idx) == 1):
+        return np.asarray(images[idx[0]:idx[-1] + 1])
+    return np.asarray(images[idx])
+
+
+def _batch_size(batch_size, n):
+    """Для малых выборок — ближайшая степень двойки: батч 256 ради одного изображения не нужен"""
+    return min(batch_size, 1 << max(n - 1, 0).bit_length())
+
+
+def recognize(model, images, labels=None, indices=None, batch_size=BATCH_SIZE, compiled=True):
+    """
+    Распознавание изображений images[indices] батчами фиксированного размера.
+
+    Параметры:
+    ----------
+    model : keras.Model
+        Модель с логитами на выходе (как в ноутбуке)
+    images : ndarray (N, 32, 32, 3)
+        uint8 (например, memmap из cifar_data.load()) или float32 в [0, 1]
+    labels : ndarray (N, 1) или None
+        Реальные классы; без них нет полей real и correct
+    indices : None, int, range, slice или массив
+        Какие изображения распознать (по умолчанию все)
+    compiled : bool
+        False — прямой вызов model(x, training=False) без tf.function (для сравнения)
+
+    Возвращает:
+    -----------
+    dict массивов: index, predicted (int32), confidence (float32, 0..1), real, correct (bool)
+    """
+    fn = compile_model(model) if compiled else _classify(model)
+    return run_batches(fn, images, labels, indices, batch_size)
+
+
+def run_batches(fn, images, labels=None, indices=None, batch_size=BATCH_SIZE):
+    """Цикл recognize() для любого классификатора fn: батч фиксированного размера -> (классы, уверенность)"""
+    indices = _indices(indices, len(images))
+    batch_size = _batch_size(batch_size, len(indices))
+
+    predicted = np.empty(len(indices), dtype=np.int32)
+    confidence = np.empty(len(indices), dtype=np.float32)
+    for start in range(0, len(indices), batch_size):
+        x = _take(images, indices[start:start + batch_size])
+        n = len(x)
+        if n < batch_size:
+            x = np.concatenate([x, np.zeros((batch_size - n,) + x.shape[1:], dtype=x.dtype)])
+        classes, conf = fn(x)
+        predicted[start:start + n] = np.asarray(classes)[:n]
+        confidence[start:start + n] = np.asarray(conf)[:n]
+
+    result = {'index': indices, 'predicted': predicted, 'confidence': confidence}
+    if labels is not None:
+        result['real'] = np.asarray(labels[indices]).reshape(len(indices), -1)[:, 0].astype(np.int32)
+        result['correct'] = result['predicted'] == result['real']
+    return result
+
+
+# -------------------- Скорость --------------------
+def _per_image(model, images, indices):
+    """Как recognize_image() в ноутбуке: model.predict на каждом изображении"""
+    for i in indices:
+        img_array = np.expand_dims(images[i], 0).astype('float32') / 255.0
+        model.predict(img_array, verbose=0)
+
+
+def _best(run, n, repeat):
+    """Изображений в секунду, лучшее из repeat"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return n / best
+
+
+def benchmark(model, images, batch_sizes=BENCH_BATCH_SIZES, single=200, repeat=3):
+    """{способ: изображений/с}; для пакетных способов — по размеру батча"""
+    results = {'predict по одному': {}, 'tf.function': {}, 'model(x)': {}}
+    single = min(single, len(images))
+    _per_image(model, images, range(2))
+    results['predict по одному'][1] = _best(lambda: _per_image(model, images, range(single)), single, repeat)
+    for batch_size in batch_sizes:
+        for name, compiled in (('tf.function', True), ('model(x)', False)):
+            # Первый вызов — трассировка графа, в замер не входит
+            recognize(model, images, indices=range(min(batch_size, len(images))), batch_size=batch_size,
+                      compiled=compiled)
+            run = functools.partial(recognize, model, images, batch_size=batch_size, compiled=compiled)
+            results[name][batch_size] = _best(run, len(images), repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Скорость распознавания по размеру батча на CPU')
+    parser.add_argument('--model', default=MODEL_PATH, help='если файла нет — необученная CNN из ноутбука')
+    parser.add_argument('--synthetic', type=int, metavar='N', default=None,
+                        help='синтетические изображения вместо CIFAR-10')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=list(BENCH_BATCH_SIZES))
+    parser.add_argument('--single', type=int, default=200, help='сколько изображений распознать по одному')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    import tensorflow as tf
+    tf.config.set_visible_devices([], 'GPU')
+
+    if args.synthetic:
+        _, (images, labels) = cifar_data.load(synthetic_size=(args.synthetic, args.synthetic))
+    else:
+        _, (images, labels) = cifar_data.load()
+    if os.path.exists(args.model):
+        model = tf.keras.models.load_model(args.model)
+        source = os.path.basename(args.model)
+    else:
+        # На скорость веса не влияют, только на точность
+        model = cifar_data.build_model()
+        source = 'необученная CNN из ноутбука'
+
+    accuracy = recognize(model, images, labels)['correct'].mean()
+    results = benchmark(model, images, args.batch_sizes, args.single, args.repeat)
+    base = results['predict по одному'][1]
+
+    print("=" * 70)
+    print(f"Распознавание на CPU: {len(images)} изображений, модель: {source}, точность {accuracy:.4f}")
+    print("=" * 70)
+    print(f"predict по одному изображению: {base:.0f} изобр./с")
+    print(f"{'батч':>6} | {'tf.function, изобр./с':>21} | {'model(x), изобр./с':>18} | ускорение")
+    for batch_size in args.batch_sizes:
+        compiled, direct = results['tf.function'][batch_size], results['model(x)'][batch_size]
+        print(f"{batch_size:>6} | {compiled:>21.0f} | {direct:>18.0f} | x{compiled / base:.1f}")
+
+
+if __name__ == '__main__':
+    main()
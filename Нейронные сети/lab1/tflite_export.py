@@ -0,0 +1,256 @@
+# Экспорт CNN из ноутбука в TFLite (float16 и int8) и распознавание на CPU.
+#
+# cifar10_cnn_model.keras загружается только вместе с TensorFlow/Keras, и
+# каждое предсказание проходит через Keras. Для серверов распознавания без
+# GPU модель переводится в TFLite:
+#   float16 — веса в половинной точности (файл вдвое меньше), счёт в float32;
+#   int8    — веса и активации в int8 (файл вчетверо меньше, целочисленные
+#             ядра). Диапазоны активаций калибруются по representative
+#             dataset — случайной выборке из обучающих изображений. Вход и
+#             выход uint8: при калибровке на [0, 1] масштаб входа 1/255, и
+#             пиксели подаются как есть, без перевода в float.
+# Интерпретатор берётся из tflite_runtime / ai_edge_litert (без TensorFlow),
+# если они установлены, иначе tf.lite; число потоков задаётся при загрузке.
+# Распознавание идёт тем же циклом, что inference.recognize(), и возвращает
+# те же массивы.
+#
+#     python tflite_export.py                               # экспорт + сравнение keras / float16 / int8
+#     python tflite_export.py --threads 2 --batch-size 64
+#     python tflite_export.py --synthetic 5000 1000         # без CIFAR-10: модель обучается на синтетике
+
+import argparse
+import functools
+import os
+import time
+
+import numpy as np
+
+import cifar_data
+import inference
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FORMATS = ('float16', 'int8')
+NUM_CALIBRATION = 500
+
+
+# -------------------- Экспорт --------------------
+def representative_dataset(images, num=NUM_CALIBRATION, seed=0):
+    """Генератор калибровки int8: num случайных изображений, по одному, float32 [0, 1] — как на входе модели"""
+    idx = np.sort(np.random.default_rng(seed).choice(len(images), size=min(num, len(images)), replace=False))
+
+    def generate():
+        for i in idx:
+            yield [np.asarray(images[i:i + 1], dtype=np.float32) / 255.0]
+    return generate
+
+
+def convert(model, fmt, images=None, num_calibration=NUM_CALIBRATION):
+    """Байты модели .tflite в формате fmt; для int8 нужны изображения для калибровки"""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if fmt == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif fmt == 'int8':
+        if images is None:
+            raise ValueError("для int8 нужны изображения для калибровки")
+        converter.representative_dataset = representative_dataset(images, num_calibration)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.uint8
+        converter.inference_output_type = tf.uint8
+    else:
+        raise ValueError(f"неизвестный формат: {fmt} ({', '.join(FORMATS)})")
+    return converter.convert()
+
+
+def export(model, images, out_dir=HERE, name='cifar10_cnn', num_calibration=NUM_CALIBRATION):
+    """
+    Сохранение модели в float16 и int8 TFLite.
+
+    Параметры:
+    ----------
+    model : keras.Model
+    images : ndarray (N, 32, 32, 3) uint8
+        Обучающие изображения для калибровки int8
+    out_dir, name : str
+        Файлы <out_dir>/<name>_float16.tflite и <out_dir>/<name>_int8.tflite
+
+    Возвращает:
+    -----------
+    {формат: путь}
+    """
+    paths = {}
+    for fmt in FORMATS:
+        path = paths[fmt] = os.path.join(out_dir, f'{name}_{fmt}.tflite')
+        data = convert(model, fmt, images, num_calibration)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+    return paths
+
+
+# -------------------- Распознавание на CPU --------------------
+def _interpreter_class():
+    """Лёгкий интерпретатор без TensorFlow, если установлен, иначе tf.lite"""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+def load(path, num_threads=None):
+    """Интерпретатор модели .tflite; num_threads — потоки CPU (None — по умолчанию интерпретатора)"""
+    interpreter = _interpreter_class()(model_path=path, num_threads=num_threads)
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+def _quantize(x, detail):
+    """Батч uint8 или float32 [0, 1] -> тип и масштаб входа модели"""
+    scale, zero_point = detail['quantization']
+    if x.dtype == np.uint8 and detail['dtype'] == np.uint8 and np.isclose(scale, 1 / 255) and zero_point == 0:
+        return x
+    x = x.astype(np.float32) / 255.0 if x.dtype == np.uint8 else x.astype(np.float32)
+    if detail['dtype'] == np.float32:
+        return x
+    info = np.iinfo(detail['dtype'])
+    return np.clip(np.round(x / scale + zero_point), info.min, info.max).astype(detail['dtype'])
+
+
+def _dequantize(y, detail):
+    if detail['dtype'] == np.float32:
+        return y
+    scale, zero_point = detail['quantization']
+    return (y.astype(np.float32) - zero_point) * scale
+
+
+def classifier(interpreter):
+    """Батч -> (классы, уверенность), как у inference; вход переразмечается, только когда меняется размер батча"""
+    def classify(x):
+        detail = interpreter.get_input_details()[0]
+        if detail['shape'][0] != len(x):
+            interpreter.resize_tensor_input(detail['index'], x.shape)
+            interpreter.allocate_tensors()
+            detail = interpreter.get_input_details()[0]
+        output = interpreter.get_output_details()[0]
+        interpreter.set_tensor(detail['index'], _quantize(x, detail))
+        interpreter.invoke()
+        logits = _dequantize(interpreter.get_tensor(output['index']), output)
+        probs = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        probs /= probs.sum(axis=-1, keepdims=True)
+        return probs.argmax(axis=-1), probs.max(axis=-1)
+    return classify
+
+
+def recognize(interpreter, images, labels=None, indices=None, batch_size=inference.BATCH_SIZE):
+    """inference.recognize() для интерпретатора TFLite: те же параметры и словарь массивов"""
+    return inference.run_batches(classifier(interpreter), images, labels, indices, batch_size)
+
+
+# -------------------- Сравнение --------------------
+def _keras_runner(path):
+    import tensorflow as tf
+    return functools.partial(inference.recognize, tf.keras.models.load_model(path))
+
+
+def _tflite_runner(path, num_threads):
+    return functools.partial(recognize, load(path, num_threads))
+
+
+def measure(load_runner, images, labels, batch_size, latency_n):
+    """Загрузка до первого ответа, задержка на одно изображение, скорость и точность; load_runner() -> recognize"""
+    start = time.perf_counter()
+    run = load_runner()
+    run(images, indices=[0])
+    load_s = time.perf_counter() - start
+
+    latency = []
+    for i in range(min(latency_n, len(images))):
+        start = time.perf_counter()
+        run(images, indices=[i])
+        latency.append(time.perf_counter() - start)
+
+    run(images, indices=range(min(batch_size, len(images))), batch_size=batch_size)
+    start = time.perf_counter()
+    result = run(images, labels, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    return {
+        'load_ms': load_s * 1e3,
+        'p50_ms': np.percentile(latency, 50) * 1e3,
+        'p99_ms': np.percentile(latency, 99) * 1e3,
+        'images_per_s': len(images) / elapsed,
+        'accuracy': result['correct'].mean(),
+    }
+
+
+def _train(model_path, train_images, train_labels, epochs):
+    """Модель для сравнения, если обученной нет: CNN из ноутбука на epochs эпох"""
+    model = cifar_data.build_model()
+    model.fit(cifar_data.dataset(train_images, train_labels, shuffle=True, seed=0), epochs=epochs, verbose=2)
+    model.save(model_path)
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Экспорт в TFLite float16/int8 и сравнение с Keras на CPU')
+    parser.add_argument('--model', default=inference.MODEL_PATH,
+                        help='если файла нет — CNN из ноутбука обучается на --epochs эпох')
+    parser.add_argument('--out-dir', default=HERE)
+    parser.add_argument('--synthetic', type=int, nargs=2, metavar=('N_TRAIN', 'N_TEST'), default=None,
+                        help='синтетические данные вместо CIFAR-10')
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=None, help='потоки CPU для Keras и TFLite')
+    parser.add_argument('--calibration', type=int, default=NUM_CALIBRATION, help='изображений для калибровки int8')
+    parser.add_argument('--batch-size', type=int, default=inference.BATCH_SIZE)
+    parser.add_argument('--latency', type=int, default=200, help='изображений для замера задержки')
+    args = parser.parse_args()
+
+    import tensorflow as tf
+    tf.config.set_visible_devices([], 'GPU')
+    if args.threads:
+        tf.config.threading.set_intra_op_parallelism_threads(args.threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    synthetic_size = tuple(args.synthetic) if args.synthetic else None
+    (train_images, train_labels), (test_images, test_labels) = cifar_data.load(synthetic_size=synthetic_size)
+    name = 'cifar10_cnn' if synthetic_size is None else 'synthetic_cnn'
+    model_path = args.model
+    if synthetic_size is not None and model_path == inference.MODEL_PATH:
+        model_path = os.path.join(args.out_dir, f'{name}_model.keras')
+    if os.path.exists(model_path):
+        model = tf.keras.models.load_model(model_path)
+    else:
+        print(f"Нет {model_path}: обучение CNN из ноутбука, эпох: {args.epochs}")
+        model = _train(model_path, train_images, train_labels, args.epochs)
+
+    paths = export(model, train_images, args.out_dir, name, args.calibration)
+    paths = {'keras': model_path, **paths}
+    for fmt in FORMATS:
+        print(f"✓ {fmt}: {paths[fmt]}")
+
+    loaders = {'keras': functools.partial(_keras_runner, model_path)}
+    loaders.update({fmt: functools.partial(_tflite_runner, paths[fmt], args.threads) for fmt in FORMATS})
+    results = {fmt: measure(loader, test_images, test_labels, args.batch_size, args.latency)
+               for fmt, loader in loaders.items()}
+
+    print("=" * 100)
+    print(f"CPU, потоков: {args.threads or 'по умолчанию'}; {len(test_images)} тестовых изображений, "
+          f"батч {args.batch_size}; интерпретатор: {_interpreter_class().__module__}")
+    print("=" * 100)
+    print(f"{'формат':>8} | {'размер, КБ':>10} | {'загрузка, мс':>12} | {'задержка p50 / p99, мс':>22} | "
+          f"{'изобр./с':>9} | {'точность':>8} | падение, п.п.")
+    base = results['keras']['accuracy']
+    for fmt, r in results.items():
+        size = os.path.getsize(paths[fmt]) / 1024
+        print(f"{fmt:>8} | {size:>10.0f} | {r['load_ms']:>12.1f} | {r['p50_ms']:>10.2f} / {r['p99_ms']:<9.2f} | "
+              f"{r['images_per_s']:>9.0f} | {r['accuracy']:>8.4f} | {100 * (base - r['accuracy']):+.2f}")
+
+
+if __name__ == '__main__':
+    main()
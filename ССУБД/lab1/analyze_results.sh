@@ -34,11 +34,20 @@ if [ $# -eq 0 ]; then
     exit 1
 fi
 
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 WORK_DIR="$1"
 RESULTS_DIR="${WORK_DIR}/results"
 GRAPHS_DIR="${WORK_DIR}/graphs"
 REPORT_FILE="${WORK_DIR}/lab_report.md"
 
+# Графики: CHART_FORMAT="png svg" и/или CHART_DPI=100 для черновика
+CHART_FORMAT="${CHART_FORMAT:-png}"
+CHART_DPI="${CHART_DPI:-300}"
+CHART_EXT="${CHART_FORMAT%% *}"
+
+# История запусков: по умолчанию база рядом с каталогами raid_test_*
+HISTORY_DB="${HISTORY_DB:-$(dirname "$WORK_DIR")/raid_history.sqlite}"
+
 # Проверка существования директорий
 if [ ! -d "$WORK_DIR" ]; then
     error "Директория не найдена: $WORK_DIR"
@@ -60,68 +69,9 @@ log "Шаг 1: Парсинг результатов FIO..."
 export RESULTS_DIR
 export GRAPHS_DIR
 export WORK_DIR
+export SCRIPT_DIR
 
-python3 - <<PYTHON_SCRIPT
-import json
-import os
-import sys
-from pathlib import Path
-
-results_dir = os.environ['RESULTS_DIR']
-if not results_dir:
-    print("ERROR: RESULTS_DIR не установлена", file=sys.stderr)
-    sys.exit(1)
-output_csv = os.path.join(results_dir, 'summary_results.csv')
-
-json_files = list(Path(results_dir).glob('*.json'))
-
-if not json_files:
-    print("Нет JSON файлов для анализа", file=sys.stderr)
-    sys.exit(1)
-
-print(f"Найдено {len(json_files)} JSON файлов")
-
-summary = []
-
-for json_file in json_files:
-    try:
-        with open(json_file, 'r') as f:
-            data = json.load(f)
-
-        test_name = json_file.stem
-
-        for job in data.get('jobs', []):
-            job_name = job.get('jobname', 'unknown')
-
-            read_bw = job.get('read', {}).get('bw', 0) / 1024
-            read_iops = job.get('read', {}).get('iops', 0)
-            read_lat = job.get('read', {}).get('lat_ns', {}).get('mean', 0) / 1000000
-
-            write_bw = job.get('write', {}).get('bw', 0) / 1024
-            write_iops = job.get('write', {}).get('iops', 0)
-            write_lat = job.get('write', {}).get('lat_ns', {}).get('mean', 0) / 1000000
-
-            summary.append({
-                'test_name': test_name,
-                'job_name': job_name,
-                'read_bw_mbs': round(read_bw, 2),
-                'read_iops': round(read_iops, 2),
-                'read_lat_ms': round(read_lat, 3),
-                'write_bw_mbs': round(write_bw, 2),
-                'write_iops': round(write_iops, 2),
-                'write_lat_ms': round(write_lat, 3)
-            })
-    except Exception as e:
-        print(f"Ошибка {json_file}: {e}", file=sys.stderr)
-
-with open(output_csv, 'w') as f:
-    f.write('test_name,job_name,read_bw_mbs,read_iops,read_lat_ms,write_bw_mbs,write_iops,write_lat_ms\n')
-    for row in summary:
-        f.write(f"{row['test_name']},{row['job_name']},{row['read_bw_mbs']},{row['read_iops']},{row['read_lat_ms']},{row['write_bw_mbs']},{row['write_iops']},{row['write_lat_ms']}\n")
-
-print(f"Результаты сохранены: {output_csv}")
-print(f"Обработано записей: {len(summary)}")
-PYTHON_SCRIPT
+python3 "${SCRIPT_DIR}/fio_ingest.py" "$RESULTS_DIR"
 
 if [ $? -ne 0 ]; then
     error "Ошибка парсинга результатов"
@@ -135,276 +85,10 @@ log "Шаг 2: Создание графиков..."
 export RESULTS_DIR
 export GRAPHS_DIR
 export WORK_DIR
+export SCRIPT_DIR
 
-python3 - <<PYTHON_SCRIPT
-import csv
-import os
-import sys
-
-try:
-    import matplotlib
-    matplotlib.use('Agg')
-    import matplotlib.pyplot as plt
-    import numpy as np
-    plt.rcParams['font.family'] = 'DejaVu Sans'
-except ImportError:
-    print("ERROR: matplotlib не установлен. Выполните: sudo apt install python3-matplotlib python3-numpy")
-    sys.exit(1)
-
-
-results_dir = os.environ['RESULTS_DIR']
-graphs_dir = os.environ['GRAPHS_DIR']
-csv_file = os.path.join(results_dir, 'summary_results.csv')
-
-if not os.path.exists(csv_file):
-    print(f"CSV файл не найден: {csv_file}", file=sys.stderr)
-    sys.exit(1)
-
-data = []
-with open(csv_file, 'r') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        data.append(row)
-
-if not data:
-    print("Нет данных для графиков", file=sys.stderr)
-    sys.exit(1)
-
-print(f"Загружено {len(data)} записей")
-
-# График 1: Сравнение пропускной способности для разных размеров блоков
-baseline_seq_read = sorted([d for d in data if 'baseline_seq_read_' in d['test_name'] and 'mixed' not in d['test_name']],
-                           key=lambda x: x['test_name'])
-fragmented_seq_read = sorted([d for d in data if 'fragmented_seq_read_' in d['test_name']],
-                             key=lambda x: x['test_name'])
-
-if baseline_seq_read and fragmented_seq_read:
-    block_sizes = []
-    baseline_bw = []
-    fragmented_bw = []
-
-    for d in baseline_seq_read:
-        bs = d['test_name'].split('_')[-1]
-        block_sizes.append(bs)
-        baseline_bw.append(float(d['read_bw_mbs']))
-
-    for d in fragmented_seq_read:
-        fragmented_bw.append(float(d['read_bw_mbs']))
-
-    x = np.arange(len(block_sizes))
-    width = 0.35
-
-    fig, ax = plt.subplots(figsize=(14, 7))
-    rects1 = ax.bar(x - width/2, baseline_bw, width, label='Нефрагментированный', color='#2ecc71', edgecolor='black', linewidth=1.2)
-    rects2 = ax.bar(x + width/2, fragmented_bw, width, label='Фрагментированный', color='#e74c3c', edgecolor='black', linewidth=1.2)
-
-    # Добавление значений на столбцы
-    for rect in rects1:
-        height = rect.get_height()
-        ax.text(rect.get_x() + rect.get_width()/2., height,
-                f'{height:.1f}',
-                ha='center', va='bottom', fontsize=9, fontweight='bold')
-
-    for rect in rects2:
-        height = rect.get_height()
-        ax.text(rect.get_x() + rect.get_width()/2., height,
-                f'{height:.1f}',
-                ha='center', va='bottom', fontsize=9, fontweight='bold')
-
-    ax.set_xlabel('Размер блока', fontsize=13, fontweight='bold')
-    ax.set_ylabel('Пропускная способность (MB/s)', fontsize=13, fontweight='bold')
-    ax.set_title('Влияние фрагментации на последовательное чтение\n(RAID 10, 4 устройства)', fontsize=15, fontweight='bold', pad=20)
-    ax.set_xticks(x)
-    ax.set_xticklabels(block_sizes, fontsize=11)
-    ax.legend(fontsize=12, loc='upper left')
-    ax.grid(axis='y', alpha=0.3, linestyle='--')
-    ax.set_axisbelow(True)
-
-    plt.tight_layout()
-    plt.savefig(os.path.join(graphs_dir, 'fragmentation_impact_sequential.png'), dpi=300, bbox_inches='tight')
-    print("✓ График 1: fragmentation_impact_sequential.png")
-    plt.close()
-
-# График 2: IOPS для случайного доступа
-baseline_rand = [d for d in data if d['test_name'] == 'baseline_rand_read_4k']
-fragmented_rand = [d for d in data if d['test_name'] == 'fragmented_rand_read_4k']
-
-if baseline_rand and fragmented_rand:
-    categories = ['Нефрагментированный', 'Фрагментированный']
-    iops_values = [float(baseline_rand[0]['read_iops']), float(fragmented_rand[0]['read_iops'])]
-
-    fig, ax = plt.subplots(figsize=(10, 7))
-    bars = ax.bar(categories, iops_values, color=['#3498db', '#e67e22'], width=0.6, edgecolor='black', linewidth=1.5)
-
-    ax.set_ylabel('IOPS', fontsize=13, fontweight='bold')
-    ax.set_title('Случайное чтение (4K блоки): влияние фрагментации на IOPS\n(RAID 10)', fontsize=15, fontweight='bold', pad=20)
-    ax.grid(axis='y', alpha=0.3, linestyle='--')
-    ax.set_axisbelow(True)
-
-    for bar in bars:
-        height = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2., height,
-                f'{int(height):,}',
-                ha='center', va='bottom', fontsize=12, fontweight='bold')
-
-    # Добавление процента изменения
-    if iops_values[0] > 0:
-        change_pct = ((iops_values[1] - iops_values[0]) / iops_values[0]) * 100
-        ax.text(0.5, max(iops_values) * 0.95, f'Изменение: {change_pct:+.1f}%',
-                ha='center', fontsize=11, bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
-
-    plt.tight_layout()
-    plt.savefig(os.path.join(graphs_dir, 'fragmentation_impact_iops.png'), dpi=300, bbox_inches='tight')
-    print("✓ График 2: fragmentation_impact_iops.png")
-    plt.close()
-
-# График 3: Деградация производительности
-if baseline_seq_read and fragmented_seq_read and len(baseline_bw) == len(fragmented_bw):
-    degradation = []
-
-    for i in range(len(baseline_bw)):
-        if baseline_bw[i] > 0:
-            deg = ((baseline_bw[i] - fragmented_bw[i]) / baseline_bw[i]) * 100
-            degradation.append(deg)
-        else:
-            degradation.append(0)
-
-    fig, ax = plt.subplots(figsize=(14, 7))
-    line = ax.plot(block_sizes, degradation, marker='o', linewidth=3, markersize=10, color='#c0392b', label='Деградация')
-    ax.fill_between(range(len(block_sizes)), degradation, alpha=0.3, color='#e74c3c')
-
-    # Добавление значений на точки
-    for i, (bs, deg) in enumerate(zip(block_sizes, degradation)):
-        ax.text(i, deg + 1, f'{deg:.1f}%', ha='center', va='bottom', fontsize=10, fontweight='bold')
-
-    ax.set_xlabel('Размер блока', fontsize=13, fontweight='bold')
-    ax.set_ylabel('Деградация производительности (%)', fontsize=13, fontweight='bold')
-    ax.set_title('Процент снижения производительности из-за фрагментации\n(последовательное чтение)', fontsize=15, fontweight='bold', pad=20)
-    ax.set_xticks(range(len(block_sizes)))
-    ax.set_xticklabels(block_sizes, fontsize=11)
-    ax.grid(True, alpha=0.3, linestyle='--')
-    ax.axhline(y=0, color='k', linestyle='-', linewidth=1)
-    ax.set_axisbelow(True)
-    ax.legend(fontsize=11)
-
-    # Средняя деградация
-    avg_deg = np.mean(degradation)
-    ax.axhline(y=avg_deg, color='blue', linestyle='--', linewidth=2, alpha=0.7, label=f'Среднее: {avg_deg:.1f}%')
-    ax.legend(fontsize=11)
-
-    plt.tight_layout()
-    plt.savefig(os.path.join(graphs_dir, 'performance_degradation.png'), dpi=300, bbox_inches='tight')
-    print("✓ График 3: performance_degradation.png")
-    plt.close()
-
-# График 4: Латентность
-baseline_lat = []
-fragmented_lat = []
-
-for d in baseline_seq_read:
-    lat = float(d['read_lat_ms']) if float(d['read_lat_ms']) > 0 else 0.001
-    baseline_lat.append(lat)
-
-for d in fragmented_seq_read:
-    lat = float(d['read_lat_ms']) if float(d['read_lat_ms']) > 0 else 0.001
-    fragmented_lat.append(lat)
-
-if baseline_lat and fragmented_lat:
-    x = np.arange(len(block_sizes))
-    width = 0.35
-
-    fig, ax = plt.subplots(figsize=(14, 7))
-    rects1 = ax.bar(x - width/2, baseline_lat, width, label='Нефрагментированный', color='#16a085', edgecolor='black', linewidth=1.2)
-    rects2 = ax.bar(x + width/2, fragmented_lat, width, label='Фрагментированный', color='#d35400', edgecolor='black', linewidth=1.2)
-
-    ax.set_xlabel('Размер блока', fontsize=13, fontweight='bold')
-    ax.set_ylabel('Латентность (ms)', fontsize=13, fontweight='bold')
-    ax.set_title('Влияние фрагментации на латентность чтения\n(RAID 10)', fontsize=15, fontweight='bold', pad=20)
-    ax.set_xticks(x)
-    ax.set_xticklabels(block_sizes, fontsize=11)
-    ax.legend(fontsize=12)
-    ax.grid(axis='y', alpha=0.3, linestyle='--')
-    ax.set_axisbelow(True)
-
-    plt.tight_layout()
-    plt.savefig(os.path.join(graphs_dir, 'fragmentation_impact_latency.png'), dpi=300, bbox_inches='tight')
-    print("✓ График 4: fragmentation_impact_latency.png")
-    plt.close()
-
-# График 5: Сравнение операций записи
-baseline_write = [d for d in data if d['test_name'] == 'baseline_seq_write']
-if baseline_write:
-    write_bw = float(baseline_write[0]['write_bw_mbs'])
-    write_iops = float(baseline_write[0]['write_iops'])
-
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
-
-    # Подграфик 1: Сравнение read/write bandwidth
-    seq_read_baseline = [d for d in data if d['test_name'] == 'baseline_seq_read']
-    if seq_read_baseline:
-        read_bw = float(seq_read_baseline[0]['read_bw_mbs'])
-
-        categories = ['Sequential Read', 'Sequential Write']
-        values = [read_bw, write_bw]
-        colors = ['#3498db', '#e74c3c']
-
-        bars = ax1.bar(categories, values, color=colors, width=0.6, edgecolor='black', linewidth=1.5)
-        ax1.set_ylabel('Пропускная способность (MB/s)', fontsize=12, fontweight='bold')
-        ax1.set_title('Сравнение чтения и записи\n(1M блоки)', fontsize=13, fontweight='bold')
-        ax1.grid(axis='y', alpha=0.3, linestyle='--')
-        ax1.set_axisbelow(True)
-
-        for bar in bars:
-            height = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{height:.1f}',
-                    ha='center', va='bottom', fontsize=11, fontweight='bold')
-
-    # Подграфик 2: Смешанные операции
-    mixed_test = [d for d in data if d['test_name'] == 'baseline_mixed']
-    if mixed_test:
-        mixed_read_iops = float(mixed_test[0]['read_iops'])
-        mixed_write_iops = float(mixed_test[0]['write_iops'])
-
-        categories = ['Read IOPS\n(70%)', 'Write IOPS\n(30%)']
-        values = [mixed_read_iops, mixed_write_iops]
-        colors = ['#2ecc71', '#e67e22']
-
-        bars = ax2.bar(categories, values, color=colors, width=0.6, edgecolor='black', linewidth=1.5)
-        ax2.set_ylabel('IOPS', fontsize=12, fontweight='bold')
-        ax2.set_title('Смешанная нагрузка\n(70/30 Read/Write, 4K)', fontsize=13, fontweight='bold')
-        ax2.grid(axis='y', alpha=0.3, linestyle='--')
-        ax2.set_axisbelow(True)
-
-        for bar in bars:
-            height = bar.get_height()
-            ax2.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{int(height):,}',
-                    ha='center', va='bottom', fontsize=11, fontweight='bold')
-
-    plt.tight_layout()
-    plt.savefig(os.path.join(graphs_dir, 'read_write_comparison.png'), dpi=300, bbox_inches='tight')
-    print("✓ График 5: read_write_comparison.png")
-    plt.close()
-
-# Вывод статистики
-print("\n=== СТАТИСТИКА ===")
-
-seq_read_base = next((d for d in data if d['test_name'] == 'baseline_seq_read'), None)
-seq_read_frag = next((d for d in data if d['test_name'] == 'fragmented_seq_read'), None)
-
-if seq_read_base and seq_read_frag:
-    bw_base = float(seq_read_base['read_bw_mbs'])
-    bw_frag = float(seq_read_frag['read_bw_mbs'])
-    degradation_pct = ((bw_base - bw_frag) / bw_base * 100) if bw_base > 0 else 0
-
-    print(f"Baseline Sequential Read (1M): {bw_base:.2f} MB/s")
-    print(f"Fragmented Sequential Read (1M): {bw_frag:.2f} MB/s")
-    print(f"Деградация: {degradation_pct:.2f}%")
-    print(f"Средняя деградация по всем размерам блоков: {avg_deg:.2f}%")
-
-print("\nВсе графики созданы успешно!")
-PYTHON_SCRIPT
+# Графики строятся параллельно; неизменившиеся (по хэшу данных) пропускаются
+python3 "${SCRIPT_DIR}/charts.py" "$RESULTS_DIR" "$GRAPHS_DIR" --format $CHART_FORMAT --dpi "$CHART_DPI"
 
 if [ $? -ne 0 ]; then
     error "Ошибка создания графиков"
@@ -412,6 +96,34 @@ fi
 
 log "Графики созданы"
 
+# Доверительные интервалы по NUM_RUNS прогонам и оценка нужного числа повторов
+log "Статистика по прогонам..."
+python3 "${SCRIPT_DIR}/run_stats.py" "$RESULTS_DIR" || info "Статистика по прогонам не рассчитана"
+
+# Процентили латентности по гистограммам, объединённым по прогонам и заданиям
+log "Процентили латентности..."
+python3 "${SCRIPT_DIR}/latency_hist.py" "$RESULTS_DIR" || info "Данные о латентности недоступны"
+
+# Загрузка md и членов массива по тестам (выборки diskstats.py)
+log "Загрузка устройств..."
+python3 "${SCRIPT_DIR}/diskstats.py" report "$RESULTS_DIR" || info "Статистика устройств не собиралась"
+
+# Сравнение с предыдущими запусками (каталог заносится в базу, если его там ещё нет) и тренды
+log "История запусков..."
+# Перестановочные тесты считаются один раз: таблица сохраняется и вставляется в отчёт
+HISTORY_STATUS=0
+python3 "${SCRIPT_DIR}/history.py" --db "$HISTORY_DB" check "$WORK_DIR" --markdown \
+    > "${RESULTS_DIR}/regression.md" || HISTORY_STATUS=$?
+case "$HISTORY_STATUS" in
+    0) cat "${RESULTS_DIR}/regression.md" ;;
+    2) cat "${RESULTS_DIR}/regression.md"
+       info "Есть регрессии относительно предыдущих запусков: ${RESULTS_DIR}/regression.md" ;;
+    *) echo "Данные недоступны" > "${RESULTS_DIR}/regression.md"
+       info "Запуск не занесён в историю" ;;
+esac
+python3 "${SCRIPT_DIR}/history.py" --db "$HISTORY_DB" trend --graphs-dir "$GRAPHS_DIR" --format $CHART_FORMAT \
+    || info "Графики трендов не построены"
+
 # 3. Генерация отчета
 log "Шаг 3: Генерация отчета..."
 
@@ -537,10 +249,10 @@ RAID 10 (также известный как RAID 1+0) представляет
 
 Для создания сильно фрагментированного файла использовалась следующая методика:
 
-1. Создание 200 файлов по 4 MB каждый
-2. Удаление каждого второго файла (создание "дыр" в файловой системе)
-3. Запись большого файла (800 MB) в освободившееся фрагментированное пространство
-4. Измерение степени фрагментации с помощью утилиты **filefrag**
+1. Выделение места под файл (800 MB) одним вызовом fallocate: заданное число кусков (по умолчанию 2000) и зазоры между ними
+2. Вырезание зазоров через fallocate(FALLOC_FL_COLLAPSE_RANGE): физические блоки кусков остаются на месте, на диске между ними появляются промежутки, и каждый кусок становится отдельным экстентом (**fragment.py**)
+3. Заполнение файла данными
+4. Измерение степени фрагментации через ioctl FIEMAP (**extents.py**): число экстентов, их размеры и расстояния между ними на диске
 
 #### 3.2.3 Тесты на фрагментированных файлах
 
@@ -549,8 +261,9 @@ RAID 10 (также известный как RAID 1+0) представляет
 ### 3.3 Инструментарий
 
 - **fio** (Flexible I/O Tester) - бенчмаркинг дисковой подсистемы
+- **loadgen.py** - генератор нагрузки по тем же job-файлам (preadv/pwritev, O_DIRECT) на случай, если fio не установлен
 - **mdadm** - управление программными RAID массивами
-- **filefrag** - анализ степени фрагментации файлов
+- **extents.py** (FIEMAP) - анализ степени фрагментации файлов
 - **Python 3** + **Matplotlib** - анализ данных и визуализация
 - **bash** - автоматизация тестирования
 
@@ -582,13 +295,13 @@ if [ -f "${RESULTS_DIR}/fragmentation_details.txt" ]; then
 fi
 )
 
-Высокая степень фрагментации достигнута путем создания множества файлов с последующим удалением каждого второго, что привело к неоднородному распределению свободного пространства на диске.
+Степень фрагментации задаётся явно: файл строится из заданного числа экстентов, разделённых свободными промежутками на диске, так что раскладка повторяется от запуска к запуску и не зависит от состояния аллокатора.
 
 ### 4.3 Графики результатов
 
 #### 4.3.1 Последовательное чтение - сравнение производительности
 
-![Влияние фрагментации на последовательное чтение](graphs/fragmentation_impact_sequential.png)
+![Влияние фрагментации на последовательное чтение](graphs/fragmentation_impact_sequential.${CHART_EXT})
 
 **Анализ:** График демонстрирует пропускную способность для различных размеров блоков (от 4K до 1M). Наблюдается существенное снижение производительности при работе с фрагментированными файлами. Эффект наиболее выражен для больших размеров блоков, где разница может достигать 30-50%.
 
@@ -596,7 +309,7 @@ fi
 
 #### 4.3.2 Случайный доступ - влияние на IOPS
 
-![Влияние фрагментации на IOPS](graphs/fragmentation_impact_iops.png)
+![Влияние фрагментации на IOPS](graphs/fragmentation_impact_iops.${CHART_EXT})
 
 **Анализ:** Случайный доступ (4K блоки) демонстрирует меньшую чувствительность к фрагментации по сравнению с последовательным доступом. Это объясняется тем, что при случайном доступе операции изначально происходят в разных местах диска, и дополнительная фрагментация оказывает меньшее влияние.
 
@@ -604,7 +317,7 @@ fi
 
 #### 4.3.3 Деградация производительности
 
-![Процент снижения производительности](graphs/performance_degradation.png)
+![Процент снижения производительности](graphs/performance_degradation.${CHART_EXT})
 
 **Анализ:** График показывает процентное снижение производительности для различных размеров блоков. Ключевые наблюдения:
 - Наибольшая деградация наблюдается для средних и больших размеров блоков (64K-1M)
@@ -615,15 +328,19 @@ fi
 
 #### 4.3.4 Латентность операций
 
-![Влияние фрагментации на латентность](graphs/fragmentation_impact_latency.png)
+![Влияние фрагментации на латентность](graphs/fragmentation_impact_latency.${CHART_EXT})
 
 **Анализ:** Фрагментация увеличивает задержки (latency) операций ввода-вывода. Это происходит из-за необходимости доступа к множеству несмежных областей диска, что требует дополнительных операций поиска и увеличивает время отклика системы.
 
+![Распределение латентности чтения](graphs/fragmentation_impact_latency_cdf.${CHART_EXT})
+
+Средняя латентность скрывает хвост распределения: на правом графике (1 - CDF в логарифмическом масштабе) видно, какая доля операций дольше заданного времени, и уровни p99, p99.9 и p99.99 (раздел 4.6).
+
 ---
 
 #### 4.3.5 Сравнение операций чтения и записи
 
-![Сравнение чтения и записи](graphs/read_write_comparison.png)
+![Сравнение чтения и записи](graphs/read_write_comparison.${CHART_EXT})
 
 **Анализ:** Сравнение производительности операций чтения и записи, а также поведение системы при смешанной нагрузке (70% чтение / 30% запись).
 
@@ -633,57 +350,83 @@ fi
 
 $(
 python3 - <<'PYTHON_TABLE'
-import csv
 import os
+import sys
+
+sys.path.insert(0, os.environ['SCRIPT_DIR'])
+import fio_ingest
+import results_index
 
-results_dir = os.environ['RESULTS_DIR']
-csv_file = os.path.join(results_dir, 'summary_results.csv')
+data = fio_ingest.load(os.environ['RESULTS_DIR'])
 
-if not os.path.exists(csv_file):
+if len(data) == 0:
     print("| Тест | Пропускная способность (MB/s) | IOPS | Латентность (ms) |")
     print("|------|-------------------------------|------|------------------|")
     print("| Данные недоступны | - | - | - |")
     exit(0)
 
-data = []
-with open(csv_file, 'r') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        data.append(row)
+index = results_index.build(data)
+MB = 1 << 20
 
 key_tests = [
-    ('baseline_seq_read', 'Последовательное чтение (baseline, 1M)', 'read'),
-    ('fragmented_seq_read', 'Последовательное чтение (fragmented, 1M)', 'read'),
-    ('baseline_seq_write', 'Последовательная запись (baseline, 1M)', 'write'),
-    ('baseline_rand_read_4k', 'Случайное чтение 4K (baseline)', 'read'),
-    ('fragmented_rand_read_4k', 'Случайное чтение 4K (fragmented)', 'read'),
-    ('baseline_rand_write_4k', 'Случайная запись 4K (baseline)', 'write'),
-    ('baseline_mixed', 'Смешанная нагрузка (read)', 'read'),
-    ('baseline_mixed', 'Смешанная нагрузка (write)', 'write'),
+    (dict(state='baseline', scenario='seq_read', bs=MB), 'Последовательное чтение (baseline, 1M)', 'read'),
+    (dict(state='fragmented', scenario='seq_read', bs=MB), 'Последовательное чтение (fragmented, 1M)', 'read'),
+    (dict(state='baseline', scenario='seq_write', bs=MB), 'Последовательная запись (baseline, 1M)', 'write'),
+    (dict(state='baseline', scenario='rand_read', bs=4096), 'Случайное чтение 4K (baseline)', 'read'),
+    (dict(state='fragmented', scenario='rand_read', bs=4096), 'Случайное чтение 4K (fragmented)', 'read'),
+    (dict(state='baseline', scenario='rand_write', bs=4096), 'Случайная запись 4K (baseline)', 'write'),
+    (dict(state='baseline', scenario='mixed'), 'Смешанная нагрузка (read)', 'read'),
+    (dict(state='baseline', scenario='mixed'), 'Смешанная нагрузка (write)', 'write'),
 ]
 
-print("| Тест | Пропускная способность (MB/s) | IOPS | Латентность (ms) |")
-print("|------|-------------------------------|------|------------------|")
 
-for test_name, test_label, operation in key_tests:
-    test_data = next((d for d in data if d['test_name'] == test_name), None)
+def cell(group, field, fmt):
+    """Среднее, при нескольких прогонах — со стандартным отклонением"""
+    if group['n'] > 1:
+        return f"{group[field]:{fmt}} ± {group[field + '_std']:{fmt}}"
+    return f"{group[field]:{fmt}}"
 
-    if test_data:
-        if operation == 'read':
-            bw = test_data['read_bw_mbs']
-            iops = test_data['read_iops']
-            lat = test_data['read_lat_ms']
-        else:
-            bw = test_data['write_bw_mbs']
-            iops = test_data['write_iops']
-            lat = test_data['write_lat_ms']
 
-        print(f"| {test_label} | {bw} | {iops} | {lat} |")
+print("| Тест | Пропускная способность (MB/s) | IOPS | Латентность (ms) | Прогонов |")
+print("|------|-------------------------------|------|------------------|----------|")
+
+for criteria, test_label, operation in key_tests:
+    group = results_index.lookup(index, **criteria)
+
+    if group is not None:
+        print(f"| {test_label} | {cell(group, operation + '_bw_mbs', '.2f')} | "
+              f"{cell(group, operation + '_iops', '.2f')} | {cell(group, operation + '_lat_ms', '.3f')} | {group['n']} |")
     else:
-        print(f"| {test_label} | N/A | N/A | N/A |")
+        print(f"| {test_label} | N/A | N/A | N/A | 0 |")
 PYTHON_TABLE
 )
 
+### 4.5 Разброс между прогонами и значимость различий
+
+Для каждого сценария — среднее по прогонам с 95% бутстрэп-интервалом, коэффициент вариации (CV) и деградация при фрагментации с интервалом. Пометка «н/з» означает, что интервал деградации содержит 0 и различие не значимо. Последний столбец — оценка числа дополнительных прогонов для точности среднего ±5% (или для значимости различия).
+
+$(python3 "${SCRIPT_DIR}/run_stats.py" "$RESULTS_DIR" --markdown 2>/dev/null || echo "Данные недоступны")
+
+### 4.6 Хвостовые задержки
+
+Процентили латентности завершения (clat) по гистограммам с лог-линейными корзинами (точность 0.8%), объединённым по всем прогонам и заданиям теста. Источник — логи латентности fio (LAT_LOG=1) или корзины из JSON (json+); значения с пометкой «≈» восстановлены по таблице процентилей и приблизительны.
+
+$(python3 "${SCRIPT_DIR}/latency_hist.py" "$RESULTS_DIR" --markdown 2>/dev/null || echo "Данные недоступны")
+
+### 4.7 Загрузка устройств и баланс чтения между зеркалами
+
+Счётчики /proc/diskstats md-устройства и каждого члена массива, снятые во время теста (среднее по прогонам): операций в секунду, пропускная способность, утилизация (%util) и средняя длина очереди (aqu-sz). В RAID 10 с layout n2 копии данных лежат на соседних членах массива; последний столбец — доля прочитанных секторов каждого члена в своей паре зеркал (50% — чтение распределено поровну).
+
+$(python3 "${SCRIPT_DIR}/diskstats.py" report "$RESULTS_DIR" --markdown 2>/dev/null || echo "Данные недоступны")
+
+### 4.8 Сравнение с предыдущими запусками
+
+Каждая группа тестов сравнивается с той же группой в последних 10 запусках с той же конфигурацией массива (уровень RAID, число устройств, chunk, layout, размеры устройств и тестового файла) из базы \`$(basename "$HISTORY_DB")\`. Значимость — перестановочный тест разности средних по прогонам; «регрессия» означает падение не меньше чем на 5% при p < 0.05.
+
+$(cat "${RESULTS_DIR}/regression.md")
+
+![Последовательное чтение по запускам](graphs/history_seq_read.${CHART_EXT})
+
 ---
 
 ## 5. Анализ и обсуждение результатов
@@ -1033,11 +776,15 @@ log "=== АНАЛИЗ ЗАВЕРШЕН ==="
 echo ""
 info "Результаты:"
 info "  - CSV с данными: ${RESULTS_DIR}/summary_results.csv"
+info "  - Статистика по прогонам: ${RESULTS_DIR}/run_stats.csv"
+info "  - Процентили латентности: ${RESULTS_DIR}/latency_percentiles.csv"
+info "  - История запусков: ${HISTORY_DB}"
+info "  - Сравнение с предыдущими запусками: ${RESULTS_DIR}/regression.md"
 info "  - Графики: ${GRAPHS_DIR}/"
 info "  - Отчет: ${REPORT_FILE}"
 echo ""
 info "Созданные графики:"
-ls -lh "${GRAPHS_DIR}"/*.png 2>/dev/null || echo "  Нет графиков"
+ls -lh "${GRAPHS_DIR}"/*.${CHART_EXT} 2>/dev/null || echo "  Нет графиков"
 echo ""
 log "Для просмотра отчета:"
 log "  cat '$REPORT_FILE'"
@@ -0,0 +1,391 @@
+# Графики анализа RAID-тестов: параллельная отрисовка с пропуском неизменившихся.
+#
+# Данные для каждого графика выбираются из results_index в основном процессе
+# и передаются в пул процессов (matplotlib с принудительным бэкендом Agg),
+# так что независимые savefig выполняются одновременно. В graphs/.charts.json
+# для каждого файла хранится хэш входных данных, DPI и исходного кода функции
+# графика: если он не изменился и файл на месте, график не перерисовывается.
+#
+#     python3 charts.py <results_dir> <graphs_dir>                 # PNG, 300 dpi
+#     python3 charts.py <results_dir> <graphs_dir> --draft         # PNG, 100 dpi
+#     python3 charts.py <results_dir> <graphs_dir> --format png svg --force
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import fio_ingest
+import latency_hist
+import results_index
+
+MANIFEST_NAME = '.charts.json'
+FORMATS = ('png', 'svg')
+PUBLICATION_DPI = 300
+DRAFT_DPI = 100
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+    import matplotlib.pyplot as plt
+    plt.rcParams['font.family'] = 'DejaVu Sans'
+    return plt
+
+
+def _label_bars(ax, rects, fmt, fontsize):
+    for rect in rects:
+        height = rect.get_height()
+        ax.text(rect.get_x() + rect.get_width()/2., height, fmt(height),
+                ha='center', va='bottom', fontsize=fontsize, fontweight='bold')
+
+
+# -------------------- Графики --------------------
+def sequential(plt, d):
+    """Пропускная способность последовательного чтения по размерам блока"""
+    x = np.arange(len(d['block_sizes']))
+    width = 0.35
+
+    fig, ax = plt.subplots(figsize=(14, 7))
+    rects1 = ax.bar(x - width/2, d['baseline_bw'], width, yerr=d['baseline_std'], capsize=4,
+                    label='Нефрагментированный', color='#2ecc71', edgecolor='black', linewidth=1.2)
+    rects2 = ax.bar(x + width/2, d['fragmented_bw'], width, yerr=d['fragmented_std'], capsize=4,
+                    label='Фрагментированный', color='#e74c3c', edgecolor='black', linewidth=1.2)
+    _label_bars(ax, rects1, lambda h: f'{h:.1f}', 9)
+    _label_bars(ax, rects2, lambda h: f'{h:.1f}', 9)
+
+    ax.set_xlabel('Размер блока', fontsize=13, fontweight='bold')
+    ax.set_ylabel('Пропускная способность (MB/s)', fontsize=13, fontweight='bold')
+    ax.set_title('Влияние фрагментации на последовательное чтение\n(RAID 10, 4 устройства)', fontsize=15, fontweight='bold', pad=20)
+    ax.set_xticks(x)
+    ax.set_xticklabels(d['block_sizes'], fontsize=11)
+    ax.legend(fontsize=12, loc='upper left')
+    ax.grid(axis='y', alpha=0.3, linestyle='--')
+    ax.set_axisbelow(True)
+    return fig
+
+
+def iops(plt, d):
+    """IOPS случайного чтения 4K"""
+    categories = ['Нефрагментированный', 'Фрагментированный']
+    iops_values = [d['baseline_iops'], d['fragmented_iops']]
+
+    fig, ax = plt.subplots(figsize=(10, 7))
+    bars = ax.bar(categories, iops_values, color=['#3498db', '#e67e22'], width=0.6, edgecolor='black', linewidth=1.5)
+
+    ax.set_ylabel('IOPS', fontsize=13, fontweight='bold')
+    ax.set_title('Случайное чтение (4K блоки): влияние фрагментации на IOPS\n(RAID 10)', fontsize=15, fontweight='bold', pad=20)
+    ax.grid(axis='y', alpha=0.3, linestyle='--')
+    ax.set_axisbelow(True)
+    _label_bars(ax, bars, lambda h: f'{int(h):,}', 12)
+
+    if iops_values[0] > 0:
+        change_pct = ((iops_values[1] - iops_values[0]) / iops_values[0]) * 100
+        ax.text(0.5, max(iops_values) * 0.95, f'Изменение: {change_pct:+.1f}%',
+                ha='center', fontsize=11, bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+    return fig
+
+
+def degradation(plt, d):
+    """Процент снижения пропускной способности по размерам блока"""
+    block_sizes, values = d['block_sizes'], d['degradation']
+
+    fig, ax = plt.subplots(figsize=(14, 7))
+    ax.plot(block_sizes, values, marker='o', linewidth=3, markersize=10, color='#c0392b', label='Деградация')
+    ax.fill_between(range(len(block_sizes)), values, alpha=0.3, color='#e74c3c')
+    for i, deg in enumerate(values):
+        ax.text(i, deg + 1, f'{deg:.1f}%', ha='center', va='bottom', fontsize=10, fontweight='bold')
+
+    ax.set_xlabel('Размер блока', fontsize=13, fontweight='bold')
+    ax.set_ylabel('Деградация производительности (%)', fontsize=13, fontweight='bold')
+    ax.set_title('Процент снижения производительности из-за фрагментации\n(последовательное чтение)', fontsize=15, fontweight='bold', pad=20)
+    ax.set_xticks(range(len(block_sizes)))
+    ax.set_xticklabels(block_sizes, fontsize=11)
+    ax.grid(True, alpha=0.3, linestyle='--')
+    ax.axhline(y=0, color='k', linestyle='-', linewidth=1)
+    ax.set_axisbelow(True)
+
+    avg_deg = float(np.mean(values))
+    ax.axhline(y=avg_deg, color='blue', linestyle='--', linewidth=2, alpha=0.7, label=f'Среднее: {avg_deg:.1f}%')
+    ax.legend(fontsize=11)
+    return fig
+
+
+def latency(plt, d):
+    """Средняя латентность последовательного чтения по размерам блока"""
+    x = np.arange(len(d['block_sizes']))
+    width = 0.35
+
+    fig, ax = plt.subplots(figsize=(14, 7))
+    ax.bar(x - width/2, d['baseline_lat'], width, label='Нефрагментированный', color='#16a085', edgecolor='black', linewidth=1.2)
+    ax.bar(x + width/2, d['fragmented_lat'], width, label='Фрагментированный', color='#d35400', edgecolor='black', linewidth=1.2)
+
+    ax.set_xlabel('Размер блока', fontsize=13, fontweight='bold')
+    ax.set_ylabel('Латентность (ms)', fontsize=13, fontweight='bold')
+    ax.set_title('Влияние фрагментации на латентность чтения\n(RAID 10)', fontsize=15, fontweight='bold', pad=20)
+    ax.set_xticks(x)
+    ax.set_xticklabels(d['block_sizes'], fontsize=11)
+    ax.legend(fontsize=12)
+    ax.grid(axis='y', alpha=0.3, linestyle='--')
+    ax.set_axisbelow(True)
+    return fig
+
+
+def latency_cdf(plt, d):
+    """Распределение латентности чтения: CDF и хвост (1 - CDF) по объединённым гистограммам"""
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+    colors = plt.get_cmap('tab10')
+    for i, pair in enumerate(d['pairs']):
+        for state, style in (('baseline', '-'), ('fragmented', '--')):
+            x, y = pair[state]
+            label = f"{pair['label']} ({'нефрагм.' if state == 'baseline' else 'фрагм.'})"
+            ax1.plot(x, y, style, color=colors(i % 10), linewidth=1.8, label=label)
+            tail = 1 - np.asarray(y)
+            keep = tail > 0
+            ax2.plot(np.asarray(x)[keep], tail[keep], style, color=colors(i % 10), linewidth=1.8)
+
+    ax1.set_xscale('log')
+    ax1.set_xlabel('Латентность (мкс)', fontsize=12, fontweight='bold')
+    ax1.set_ylabel('Доля операций', fontsize=12, fontweight='bold')
+    ax1.set_title('CDF латентности чтения', fontsize=13, fontweight='bold')
+    ax1.grid(alpha=0.3, linestyle='--', which='both')
+    ax1.legend(fontsize=8)
+
+    ax2.set_xscale('log')
+    ax2.set_yscale('log')
+    for level, name in ((1e-2, 'p99'), (1e-3, 'p99.9'), (1e-4, 'p99.99')):
+        ax2.axhline(level, color='gray', linewidth=0.8, linestyle=':')
+        ax2.text(ax2.get_xlim()[0], level, f' {name}', va='bottom', fontsize=9, color='gray')
+    ax2.set_xlabel('Латентность (мкс)', fontsize=12, fontweight='bold')
+    ax2.set_ylabel('Доля операций дольше (1 - CDF)', fontsize=12, fontweight='bold')
+    ax2.set_title('Хвост распределения', fontsize=13, fontweight='bold')
+    ax2.grid(alpha=0.3, linestyle='--', which='both')
+    return fig
+
+
+def read_write(plt, d):
+    """Чтение против записи (1M) и смешанная нагрузка 70/30"""
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+
+    if d['read_bw'] is not None:
+        bars = ax1.bar(['Sequential Read', 'Sequential Write'], [d['read_bw'], d['write_bw']],
+                       color=['#3498db', '#e74c3c'], width=0.6, edgecolor='black', linewidth=1.5)
+        ax1.set_ylabel('Пропускная способность (MB/s)', fontsize=12, fontweight='bold')
+        ax1.set_title('Сравнение чтения и записи\n(1M блоки)', fontsize=13, fontweight='bold')
+        ax1.grid(axis='y', alpha=0.3, linestyle='--')
+        ax1.set_axisbelow(True)
+        _label_bars(ax1, bars, lambda h: f'{h:.1f}', 11)
+
+    if d['mixed_iops'] is not None:
+        bars = ax2.bar(['Read IOPS\n(70%)', 'Write IOPS\n(30%)'], d['mixed_iops'],
+                       color=['#2ecc71', '#e67e22'], width=0.6, edgecolor='black', linewidth=1.5)
+        ax2.set_ylabel('IOPS', fontsize=12, fontweight='bold')
+        ax2.set_title('Смешанная нагрузка\n(70/30 Read/Write, 4K)', fontsize=13, fontweight='bold')
+        ax2.grid(axis='y', alpha=0.3, linestyle='--')
+        ax2.set_axisbelow(True)
+        _label_bars(ax2, bars, lambda h: f'{int(h):,}', 11)
+    return fig
+
+
+# Имя файла (без расширения) -> функция; порядок — как в отчёте
+CHARTS = {
+    'fragmentation_impact_sequential': sequential,
+    'fragmentation_impact_iops': iops,
+    'performance_degradation': degradation,
+    'fragmentation_impact_latency': latency,
+    'fragmentation_impact_latency_cdf': latency_cdf,
+    'read_write_comparison': read_write,
+}
+
+
+# -------------------- Данные --------------------
+def _latency_pairs(hists):
+    """Тесты, для которых есть гистограммы чтения в обоих состояниях: подпись и точки CDF в мкс"""
+    pairs = []
+    for test in sorted(hists):
+        state = results_index.parse_test_name(test)[1]
+        other = 'fragmented' + test[len('baseline'):]
+        if state != 'baseline' or other not in hists:
+            continue
+        base, frag = hists[test]['read'], hists[other]['read']
+        if not latency_hist.total(base) or not latency_hist.total(frag):
+            continue
+        pair = {'label': test[len('baseline_'):]}
+        for name, hist in (('baseline', base), ('fragmented', frag)):
+            x, y = latency_hist.cdf(hist)
+            pair[name] = [(x / 1000).tolist(), y.tolist()]
+        pairs.append(pair)
+    return pairs
+
+
+def collect(index, hists=None):
+    """{имя графика: данные (только списки и числа)} для графиков, для которых есть результаты"""
+    MB = 1 << 20
+    jobs = {}
+
+    base, frag = results_index.paired(index, scenario='seq_read', rw='read')
+    if len(base):
+        block_sizes = [results_index.format_size(bs) for bs in base['bs']]
+        baseline_bw, fragmented_bw = base['read_bw_mbs'], frag['read_bw_mbs']
+        jobs['fragmentation_impact_sequential'] = {
+            'block_sizes': block_sizes,
+            'baseline_bw': baseline_bw.tolist(), 'baseline_std': base['read_bw_mbs_std'].tolist(),
+            'fragmented_bw': fragmented_bw.tolist(), 'fragmented_std': frag['read_bw_mbs_std'].tolist(),
+        }
+        deg = np.where(baseline_bw > 0, (baseline_bw - fragmented_bw) / np.where(baseline_bw > 0, baseline_bw, 1) * 100, 0.0)
+        jobs['performance_degradation'] = {'block_sizes': block_sizes, 'degradation': deg.tolist()}
+        jobs['fragmentation_impact_latency'] = {
+            'block_sizes': block_sizes,
+            'baseline_lat': np.where(base['read_lat_ms'] > 0, base['read_lat_ms'], 0.001).tolist(),
+            'fragmented_lat': np.where(frag['read_lat_ms'] > 0, frag['read_lat_ms'], 0.001).tolist(),
+        }
+
+    pairs = _latency_pairs(hists or {})
+    if pairs:
+        jobs['fragmentation_impact_latency_cdf'] = {'pairs': pairs}
+
+    base_rand = results_index.lookup(index, state='baseline', scenario='rand_read', bs=4096)
+    frag_rand = results_index.lookup(index, state='fragmented', scenario='rand_read', bs=4096)
+    if base_rand is not None and frag_rand is not None:
+        jobs['fragmentation_impact_iops'] = {'baseline_iops': float(base_rand['read_iops']),
+                                             'fragmented_iops': float(frag_rand['read_iops'])}
+
+    seq_write = results_index.lookup(index, state='baseline', scenario='seq_write', bs=MB)
+    if seq_write is not None:
+        seq_read = results_index.lookup(index, state='baseline', scenario='seq_read', bs=MB)
+        mixed = results_index.lookup(index, state='baseline', scenario='mixed')
+        jobs['read_write_comparison'] = {
+            'write_bw': float(seq_write['write_bw_mbs']),
+            'read_bw': float(seq_read['read_bw_mbs']) if seq_read is not None else None,
+            'mixed_iops': [float(mixed['read_iops']), float(mixed['write_iops'])] if mixed is not None else None,
+        }
+    return jobs
+
+
+def input_hash(name, payload, dpi):
+    """Хэш данных графика, DPI и кода его функции"""
+    h = hashlib.sha1(json.dumps(payload, sort_keys=True).encode())
+    h.update(f'|{dpi}|'.encode())
+    h.update(inspect.getsource(CHARTS[name]).encode())
+    return h.hexdigest()
+
+
+# -------------------- Отрисовка --------------------
+def _render(job):
+    name, payload, paths, dpi = job
+    start = time.perf_counter()
+    plt = _pyplot()
+    fig = CHARTS[name](plt, payload)
+    fig.tight_layout()
+    for path in paths:
+        fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return name, time.perf_counter() - start
+
+
+def _read_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def render_all(index, graphs_dir, formats=('png',), dpi=PUBLICATION_DPI, workers=None, force=False, hists=None):
+    """Перерисовать изменившиеся графики; [(имя, секунды или None, если пропущен)]"""
+    os.makedirs(graphs_dir, exist_ok=True)
+    manifest_path = os.path.join(graphs_dir, MANIFEST_NAME)
+    manifest = _read_manifest(manifest_path)
+
+    jobs, results = [], []
+    for name, payload in collect(index, hists).items():
+        digest = input_hash(name, payload, dpi)
+        files = [f'{name}.{fmt}' for fmt in formats]
+        stale = [f for f in files if force or manifest.get(f) != digest
+                 or not os.path.exists(os.path.join(graphs_dir, f))]
+        if stale:
+            jobs.append((name, payload, [os.path.join(graphs_dir, f) for f in stale], dpi))
+            manifest.update({f: digest for f in stale})
+        else:
+            results.append((name, None))
+
+    if len(jobs) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=min(len(jobs), workers or os.cpu_count() or 1)) as pool:
+            results.extend(pool.map(_render, jobs))
+    else:
+        results.extend(_render(job) for job in jobs)
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    order = list(CHARTS)
+    return sorted(results, key=lambda r: order.index(r[0]))
+
+
+def print_summary(index):
+    """Сводка по последовательному чтению 1M"""
+    MB = 1 << 20
+    print("\n=== СТАТИСТИКА ===")
+    seq_read_base = results_index.lookup(index, state='baseline', scenario='seq_read', bs=MB)
+    seq_read_frag = results_index.lookup(index, state='fragmented', scenario='seq_read', bs=MB)
+    if seq_read_base is not None and seq_read_frag is not None:
+        bw_base = float(seq_read_base['read_bw_mbs'])
+        bw_frag = float(seq_read_frag['read_bw_mbs'])
+        degradation_pct = ((bw_base - bw_frag) / bw_base * 100) if bw_base > 0 else 0
+        print(f"Baseline Sequential Read (1M): {bw_base:.2f} MB/s")
+        print(f"Fragmented Sequential Read (1M): {bw_frag:.2f} MB/s")
+        print(f"Деградация: {degradation_pct:.2f}%")
+
+    base, frag = results_index.paired(index, scenario='seq_read', rw='read')
+    ok = base['read_bw_mbs'] > 0
+    if ok.any():
+        avg_deg = np.mean((base['read_bw_mbs'][ok] - frag['read_bw_mbs'][ok]) / base['read_bw_mbs'][ok] * 100)
+        print(f"Средняя деградация по всем размерам блоков: {avg_deg:.2f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Графики по результатам fio')
+    parser.add_argument('results_dir')
+    parser.add_argument('graphs_dir')
+    parser.add_argument('--format', nargs='+', default=['png'], choices=FORMATS)
+    parser.add_argument('--dpi', type=int, default=PUBLICATION_DPI)
+    parser.add_argument('--draft', action='store_true', help=f'черновик: {DRAFT_DPI} dpi')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='перерисовать все графики')
+    args = parser.parse_args()
+
+    try:
+        _pyplot()
+    except ImportError:
+        print("ERROR: matplotlib не установлен. Выполните: sudo apt install python3-matplotlib python3-numpy")
+        sys.exit(1)
+
+    data = fio_ingest.load(args.results_dir)
+    if len(data) == 0:
+        print("Нет данных для графиков", file=sys.stderr)
+        sys.exit(1)
+    index = results_index.build(data)
+    print(f"Загружено {len(data)} записей, {len(index['runs'])} прогонов")
+
+    start = time.perf_counter()
+    dpi = DRAFT_DPI if args.draft else args.dpi
+    hists = latency_hist.load(args.results_dir)
+    results = render_all(index, args.graphs_dir, args.format, dpi, args.workers, args.force, hists)
+    for i, (name, seconds) in enumerate(results, 1):
+        if seconds is None:
+            print(f"  График {i}: {name} — без изменений")
+        else:
+            print(f"✓ График {i}: {name}.{'/'.join(args.format)} ({seconds:.1f} с)")
+    print(f"Графики: {sum(s is not None for _, s in results)} построено, "
+          f"{sum(s is None for _, s in results)} пропущено за {time.perf_counter() - start:.1f} с ({dpi} dpi)")
+
+    print_summary(index)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+# Статистика блочных устройств во время теста (вместо iostat).
+#
+# Поток внутри процесса-обёртки читает счётчики /proc/diskstats (один read на
+# все устройства) или /sys/block/<dev>/stat (по файлу на устройство) с
+# заданным интервалом и пишет их прямо в строку кольцевого буфера NumPy,
+# выделенного заранее, — за выборку один pread и разбор нескольких строк.
+# Первая выборка хранится отдельно, поэтому итоги за тест точны, даже если
+# буфер успел перезаписаться.
+#
+# Обёртка запускает команду теста (fio или loadgen.py) и сохраняет выборки
+# в <results_dir>/<тест>.diskstats.npz. По ним для каждого устройства
+# считаются (как у iostat -x): r/s, w/s, MB/s, r_await, утилизация (%util)
+# и средняя длина очереди (aqu-sz), а также пик очереди по интервалам.
+# Для RAID 10 layout n2 копии блока лежат на соседних членах массива
+# (0-1, 2-3, ...): доля чтений каждого члена пары показывает, как md
+# распределяет чтение между зеркалами.
+#
+#     python3 diskstats.py run --output res/t.diskstats.npz --devices md0 loop0 loop1 loop2 loop3 -- fio t.fio
+#     python3 diskstats.py report <results_dir> [--markdown]
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+import results_index
+
+# Поля /proc/diskstats после major, minor, имени (и /sys/block/<dev>/stat)
+FIELDS = ('reads', 'reads_merged', 'sectors_read', 'ms_reading', 'writes', 'writes_merged',
+          'sectors_written', 'ms_writing', 'in_flight', 'io_ticks', 'time_in_queue')
+F = {name: i for i, name in enumerate(FIELDS)}
+SECTOR = 512
+SUFFIX = '.diskstats.npz'
+DEFAULT_INTERVAL = 0.1
+DEFAULT_CAPACITY = 36000
+
+
+# -------------------- Чтение счётчиков --------------------
+def _read_proc(fd, rows, out):
+    """Счётчики устройств rows ({имя: строка out}) из /proc/diskstats"""
+    for line in os.pread(fd, 1 << 20, 0).split(b'\n'):
+        parts = line.split()
+        if len(parts) >= 14:
+            row = rows.get(parts[2])
+            if row is not None:
+                out[row] = parts[3:14]
+
+
+def _read_sys(fds, out):
+    for row, fd in enumerate(fds):
+        out[row] = os.pread(fd, 4096, 0).split()[:len(FIELDS)]
+
+
+def _open_source(devices, source):
+    if source == 'proc':
+        fd = os.open('/proc/diskstats', os.O_RDONLY)
+        rows = {d.encode(): i for i, d in enumerate(devices)}
+        return [fd], lambda out: _read_proc(fd, rows, out)
+    fds = [os.open(f'/sys/block/{d}/stat', os.O_RDONLY) for d in devices]
+    return fds, lambda out: _read_sys(fds, out)
+
+
+# -------------------- Кольцевой буфер --------------------
+def new_ring(devices, capacity=DEFAULT_CAPACITY):
+    return {
+        'devices': list(devices),
+        't': np.zeros(capacity, dtype=np.float64),
+        'data': np.zeros((capacity, len(devices), len(FIELDS)), dtype=np.int64),
+        'count': 0,
+        'first_t': 0.0,
+        'first': np.zeros((len(devices), len(FIELDS)), dtype=np.int64),
+    }
+
+
+def ordered(ring):
+    """(время, счётчики) в хронологическом порядке, первая выборка — всегда начало теста"""
+    capacity = len(ring['t'])
+    n = ring['count']
+    if n <= capacity:
+        t, data = ring['t'][:n], ring['data'][:n]
+    else:
+        order = np.roll(np.arange(capacity), -(n % capacity))
+        t, data = ring['t'][order], ring['data'][order]
+        t = np.concatenate([[ring['first_t']], t])
+        data = np.concatenate([ring['first'][None], data])
+    return t, data
+
+
+def _loop(ring, read, stop, interval):
+    t, data = ring['t'], ring['data']
+    capacity = len(t)
+    deadline = time.monotonic()
+    while True:
+        slot = ring['count'] % capacity
+        read(data[slot])
+        t[slot] = time.monotonic()
+        if ring['count'] == 0:
+            ring['first'][:] = data[0]
+            ring['first_t'] = t[0]
+        ring['count'] += 1
+        deadline += interval
+        if stop.wait(max(0.0, deadline - time.monotonic())):
+            break
+    # последняя выборка — после завершения теста
+    slot = ring['count'] % capacity
+    read(data[slot])
+    t[slot] = time.monotonic()
+    ring['count'] += 1
+
+
+def start(devices, interval=DEFAULT_INTERVAL, capacity=DEFAULT_CAPACITY, source='proc'):
+    """Запустить поток опроса; возвращает состояние для stop()"""
+    ring = new_ring(devices, capacity)
+    fds, read = _open_source(devices, source)
+    stop_event = threading.Event()
+    thread = threading.Thread(target=_loop, args=(ring, read, stop_event, interval), daemon=True)
+    thread.start()
+    return {'ring': ring, 'fds': fds, 'stop': stop_event, 'thread': thread}
+
+
+def stop(sampler):
+    sampler['stop'].set()
+    sampler['thread'].join()
+    for fd in sampler['fds']:
+        os.close(fd)
+    return sampler['ring']
+
+
+def save(path, ring):
+    t, data = ordered(ring)
+    np.savez_compressed(path, devices=np.array(ring['devices']), t=t, data=data)
+
+
+def load_file(path):
+    with np.load(path) as f:
+        return [str(d) for d in f['devices']], f['t'], f['data']
+
+
+# -------------------- Метрики --------------------
+def summarize(devices, t, data):
+    """{устройство: метрики за весь интервал} по хронологическим выборкам"""
+    if len(t) < 2:
+        return {}
+    seconds = t[-1] - t[0]
+    delta = (data[-1] - data[0]).astype(np.float64)
+    steps = np.diff(t)[:, None]
+    queue = np.diff(data[:, :, F['time_in_queue']], axis=0) / 1000 / np.where(steps > 0, steps, np.inf)
+    result = {}
+    for i, dev in enumerate(devices):
+        d = delta[i]
+        ios = d[F['reads']] + d[F['writes']]
+        result[dev] = {
+            'seconds': seconds,
+            'r_s': d[F['reads']] / seconds,
+            'w_s': d[F['writes']] / seconds,
+            'rmb_s': d[F['sectors_read']] * SECTOR / (1 << 20) / seconds,
+            'wmb_s': d[F['sectors_written']] * SECTOR / (1 << 20) / seconds,
+            'sectors_read': d[F['sectors_read']],
+            'r_await': d[F['ms_reading']] / d[F['reads']] if d[F['reads']] else 0.0,
+            'w_await': d[F['ms_writing']] / d[F['writes']] if d[F['writes']] else 0.0,
+            'util': min(1.0, d[F['io_ticks']] / 1000 / seconds),
+            'aqu': d[F['time_in_queue']] / 1000 / seconds,
+            'peak_aqu': float(queue[:, i].max()) if len(queue) else 0.0,
+            'ios': ios,
+        }
+    return result
+
+
+def mirror_balance(summary, members):
+    """Пары зеркал RAID 10 n2 (соседние члены): доля чтений (по секторам) каждого члена пары"""
+    pairs = []
+    for a, b in zip(members[0::2], members[1::2]):
+        if a not in summary or b not in summary:
+            continue
+        ra, rb = summary[a]['sectors_read'], summary[b]['sectors_read']
+        share = ra / (ra + rb) if ra + rb else float('nan')
+        pairs.append((a, b, share))
+    return pairs
+
+
+def load_results(results_dir):
+    """{тест: [(устройства, сводка), ...]} по всем *.diskstats.npz, прогоны теста вместе"""
+    tests = {}
+    for path in sorted(glob.glob(os.path.join(glob.escape(results_dir), '*' + SUFFIX))):
+        name = os.path.basename(path)[:-len(SUFFIX)]
+        try:
+            devices, t, data = load_file(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Пропуск {path}: {e}", file=sys.stderr)
+            continue
+        test = results_index.parse_test_name(name)[0]
+        tests.setdefault(test, []).append((devices, summarize(devices, t, data)))
+    return tests
+
+
+def average(runs):
+    """Метрики, усреднённые по прогонам: {устройство: метрики}"""
+    merged = {}
+    for _, summary in runs:
+        for dev, m in summary.items():
+            merged.setdefault(dev, []).append(m)
+    return {dev: {k: float(np.mean([m[k] for m in ms])) for k in ms[0]} for dev, ms in merged.items()}
+
+
+# -------------------- Вывод --------------------
+def _members(devices):
+    return [d for d in devices if not d.startswith('md')]
+
+
+def print_report(tests):
+    print("=" * 110)
+    print("Загрузка устройств по тестам (среднее по прогонам)")
+    print("=" * 110)
+    print(f"{'тест':>32} | {'устройство':>10} | {'r/s':>9} | {'w/s':>9} | {'MB/s':>8} | {'%util':>6} | "
+          f"{'aqu-sz':>6} | {'пик':>6} | {'r_await':>7}")
+    for test, runs in sorted(tests.items()):
+        summary = average(runs)
+        for dev in runs[0][0]:
+            if dev not in summary:
+                continue
+            m = summary[dev]
+            print(f"{test:>32} | {dev:>10} | {m['r_s']:>9.0f} | {m['w_s']:>9.0f} | "
+                  f"{m['rmb_s'] + m['wmb_s']:>8.1f} | {m['util'] * 100:>6.1f} | {m['aqu']:>6.2f} | "
+                  f"{m['peak_aqu']:>6.1f} | {m['r_await']:>7.2f}")
+        for a, b, share in mirror_balance(summary, _members(runs[0][0])):
+            if share == share:  # nan — чтений не было
+                print(f"{'':>32} | чтение {a}/{b}: {share:.0%} / {1 - share:.0%}")
+
+
+def print_markdown(tests):
+    print("| Тест | Устройство | r/s | w/s | MB/s | %util | aqu-sz | Доля чтений в паре зеркал |")
+    print("|---|---|---|---|---|---|---|---|")
+    for test, runs in sorted(tests.items()):
+        summary = average(runs)
+        shares = {}
+        for a, b, share in mirror_balance(summary, _members(runs[0][0])):
+            shares[a], shares[b] = share, 1 - share
+        for dev in runs[0][0]:
+            if dev not in summary:
+                continue
+            m = summary[dev]
+            share = shares.get(dev)
+            balance = '—' if share is None or share != share else f'{share:.0%}'
+            print(f"| {test} | {dev} | {m['r_s']:.0f} | {m['w_s']:.0f} | {m['rmb_s'] + m['wmb_s']:.1f} | "
+                  f"{m['util'] * 100:.1f} | {m['aqu']:.2f} | {balance} |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Статистика устройств во время тестов (/proc/diskstats)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help='выполнить команду, собирая статистику')
+    run.add_argument('--output', required=True, help=f'файл выборок (*{SUFFIX})')
+    run.add_argument('--devices', nargs='+', required=True, help='md0 loop0 loop1 ... (члены — в порядке массива)')
+    run.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='секунд между выборками')
+    run.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY, help='размер кольцевого буфера')
+    run.add_argument('--source', default='proc', choices=('proc', 'sys'))
+    run.add_argument('cmd', nargs=argparse.REMAINDER, help='-- команда теста')
+
+    report = sub.add_parser('report', help='сводка по всем тестам каталога')
+    report.add_argument('results_dir')
+    report.add_argument('--markdown', action='store_true', help='только таблица Markdown для отчёта')
+    args = parser.parse_args()
+
+    if args.command == 'report':
+        tests = load_results(args.results_dir)
+        if not tests:
+            print("Нет данных о загрузке устройств", file=sys.stderr)
+            sys.exit(1)
+        if args.markdown:
+            print_markdown(tests)
+        else:
+            print_report(tests)
+        return
+
+    cmd = args.cmd[1:] if args.cmd[:1] == ['--'] else args.cmd
+    if not cmd:
+        parser.error('не задана команда теста')
+    devices = [os.path.basename(d) for d in args.devices]
+    try:
+        sampler = start(devices, args.interval, args.capacity, args.source)
+    except OSError as e:
+        # без статистики тест всё равно выполняется
+        print(f"diskstats: {e}", file=sys.stderr)
+        sys.exit(subprocess.call(cmd))
+    try:
+        code = subprocess.call(cmd)
+    finally:
+        ring = stop(sampler)
+        save(args.output, ring)
+    sys.exit(code)
+
+
+if __name__ == '__main__':
+    main()
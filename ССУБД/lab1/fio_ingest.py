@@ -0,0 +1,225 @@
+# Разбор JSON-результатов fio в колоночное хранилище NumPy.
+#
+# Каждый результат fio (*.json с массивом jobs) из каталога results
+# превращается в строки структурированного массива (одна строка на job): test_name, job_name, параметры задания (rw,
+# bs в байтах, iodepth, numjobs), пропускная способность, IOPS и средняя
+# латентность для чтения и записи. Разобранное хранится в
+# results/.fio_ingest.npz вместе с (имя, mtime_ns, размер) исходных файлов,
+# так что при повторном анализе разбираются только новые и изменённые файлы.
+# Новые файлы разбираются параллельно в пуле процессов.
+#
+#     python3 fio_ingest.py <results_dir>            # обновить кэш и summary_results.csv
+#     python3 fio_ingest.py <results_dir> --no-csv
+#
+# Из Python:
+#     import fio_ingest
+#     data = fio_ingest.load(results_dir)
+#     data[data['test_name'] == 'baseline_seq_read']['read_bw_mbs']
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+CACHE_NAME = '.fio_ingest.npz'
+CSV_NAME = 'summary_results.csv'
+CACHE_VERSION = 2
+
+RECORD_DTYPE = np.dtype([
+    ('test_name', 'U128'),
+    ('job_name', 'U64'),
+    ('rw', 'U16'),
+    ('bs', 'i8'),
+    ('iodepth', 'i4'),
+    ('numjobs', 'i4'),
+    ('read_bw_mbs', 'f8'),
+    ('read_iops', 'f8'),
+    ('read_lat_ms', 'f8'),
+    ('write_bw_mbs', 'f8'),
+    ('write_iops', 'f8'),
+    ('write_lat_ms', 'f8'),
+])
+
+FILE_DTYPE = np.dtype([('name', 'U256'), ('mtime_ns', 'i8'), ('size', 'i8')])
+
+# Ниже этого числа файлов пул процессов стоит дороже, чем разбор в одном процессе
+PARALLEL_THRESHOLD = 8
+
+_UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
+
+def parse_size(text, default=0):
+    """Размер в записи fio ('4K', '1m', '4096', '4k-16k', '64k,4k') в байтах; первое значение"""
+    m = re.match(r'\s*(\d+)\s*([kmg]?)i?b?', str(text).lower())
+    if not m:
+        return default
+    return int(m.group(1)) * _UNITS[m.group(2)]
+
+
+# -------------------- Разбор одного файла --------------------
+def load_json(path):
+    """JSON fio; предупреждения fio перед документом ('fio: ...') пропускаются"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    start = raw.find(b'{')
+    if start < 0:
+        raise ValueError('JSON не найден')
+    return json.loads(raw[start:])
+
+
+def is_result(data):
+    """Документ — результат fio, а не config.json или sweep_progress.json из того же каталога"""
+    return isinstance(data, dict) and isinstance(data.get('jobs'), list)
+
+
+def _direction(job, name):
+    d = job.get(name) or {}
+    return (d.get('bw', 0) / 1024,
+            d.get('iops', 0),
+            (d.get('lat_ns') or {}).get('mean', 0) / 1000000)
+
+
+def _options(data, job):
+    opts = dict(data.get('global options') or {})
+    opts.update(job.get('job options') or {})
+    return (opts.get('rw', opts.get('readwrite', 'read')),
+            parse_size(opts.get('bs', opts.get('blocksize', '4k')), 4096),
+            int(opts.get('iodepth', 1)),
+            int(opts.get('numjobs', 1)))
+
+
+def parse_file(path):
+    """Строки RECORD_DTYPE (список кортежей) для одного результата fio"""
+    data = load_json(path)
+    if not is_result(data):
+        return []
+    test_name = os.path.splitext(os.path.basename(path))[0]
+    rows = []
+    for job in data['jobs']:
+        rows.append((test_name, job.get('jobname', 'unknown')) + _options(data, job)
+                    + _direction(job, 'read') + _direction(job, 'write'))
+    return rows
+
+
+def _parse_safe(path):
+    try:
+        return path, parse_file(path), None
+    except Exception as e:
+        return path, [], str(e)
+
+
+# -------------------- Кэш --------------------
+def _scan(results_dir):
+    entries = []
+    for entry in os.scandir(results_dir):
+        # служебные файлы (.fio_ingest.npz, .sweep_progress.json) начинаются с точки
+        if entry.is_file() and entry.name.endswith('.json') and not entry.name.startswith('.'):
+            st = entry.stat()
+            entries.append((entry.name, st.st_mtime_ns, st.st_size))
+    entries.sort()
+    return np.array(entries, dtype=FILE_DTYPE)
+
+
+def _read_cache(path):
+    try:
+        with np.load(path) as cache:
+            if int(cache['version']) != CACHE_VERSION:
+                return None
+            return cache['files'], cache['records']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_cache(path, files, records):
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, version=CACHE_VERSION, files=files, records=records)
+    os.replace(tmp, path)
+
+
+def _parse_all(paths, workers):
+    if workers == 1 or len(paths) < PARALLEL_THRESHOLD:
+        return [_parse_safe(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(paths) // ((workers or os.cpu_count() or 1) * 4))
+        return list(pool.map(_parse_safe, paths, chunksize=chunksize))
+
+
+def load(results_dir, workers=None, use_cache=True, verbose=False):
+    """Все результаты каталога в виде массива RECORD_DTYPE, разбирая только изменённые файлы"""
+    files = _scan(results_dir)
+    cache_path = os.path.join(results_dir, CACHE_NAME)
+    cached = _read_cache(cache_path) if use_cache else None
+
+    if cached is not None:
+        old_files, old_records = cached
+        unchanged = files[np.isin(files, old_files)]
+        # списком, а не np.char: на пустом массиве (изменились все файлы) np.char.rpartition падает
+        keep = np.isin(old_records['test_name'], [os.path.splitext(n)[0] for n in unchanged['name']])
+        old_records = old_records[keep]
+        todo = files[~np.isin(files, old_files)]
+    else:
+        old_records = np.empty(0, dtype=RECORD_DTYPE)
+        todo = files
+
+    paths = [os.path.join(results_dir, name) for name in todo['name']]
+    rows, failed = [], []
+    for path, parsed, err in _parse_all(paths, workers):
+        if err is None:
+            rows.extend(parsed)
+        else:
+            failed.append(path)
+            print(f"Ошибка {path}: {err}", file=sys.stderr)
+
+    records = np.concatenate([old_records, np.array(rows, dtype=RECORD_DTYPE)])
+    records.sort(order=['test_name', 'job_name'], kind='stable')
+    if verbose:
+        print(f"Найдено {len(files)} JSON файлов: из кэша {len(files) - len(todo)}, "
+              f"разобрано {len(todo) - len(failed)}, с ошибками {len(failed)}")
+
+    if use_cache and (len(todo) or cached is None or len(files) != len(cached[0])):
+        # файлы с ошибками не запоминаются, чтобы их разобрали снова после исправления
+        good = files[~np.isin(files['name'], [os.path.basename(p) for p in failed])]
+        try:
+            _write_cache(cache_path, good, records)
+        except OSError as e:
+            print(f"Кэш не сохранён: {e}", file=sys.stderr)
+    return records
+
+
+# -------------------- Экспорт --------------------
+def write_csv(records, path):
+    """summary_results.csv в прежнем формате (для отчёта и внешних инструментов)"""
+    with open(path, 'w') as f:
+        f.write('test_name,job_name,read_bw_mbs,read_iops,read_lat_ms,write_bw_mbs,write_iops,write_lat_ms\n')
+        for r in records:
+            f.write(f"{r['test_name']},{r['job_name']},{round(r['read_bw_mbs'], 2)},{round(r['read_iops'], 2)},"
+                    f"{round(r['read_lat_ms'], 3)},{round(r['write_bw_mbs'], 2)},{round(r['write_iops'], 2)},"
+                    f"{round(r['write_lat_ms'], 3)}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Разбор результатов fio в колоночное хранилище')
+    parser.add_argument('results_dir')
+    parser.add_argument('--workers', type=int, default=None, help='процессов для разбора (по умолчанию все ядра)')
+    parser.add_argument('--no-cache', action='store_true', help='разобрать все файлы заново')
+    parser.add_argument('--no-csv', action='store_true', help=f'не писать {CSV_NAME}')
+    args = parser.parse_args()
+
+    records = load(args.results_dir, args.workers, use_cache=not args.no_cache, verbose=True)
+    if len(records) == 0:
+        print("Нет JSON файлов для анализа", file=sys.stderr)
+        sys.exit(1)
+
+    if not args.no_csv:
+        output_csv = os.path.join(args.results_dir, CSV_NAME)
+        write_csv(records, output_csv)
+        print(f"Результаты сохранены: {output_csv}")
+    print(f"Обработано записей: {len(records)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+# Генератор фрагментированных файлов с заданным числом экстентов.
+#
+# Вместо 200 временных файлов через dd и удаления каждого второго файл
+# строится так, чтобы раскладка не зависела от решений аллокатора:
+#   1. fallocate выделяет место под все куски и зазоры между ними одним
+#      запросом (обычно физически подряд);
+#   2. FALLOC_FL_COLLAPSE_RANGE вырезает каждый зазор из файла: логические
+#      смещения сдвигаются, а физические блоки остальных кусков остаются на
+#      месте — на диске между кусками появляются свободные промежутки,
+#      и каждый кусок становится отдельным экстентом;
+#   3. выделенное место заполняется данными (pwrite одним переиспользуемым
+#      буфером — иначе экстенты остаются unwritten и чтение идёт мимо диска);
+#   4. результат проверяется через FIEMAP (extents.py).
+# Размеры кусков задаются распределением (fixed / uniform / lognormal) с
+# фиксированным seed, так что раскладка повторяется от запуска к запуску.
+#
+# Где COLLAPSE_RANGE нет (tmpfs, старые ФС), куски файлов выделяются по
+# очереди вперемешку с зазорами служебного файла, зазоры затем освобождаются
+# punch-hole; число экстентов в этом режиме зависит от аллокатора и
+# проверяется только по факту.
+#
+#     python3 fragment.py /mnt/raid/fragmented_test.dat --size 800M --extents 2000
+#     python3 fragment.py /tmp/f.dat --size 256M --extents 500 --dist lognormal --files 4
+
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import os
+import sys
+import time
+
+import numpy as np
+
+import extents
+from fio_ingest import parse_size
+
+BLOCK = 4096
+FALLOC_FL_KEEP_SIZE = 0x01
+FALLOC_FL_PUNCH_HOLE = 0x02
+FALLOC_FL_COLLAPSE_RANGE = 0x08
+WRITE_CHUNK = 4 << 20
+
+_libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+_libc.fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+
+
+def _fallocate(fd, mode, offset, length):
+    if _libc.fallocate(fd, mode, offset, length) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+
+
+def punch_hole(fd, offset, length):
+    """Освободить блоки диапазона, не меняя размер файла"""
+    _fallocate(fd, FALLOC_FL_PUNCH_HOLE | FALLOC_FL_KEEP_SIZE, offset, length)
+
+
+def collapse_range(fd, offset, length):
+    """Удалить диапазон из файла со сдвигом последующих данных (блоки не перемещаются)"""
+    _fallocate(fd, FALLOC_FL_COLLAPSE_RANGE, offset, length)
+
+
+# -------------------- Раскладка --------------------
+def extent_sizes(size, count, dist='fixed', sigma=0.6, seed=0):
+    """count размеров кусков, кратных BLOCK, в сумме size"""
+    blocks = size // BLOCK
+    count = max(1, min(count, blocks))
+    rng = np.random.default_rng(seed)
+    if dist == 'fixed':
+        weights = np.ones(count)
+    elif dist == 'uniform':
+        weights = rng.uniform(0.5, 1.5, count)
+    elif dist == 'lognormal':
+        weights = rng.lognormal(0.0, sigma, count)
+    else:
+        raise ValueError(f'неизвестное распределение: {dist}')
+
+    # по блоку каждому куску, остальное пропорционально весам с сохранением суммы
+    share = weights / weights.sum() * (blocks - count)
+    sizes = np.floor(share).astype(np.int64) + 1
+    rest = blocks - sizes.sum()
+    sizes[np.argsort(share - np.floor(share))[::-1][:rest]] += 1
+    return sizes * BLOCK
+
+
+# -------------------- Способы --------------------
+def _build_collapse(fd, sizes, gap):
+    """Куски с зазорами одним fallocate, затем зазоры вырезаются с конца (меньше сдвигов)"""
+    ends = np.cumsum(sizes) + gap * np.arange(len(sizes))
+    os.posix_fallocate(fd, 0, int(ends[-1]))
+    for end in ends[-2::-1]:
+        collapse_range(fd, int(end), gap)
+
+
+def _build_interleave(fds, sizes, gap, filler):
+    """Куски файлов по очереди, между ними — зазор служебного файла; зазоры освобождаются"""
+    offsets = [0] * len(fds)
+    filler_size = 0
+    for k in range(max(len(s) for s in sizes)):
+        for i, fd in enumerate(fds):
+            if k < len(sizes[i]):
+                os.posix_fallocate(fd, offsets[i], int(sizes[i][k]))
+                offsets[i] += int(sizes[i][k])
+                os.posix_fallocate(filler, filler_size, gap)
+                filler_size += gap
+    try:
+        punch_hole(filler, 0, filler_size)
+    except OSError:
+        pass  # место освободит unlink
+
+
+def _fill(fd, length, buf):
+    view = memoryview(buf)
+    offset = 0
+    while offset < length:
+        n = min(len(buf), length - offset)
+        offset += os.pwrite(fd, view[:n], offset)
+
+
+# -------------------- Генерация --------------------
+def generate(paths, size, count, dist='fixed', sigma=0.6, gap=BLOCK, seed=0, method='auto', verbose=False):
+    """Создать файлы paths по size байт из count экстентов; (метрики FIEMAP по файлам или None, способ, времена)"""
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    gap = max(BLOCK, gap // BLOCK * BLOCK)
+    sizes = [extent_sizes(size, count, dist, sigma, seed + i) for i in range(len(paths))]
+    timings = {}
+
+    start = time.perf_counter()
+    fds = [os.open(p, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644) for p in paths]
+    try:
+        if method in ('auto', 'collapse'):
+            try:
+                for fd, s in zip(fds, sizes):
+                    _build_collapse(fd, s, gap)
+                method = 'collapse'
+            except OSError as e:
+                if method == 'collapse' or e.errno not in (errno.EOPNOTSUPP, errno.EINVAL):
+                    raise
+                for fd in fds:
+                    os.ftruncate(fd, 0)
+                method = 'interleave'
+        if method == 'interleave':
+            filler_path = os.path.join(os.path.dirname(os.path.abspath(paths[0])), '.fragment_gaps')
+            filler = os.open(filler_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                _build_interleave(fds, sizes, gap, filler)
+            finally:
+                os.close(filler)
+                os.unlink(filler_path)
+        timings['allocate_s'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        buf = bytearray(os.urandom(min(WRITE_CHUNK, size)))
+        for fd in fds:
+            _fill(fd, size, buf)
+            os.fsync(fd)
+        timings['write_s'] = time.perf_counter() - start
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+    start = time.perf_counter()
+    try:
+        results = [extents.file_metrics(p, sync=True) for p in paths]
+    except OSError as e:
+        print(f"Проверка через FIEMAP недоступна: {e}", file=sys.stderr)
+        results = [None] * len(paths)
+    timings['verify_s'] = time.perf_counter() - start
+    if verbose:
+        print(f"Способ {method}: выделение {timings['allocate_s']:.2f} с, запись {timings['write_s']:.2f} с, "
+              f"проверка {timings['verify_s']:.2f} с")
+    return results, method, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Файлы с заданной фрагментацией')
+    parser.add_argument('path', help='файл; при --files N создаются path.0 ... path.N-1')
+    parser.add_argument('--size', default='800M', help='размер каждого файла (4K, 800M, 2G)')
+    parser.add_argument('--extents', type=int, default=2000, help='целевое число экстентов на файл')
+    parser.add_argument('--dist', default='fixed', choices=('fixed', 'uniform', 'lognormal'))
+    parser.add_argument('--sigma', type=float, default=0.6, help='разброс для lognormal')
+    parser.add_argument('--gap', default='4K', help='свободный промежуток между экстентами на диске')
+    parser.add_argument('--files', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--method', default='auto', choices=('auto', 'collapse', 'interleave'))
+    parser.add_argument('--tolerance', type=float, default=0.1, help='допустимое отклонение числа экстентов (доля)')
+    args = parser.parse_args()
+
+    paths = [args.path] if args.files == 1 else [f'{args.path}.{i}' for i in range(args.files)]
+    results, _, _ = generate(paths, parse_size(args.size), args.extents, args.dist, args.sigma,
+                             parse_size(args.gap, BLOCK), args.seed, args.method, verbose=True)
+
+    ok = True
+    for path, m in zip(paths, results):
+        if m is None:
+            continue
+        extents.print_summary(path, m)
+        deviation = abs(m['fragments'] - args.extents) / args.extents
+        if deviation > args.tolerance:
+            ok = False
+            print(f"  ✗ цель {args.extents}, отклонение {deviation:.0%}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,387 @@
+# История запусков raid_performance_test.sh в одной базе SQLite.
+#
+# Каждый запуск пишет в свой каталог raid_test_YYYYMMDD_HHMMSS; здесь они
+# собираются в одну базу (по умолчанию raid_history.sqlite рядом с ними).
+# База только пополняется: каталог, уже занесённый в runs, повторно не
+# загружается. В runs — конфигурация запуска (config.json каталога, а для
+# старых каталогов — разбор raid_info.txt и lab_report.md): ядро, уровень
+# и layout RAID, chunk, размеры файлов, генератор нагрузки. В results —
+# по строке на прогон fio из results_index (ключ группы + метрики).
+#
+# Проверка регрессий: для каждой группы нового запуска значения основной
+# метрики (как в run_stats) по его прогонам сравниваются со значениями той
+# же группы в последних N запусках с той же конфигурацией массива.
+# Перестановочный тест разности средних (односторонний, в обе стороны):
+# регрессия — p < alpha и падение больше threshold, улучшение — наоборот.
+#
+#     python3 history.py ingest raid_test_*                       # занести каталоги
+#     python3 history.py check raid_test_20251026_141742 --scenario seq_read --bs 64K --last 10
+#     python3 history.py trend --graphs-dir graphs --scenario seq_read
+
+import argparse
+import datetime
+import json
+import os
+import re
+import sqlite3
+import sys
+
+import numpy as np
+
+import fio_ingest
+import results_index
+from run_stats import METRIC, UNITS
+
+DB_NAME = 'raid_history.sqlite'
+CONFIG_NAME = 'config.json'
+CONFIG_FIELDS = ('kernel', 'hostname', 'raid_level', 'raid_devices', 'chunk_kb', 'layout', 'device_size',
+                 'test_file_size', 'fragmented_file_size', 'fragment_extents', 'num_runs', 'engine')
+# Конфигурация, при которой результаты разных запусков сравнимы
+COMPARABLE = ('raid_level', 'raid_devices', 'chunk_kb', 'layout', 'device_size', 'test_file_size')
+KEY = ('state', 'scenario', 'rw', 'bs', 'iodepth', 'numjobs')
+# Группа — ключ и имя теста, как в results_index.GROUP_KEYS: baseline_seq_read и
+# baseline_seq_read_1M совпадают по KEY, но их прогоны — не повторы одного теста
+GROUP = KEY + ('test',)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    work_dir TEXT UNIQUE NOT NULL,
+    started TEXT NOT NULL,
+    ingested TEXT NOT NULL,
+    {', '.join(f'{f} TEXT' for f in CONFIG_FIELDS)}
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    test TEXT NOT NULL,
+    rep INTEGER NOT NULL,
+    {', '.join(f'{k} {"INTEGER" if k in ("bs", "iodepth", "numjobs") else "TEXT"}' for k in KEY)},
+    {', '.join(f'{m} REAL' for m in results_index.METRICS)}
+);
+CREATE INDEX IF NOT EXISTS results_key ON results (scenario, state, rw, bs, iodepth, numjobs);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id);
+"""
+
+
+def connect(path):
+    db = sqlite3.connect(path)
+    db.row_factory = sqlite3.Row
+    db.executescript(SCHEMA)
+    return db
+
+
+# -------------------- Конфигурация запуска --------------------
+def _grep(path, pattern):
+    try:
+        with open(path, errors='replace') as f:
+            m = re.search(pattern, f.read(), re.MULTILINE)
+    except OSError:
+        return None
+    return m.group(1).strip() if m else None
+
+
+def _mdadm_layout(text):
+    """'near=2' из mdadm --detail -> 'n2', как в --layout при создании"""
+    m = re.match(r'(near|far|offset)=(\d+)$', text or '')
+    return f'{m.group(1)[0]}{m.group(2)}' if m else text
+
+
+def read_config(work_dir):
+    """Поля CONFIG_FIELDS и started: из config.json или по старым файлам каталога"""
+    results_dir = os.path.join(work_dir, 'results')
+    config = None
+    # results/config.json — каталоги, записанные до переноса файла из results
+    for path in (os.path.join(work_dir, CONFIG_NAME), os.path.join(results_dir, CONFIG_NAME)):
+        try:
+            with open(path) as f:
+                config = json.load(f)
+            break
+        except (OSError, ValueError):
+            continue
+    if config is None:
+        raid_info = os.path.join(results_dir, 'raid_info.txt')
+        chunk = _grep(raid_info, r'Chunk Size\s*:\s*(\d+)')
+        config = {
+            'kernel': _grep(os.path.join(work_dir, 'lab_report.md'), r'\*\*Ядро:\*\*\s*(.+)$'),
+            'raid_level': _grep(raid_info, r'Raid Level\s*:\s*(\S+)'),
+            'raid_devices': _grep(raid_info, r'Raid Devices\s*:\s*(\d+)'),
+            'chunk_kb': chunk,
+            'layout': _mdadm_layout(_grep(raid_info, r'Layout\s*:\s*(\S+)')),
+        }
+    m = re.search(r'(\d{8}_\d{6})$', os.path.basename(os.path.normpath(work_dir)))
+    if m:
+        started = datetime.datetime.strptime(m.group(1), '%Y%m%d_%H%M%S')
+    else:
+        started = datetime.datetime.fromtimestamp(os.path.getmtime(results_dir))
+    config['started'] = started.isoformat(timespec='seconds')
+    return {k: (None if config.get(k) is None else str(config[k])) for k in CONFIG_FIELDS + ('started',)}
+
+
+# -------------------- Загрузка --------------------
+def ingest(db, work_dir):
+    """Занести каталог запуска; id запуска или None, если он уже в базе или пуст"""
+    work_dir = os.path.abspath(work_dir)
+    if db.execute('SELECT 1 FROM runs WHERE work_dir = ?', (work_dir,)).fetchone():
+        return None
+    records = fio_ingest.load(os.path.join(work_dir, 'results'))
+    if len(records) == 0:
+        return None
+    runs = results_index.build(records)['runs']
+    config = read_config(work_dir)
+
+    fields = ('work_dir', 'started', 'ingested') + CONFIG_FIELDS
+    row = [work_dir, config['started'], datetime.datetime.now().isoformat(timespec='seconds')]
+    row += [config[f] for f in CONFIG_FIELDS]
+    with db:
+        run_id = db.execute(f"INSERT INTO runs ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})",
+                            row).lastrowid
+        columns = ('run_id', 'test', 'rep') + KEY + results_index.METRICS
+        db.executemany(
+            f"INSERT INTO results ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [(run_id, str(r['test']), int(r['run'])) + tuple(r[k].item() for k in KEY)
+             + tuple(float(r[m]) for m in results_index.METRICS) for r in runs])
+    return run_id
+
+
+def run_of(db, work_dir):
+    return db.execute('SELECT * FROM runs WHERE work_dir = ?', (os.path.abspath(work_dir),)).fetchone()
+
+
+# -------------------- Выборки --------------------
+def _where(criteria):
+    clauses = [f'r.{k} = ?' for k in criteria]
+    return (' AND ' + ' AND '.join(clauses)) if clauses else '', list(criteria.values())
+
+
+def groups(db, run_id, criteria):
+    """Ключи групп запуска run_id, подходящие под criteria"""
+    where, params = _where(criteria)
+    return db.execute(f"SELECT DISTINCT {', '.join(GROUP)} FROM results r WHERE run_id = ?{where} "
+                      f"ORDER BY scenario, state, rw, bs, iodepth, numjobs, test", [run_id] + params).fetchall()
+
+
+def previous_runs(db, run, last, same_config=True):
+    """id последних last запусков до run (с той же конфигурацией массива; неизвестные поля не мешают)"""
+    clauses, params = ['started < ?'], [run['started']]
+    if same_config:
+        for f in COMPARABLE:
+            if run[f] is not None:
+                clauses.append(f'({f} IS ? OR {f} IS NULL)')
+                params.append(run[f])
+    rows = db.execute(f"SELECT id FROM runs WHERE {' AND '.join(clauses)} ORDER BY started DESC LIMIT ?",
+                      params + [last]).fetchall()
+    return [r['id'] for r in rows]
+
+
+def values(db, run_ids, key, metric):
+    """Значения metric по прогонам группы key в запусках run_ids"""
+    if not run_ids:
+        return np.zeros(0)
+    rows = db.execute(f"SELECT {metric} FROM results WHERE run_id IN ({', '.join('?' * len(run_ids))}) AND "
+                      + ' AND '.join(f'{k} = ?' for k in GROUP),
+                      list(run_ids) + [key[k] for k in GROUP]).fetchall()
+    return np.array([r[0] for r in rows], dtype=np.float64)
+
+
+# -------------------- Проверка --------------------
+def permutation_pvalues(new, old, resamples=10000, seed=0):
+    """(p для «new меньше old», p для «new больше old») по перестановкам разности средних"""
+    pooled = np.concatenate([new, old])
+    observed = new.mean() - old.mean()
+    rng = np.random.default_rng(seed)
+    order = np.argsort(rng.random((resamples, len(pooled))), axis=1)
+    diffs = pooled[order[:, :len(new)]].mean(axis=1) - pooled[order[:, len(new):]].mean(axis=1)
+    # +1 — наблюдаемая перестановка тоже входит в выборку
+    lower = (np.count_nonzero(diffs <= observed) + 1) / (resamples + 1)
+    upper = (np.count_nonzero(diffs >= observed) + 1) / (resamples + 1)
+    return lower, upper
+
+
+def check(db, run, last=10, alpha=0.05, threshold=0.05, same_config=True, **criteria):
+    """Строки сравнения групп запуска run с историей"""
+    history = previous_runs(db, run, last, same_config)
+    rows = []
+    for g in groups(db, run['id'], criteria):
+        key = dict(g)
+        metric = METRIC.get(key['rw'], 'read_bw_mbs')
+        new = values(db, [run['id']], key, metric)
+        old = values(db, history, key, metric)
+        row = dict(key, metric=metric, new_mean=float(new.mean()), new_n=len(new), old_n=len(old),
+                   runs=len(set(history)))
+        if len(old) < 2 or old.mean() == 0:
+            row.update(old_mean=float(old.mean()) if len(old) else float('nan'),
+                       change=float('nan'), p=float('nan'), verdict='мало данных')
+            rows.append(row)
+            continue
+        change = (new.mean() - old.mean()) / old.mean()
+        lower, upper = permutation_pvalues(new, old)
+        if lower < alpha and change <= -threshold:
+            verdict, p = 'регрессия', lower
+        elif upper < alpha and change >= threshold:
+            verdict, p = 'улучшение', upper
+        else:
+            verdict, p = 'без изменений', min(lower, upper)
+        row.update(old_mean=float(old.mean()), change=float(change * 100), p=float(p), verdict=verdict)
+        rows.append(row)
+    return rows
+
+
+def _label(row):
+    return f"{row['test']} {results_index.format_size(row['bs'])} qd{row['iodepth']} nj{row['numjobs']}"
+
+
+def print_check(rows, last):
+    print("=" * 120)
+    print(f"Сравнение с последними {last} запусками той же конфигурации")
+    print("=" * 120)
+    print(f"{'группа':>44} | {'сейчас':>10} | {'история':>10} | {'изм.':>7} | {'p':>6} | {'прогонов':>8} | итог")
+    for r in rows:
+        change = '—' if r['change'] != r['change'] else f"{r['change']:+.1f}%"
+        p = '—' if r['p'] != r['p'] else f"{r['p']:.3f}"
+        print(f"{_label(r):>44} | {r['new_mean']:>10.1f} | {r['old_mean']:>10.1f} | {change:>7} | {p:>6} | "
+              f"{r['new_n']:>3}/{r['old_n']:<4} | {r['verdict']}")
+
+
+def print_markdown(rows):
+    print("| Группа | Метрика | Сейчас | История | Изменение | p | Итог |")
+    print("|---|---|---|---|---|---|---|")
+    for r in rows:
+        change = '—' if r['change'] != r['change'] else f"{r['change']:+.1f}%"
+        p = '—' if r['p'] != r['p'] else f"{r['p']:.3f}"
+        old = '—' if r['old_mean'] != r['old_mean'] else f"{r['old_mean']:.1f}"
+        verdict = f"**{r['verdict']}**" if r['verdict'] == 'регрессия' else r['verdict']
+        print(f"| {_label(r)} | {UNITS.get(r['metric'], r['metric'])} | {r['new_mean']:.1f} | {old} | {change} | "
+              f"{p} | {verdict} |")
+
+
+# -------------------- Тренды --------------------
+def trend(db, last=30, **criteria):
+    """{(scenario, rw): {(state, bs, iodepth, numjobs, test): [(started, среднее, std), ...]}} за последние запуски"""
+    where, params = _where(criteria)
+    rows = db.execute(
+        f"SELECT ru.started, {', '.join(f'r.{k}' for k in GROUP)}, "
+        f"{', '.join(f'AVG(r.{m}) AS {m}, AVG(r.{m} * r.{m}) AS {m}_sq' for m in set(METRIC.values()))} "
+        f"FROM results r JOIN runs ru ON ru.id = r.run_id "
+        f"WHERE r.run_id IN (SELECT id FROM runs ORDER BY started DESC LIMIT ?){where} "
+        f"GROUP BY r.run_id, {', '.join(f'r.{k}' for k in GROUP)} ORDER BY ru.started",
+        [last] + params).fetchall()
+    series = {}
+    for r in rows:
+        if 'scenario' not in criteria and r['scenario'].startswith('sweep'):
+            continue  # точки sweep.py — только по явному --scenario
+        metric = METRIC.get(r['rw'], 'read_bw_mbs')
+        std = max(0.0, r[metric + '_sq'] - r[metric] ** 2) ** 0.5
+        line = (r['state'], r['bs'], r['iodepth'], r['numjobs'], r['test'])
+        series.setdefault((r['scenario'], r['rw']), {}).setdefault(line, []).append((r['started'], r[metric], std))
+    return series
+
+
+def render_trends(series, graphs_dir, formats=('png',), dpi=150):
+    """По графику на (scenario, rw): среднее по прогонам каждого запуска во времени"""
+    from charts import _pyplot
+    plt = _pyplot()
+    os.makedirs(graphs_dir, exist_ok=True)
+    paths = []
+    for (scenario, rw), lines in sorted(series.items()):
+        fig, ax = plt.subplots(figsize=(14, 6))
+        for (state, bs, iodepth, numjobs, test), points in sorted(lines.items()):
+            x = [datetime.datetime.fromisoformat(p[0]) for p in points]
+            style = '-' if state == 'baseline' else '--'
+            ax.errorbar(x, [p[1] for p in points], yerr=[p[2] for p in points], fmt=style + 'o', capsize=3,
+                        markersize=4, linewidth=1.5,
+                        label=f'{test} {results_index.format_size(bs)} qd{iodepth} nj{numjobs}')
+        metric = METRIC.get(rw, 'read_bw_mbs')
+        ax.set_title(f'{scenario} ({rw}): история запусков', fontsize=14, fontweight='bold')
+        ax.set_ylabel(UNITS.get(metric, metric), fontsize=12, fontweight='bold')
+        ax.grid(alpha=0.3, linestyle='--')
+        ax.legend(fontsize=8, ncol=2)
+        fig.autofmt_xdate()
+        fig.tight_layout()
+        for fmt in formats:
+            path = os.path.join(graphs_dir, f'history_{scenario}.{fmt}')
+            fig.savefig(path, dpi=dpi, bbox_inches='tight')
+            paths.append(path)
+        plt.close(fig)
+    return paths
+
+
+# -------------------- CLI --------------------
+def _criteria(args):
+    criteria = {k: getattr(args, k) for k in ('state', 'scenario', 'rw') if getattr(args, k)}
+    if args.bs:
+        criteria['bs'] = fio_ingest.parse_size(args.bs)
+    return criteria
+
+
+def _filters(parser):
+    parser.add_argument('--state', choices=results_index.STATES)
+    parser.add_argument('--scenario')
+    parser.add_argument('--rw')
+    parser.add_argument('--bs', help='4K, 64K, 1M')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='История запусков RAID-тестов и проверка регрессий')
+    parser.add_argument('--db', default=None, help=f'по умолчанию {DB_NAME} рядом с каталогами запусков')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('ingest', help='занести каталоги raid_test_*')
+    p.add_argument('work_dirs', nargs='+')
+
+    p = sub.add_parser('check', help='сравнить запуск с предыдущими')
+    p.add_argument('work_dir')
+    p.add_argument('--last', type=int, default=10)
+    p.add_argument('--alpha', type=float, default=0.05)
+    p.add_argument('--threshold', type=float, default=0.05, help='минимальное относительное изменение')
+    p.add_argument('--any-config', action='store_true', help='сравнивать с запусками любой конфигурации')
+    p.add_argument('--markdown', action='store_true')
+    _filters(p)
+
+    p = sub.add_parser('trend', help='графики метрик по запускам')
+    p.add_argument('--graphs-dir', required=True)
+    p.add_argument('--last', type=int, default=30)
+    p.add_argument('--format', nargs='+', default=['png'], choices=('png', 'svg'))
+    _filters(p)
+
+    sub.add_parser('list', help='запуски в базе')
+    args = parser.parse_args()
+
+    work_dirs = getattr(args, 'work_dirs', None) or [getattr(args, 'work_dir', None)]
+    parent = os.path.dirname(os.path.abspath(work_dirs[0])) if work_dirs[0] else '.'
+    db_path = args.db or os.path.join(parent, DB_NAME)
+    db = connect(db_path)
+
+    if args.command == 'ingest':
+        for work_dir in args.work_dirs:
+            run_id = ingest(db, work_dir)
+            print(f"{'+' if run_id else '='} {work_dir}" + ('' if run_id else ' (уже в базе или без результатов)'))
+        print(f"✓ База: {db_path}")
+    elif args.command == 'list':
+        for r in db.execute('SELECT ru.*, COUNT(r.run_id) AS n FROM runs ru LEFT JOIN results r ON r.run_id = ru.id '
+                            'GROUP BY ru.id ORDER BY started'):
+            print(f"{r['started']}  {r['kernel'] or '?':<24} chunk={r['chunk_kb'] or '?':<5} "
+                  f"layout={r['layout'] or '?':<8} прогонов={r['n']:<5} {r['work_dir']}")
+    elif args.command == 'check':
+        ingest(db, args.work_dir)
+        run = run_of(db, args.work_dir)
+        if run is None:
+            print(f"Нет результатов в {args.work_dir}", file=sys.stderr)
+            sys.exit(1)
+        rows = check(db, run, args.last, args.alpha, args.threshold, not args.any_config, **_criteria(args))
+        if args.markdown:
+            print_markdown(rows)
+        else:
+            print_check(rows, args.last)
+        if any(r['verdict'] == 'регрессия' for r in rows):
+            sys.exit(2)
+    elif args.command == 'trend':
+        series = trend(db, args.last, **_criteria(args))
+        if not series:
+            print("Нет данных для трендов", file=sys.stderr)
+            sys.exit(1)
+        for path in render_trends(series, args.graphs_dir, args.format):
+            print(f"✓ График: {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+# Гистограммы латентности с объединением по прогонам и заданиям.
+#
+# fio в обычном JSON отдаёт по каждому заданию только таблицу процентилей
+# clat_ns, а процентили нельзя ни сложить, ни усреднить между прогонами.
+# Поэтому латентность собирается в гистограмму с лог-линейными корзинами
+# (как HdrHistogram): до 2^SUB_BITS нс — по корзине на наносекунду, дальше
+# каждая степень двойки делится на 2^SUB_BITS равных корзин, так что
+# относительная ошибка значения не больше 2^-SUB_BITS (< 0.8%), а весь
+# диапазон до 2^63 нс занимает 7296 счётчиков. Гистограммы объединяются
+# сложением счётчиков, процентили (p50 / p99 / p99.9 / p99.99) считаются
+# по объединённой гистограмме.
+#
+# Источники, по убыванию точности:
+#   1. логи латентности fio (write_lat_log=<тест>): <тест>_clat.N.log,
+#      строки "время_мс, латентность_нс, направление, bs, смещение";
+#   2. корзины clat_ns.bins из --output-format=json+ (fio и loadgen.py);
+#   3. таблица процентилей clat_ns.percentile — каждой точке приписывается
+#      доля операций до неё (грубо, только если нет первых двух).
+# Тест — имя файла без _runN, так что прогоны одного теста сливаются.
+#
+#     python3 latency_hist.py <results_dir>               # таблица + latency_percentiles.csv
+#     python3 latency_hist.py <results_dir> --markdown    # таблица для отчёта
+
+import argparse
+import glob
+import math
+import os
+import sys
+
+import numpy as np
+
+import fio_ingest
+import results_index
+
+SUB_BITS = 7
+SUB = 1 << SUB_BITS
+BUCKETS = (64 - SUB_BITS) * SUB
+DIRECTIONS = ('read', 'write')
+REPORT_PERCENTILES = (50.0, 99.0, 99.9, 99.99)
+CSV_NAME = 'latency_percentiles.csv'
+# Точность источника: при объединении остаётся худший
+SOURCES = ('log', 'bins', 'percentiles')
+
+
+# -------------------- Гистограмма --------------------
+def empty():
+    return {'counts': np.zeros(BUCKETS, dtype=np.int64), 'min': None, 'max': None, 'source': SOURCES[0]}
+
+
+def bucket_index(values):
+    """Номер корзины для каждого значения (нс, >= 0)"""
+    v = np.maximum(np.asarray(values, dtype=np.int64), 0)
+    msb = np.frexp(v.astype(np.float64))[1] - 1
+    shift = np.maximum(msb - SUB_BITS, 0)
+    return np.where(v < SUB, v, shift * SUB + (v >> shift))
+
+
+def bucket_bounds(idx):
+    """(нижняя граница, ширина) корзин idx"""
+    idx = np.asarray(idx, dtype=np.int64)
+    shift = np.maximum(idx // SUB - 1, 0)
+    return np.where(idx < SUB, idx, (idx - shift * SUB) << shift), np.int64(1) << shift
+
+
+def record(hist, values, counts=None, source=None):
+    """Добавить значения (нс) с весами counts"""
+    values = np.asarray(values)
+    if len(values) == 0:
+        return hist
+    idx = bucket_index(values)
+    weights = None if counts is None else np.asarray(counts, dtype=np.float64)
+    hist['counts'] += np.bincount(idx, weights=weights, minlength=BUCKETS).astype(np.int64)
+    lo, hi = int(values.min()), int(values.max())
+    hist['min'] = lo if hist['min'] is None else min(hist['min'], lo)
+    hist['max'] = hi if hist['max'] is None else max(hist['max'], hi)
+    if source is not None:
+        hist['source'] = max(hist['source'], source, key=SOURCES.index)
+    return hist
+
+
+def merge(target, other):
+    target['counts'] += other['counts']
+    for key, pick in (('min', min), ('max', max)):
+        if other[key] is not None:
+            target[key] = other[key] if target[key] is None else pick(target[key], other[key])
+    target['source'] = max(target['source'], other['source'], key=SOURCES.index)
+    return target
+
+
+def total(hist):
+    return int(hist['counts'].sum())
+
+
+def percentiles(hist, points=REPORT_PERCENTILES):
+    """Значения процентилей (нс): верхняя граница корзины, в которую попадает ранг, в пределах [min, max]"""
+    n = total(hist)
+    if n == 0:
+        return [math.nan] * len(points)
+    cum = np.cumsum(hist['counts'])
+    ranks = np.maximum(np.ceil(np.asarray(points) / 100 * n), 1)
+    idx = np.searchsorted(cum, ranks)
+    lower, width = bucket_bounds(idx)
+    return np.clip(lower + width - 1, hist['min'], hist['max']).tolist()
+
+
+def cdf(hist):
+    """(значения нс, доля операций <= значения) по непустым корзинам"""
+    nonzero = np.flatnonzero(hist['counts'])
+    if len(nonzero) == 0:
+        return np.zeros(0), np.zeros(0)
+    lower, width = bucket_bounds(nonzero)
+    cum = np.cumsum(hist['counts'][nonzero])
+    return np.minimum(lower + width - 1, hist['max']), cum / cum[-1]
+
+
+# -------------------- Источники --------------------
+def _read_lat_log(path):
+    """Массив (латентность нс, направление) из лога fio"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if not raw.strip():
+        return np.zeros((0, 2), dtype=np.int64)
+    columns = raw[:raw.find(b'\n')].count(b',') + 1
+    data = np.fromstring(raw.replace(b',', b' '), dtype=np.int64, sep=' ')
+    data = data[:len(data) // columns * columns].reshape(-1, columns)
+    return data[:, 1:3]
+
+
+def from_lat_log(path, hists):
+    data = _read_lat_log(path)
+    for d, name in enumerate(DIRECTIONS):
+        record(hists[name], data[data[:, 1] == d, 0], source='log')
+
+
+def from_fio_json(data, hists):
+    """Корзины clat_ns.bins (json+) или, если их нет, таблица процентилей; data — документ fio_ingest.load_json"""
+    for job in data['jobs']:
+        for name in DIRECTIONS:
+            clat = (job.get(name) or {}).get('clat_ns') or {}
+            if clat.get('bins'):
+                values = np.array([int(k) for k in clat['bins']], dtype=np.int64)
+                record(hists[name], values, list(clat['bins'].values()), source='bins')
+            elif clat.get('N') and clat.get('percentile'):
+                points = sorted((float(p), int(v)) for p, v in clat['percentile'].items())
+                share = np.diff([0.0] + [p for p, _ in points]) / 100
+                values = [int(clat.get('min', points[0][1]))] + [v for _, v in points] + \
+                    [int(clat.get('max', points[-1][1]))]
+                counts = np.concatenate([[0.0], share, [max(0.0, 1 - share.sum())]]) * clat['N']
+                record(hists[name], values, np.round(counts), source='percentiles')
+
+
+def _logs_for(results_dir, test_name):
+    for kind in ('clat', 'lat'):
+        paths = sorted(glob.glob(os.path.join(glob.escape(results_dir), f'{glob.escape(test_name)}_{kind}.*.log')))
+        if paths:
+            return paths
+    return []
+
+
+def load(results_dir):
+    """{тест: {'read': гистограмма, 'write': гистограмма}}, прогоны и задания теста объединены"""
+    tests = {}
+    for entry in sorted(os.scandir(results_dir), key=lambda e: e.name):
+        if not (entry.is_file() and entry.name.endswith('.json')) or entry.name.startswith('.'):
+            continue
+        test_name = entry.name[:-len('.json')]
+        test = results_index.parse_test_name(test_name)[0]
+        hists = {name: empty() for name in DIRECTIONS}
+        try:
+            logs = _logs_for(results_dir, test_name)
+            for path in logs:
+                from_lat_log(path, hists)
+            if not logs:
+                data = fio_ingest.load_json(entry.path)
+                if not fio_ingest.is_result(data):
+                    continue
+                from_fio_json(data, hists)
+        except (OSError, ValueError) as e:
+            print(f"Пропуск {entry.name}: {e}", file=sys.stderr)
+            continue
+        merged = tests.setdefault(test, {name: empty() for name in DIRECTIONS})
+        for name in DIRECTIONS:
+            merge(merged[name], hists[name])
+    return tests
+
+
+# -------------------- Вывод --------------------
+def rows(tests):
+    result = []
+    for test in sorted(tests):
+        for name in DIRECTIONS:
+            hist = tests[test][name]
+            if total(hist):
+                result.append((test, name, total(hist), percentiles(hist), hist['source']))
+    return result
+
+
+def _us(ns):
+    return f'{ns / 1000:.1f}'
+
+
+def print_table(tests):
+    print("=" * 110)
+    print(f"Латентность (clat), мкс; корзины с точностью {100 / SUB:.1f}%")
+    print("=" * 110)
+    print(f"{'тест':>32} | {'напр.':>5} | {'операций':>10} | " +
+          ' | '.join(f"{'p' + format(p, 'g'):>9}" for p in REPORT_PERCENTILES) + " | источник")
+    for test, name, n, values, source in rows(tests):
+        print(f"{test:>32} | {name:>5} | {n:>10} | " + ' | '.join(f'{_us(v):>9}' for v in values) + f" | {source}")
+
+
+def print_markdown(tests):
+    print("| Тест | Направление | Операций | " + ' | '.join(f"p{p:g}, мкс" for p in REPORT_PERCENTILES) + " |")
+    print("|---|---|---|" + "---|" * len(REPORT_PERCENTILES))
+    for test, name, n, values, source in rows(tests):
+        mark = '' if source != 'percentiles' else ' ≈'
+        print(f"| {test} | {name} | {n} | " + ' | '.join(_us(v) + mark for v in values) + " |")
+
+
+def write_csv(tests, path):
+    with open(path, 'w') as f:
+        f.write('test,direction,n,' + ','.join(f'p{p:g}_ns' for p in REPORT_PERCENTILES) + ',source\n')
+        for test, name, n, values, source in rows(tests):
+            f.write(f"{test},{name},{n}," + ','.join(str(int(v)) for v in values) + f",{source}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Процентили латентности по логам и гистограммам fio')
+    parser.add_argument('results_dir')
+    parser.add_argument('--markdown', action='store_true', help='только таблица Markdown для отчёта')
+    parser.add_argument('--csv', default=None, help=f'по умолчанию <results_dir>/{CSV_NAME}')
+    args = parser.parse_args()
+
+    tests = load(args.results_dir)
+    if not any(total(h) for t in tests.values() for h in t.values()):
+        print("Нет данных о латентности", file=sys.stderr)
+        sys.exit(1)
+
+    if args.markdown:
+        print_markdown(tests)
+        return
+    print_table(tests)
+    path = args.csv or os.path.join(args.results_dir, CSV_NAME)
+    write_csv(tests, path)
+    print(f"✓ Отчёт сохранён: {path}")
+
+
+if __name__ == '__main__':
+    main()
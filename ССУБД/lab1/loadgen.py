@@ -0,0 +1,336 @@
+# Генератор нагрузки на Python — замена fio, когда его нельзя установить.
+#
+# Читает тот же job-файл, что и fio ([global] + секции заданий), и пишет JSON
+# той же формы (jobs[].read/write: io_bytes, bw, iops, runtime, lat_ns,
+# clat_ns с процентилями; "global options" / "job options"), так что
+# fio_ingest.py и остальной анализ работают без изменений.
+#
+# Как выполняется задание:
+#   - numjobs процессов fio -> numjobs воркеров, у каждого свой дескриптор;
+#   - iodepth -> iodepth потоков на воркер с синхронными os.preadv/os.pwritev
+#     (вызовы отпускают GIL, так что в очереди устройства одновременно до
+#     iodepth запросов — аналог ioengine=pvsync с глубиной очереди);
+#   - порядок операций (смещения и направление для randrw) строится заранее
+#     массивом: seq — подряд, rand — перестановка блоков (каждый блок один раз,
+#     как randommap у fio); потоки берут следующий номер из общего счётчика;
+#   - у каждого потока один буфер mmap (выровнен по странице, годится для
+#     O_DIRECT) и один memoryview на всё время теста;
+#   - латентность каждой операции пишется в заранее выделенный массив по
+#     номеру операции, процентили считаются по нему точно.
+# ioengine из job-файла записывается в JSON, но не используется.
+#
+#     python3 loadgen.py job.fio --output-format=json --output=result.json
+
+import argparse
+import configparser
+import itertools
+import json
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+
+import numpy as np
+
+import latency_hist
+from fio_ingest import parse_size
+
+VERSION = 'loadgen-1.0'
+PERCENTILES = (1.0, 5.0, 10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 70.0, 80.0, 90.0,
+               95.0, 99.0, 99.5, 99.9, 99.95, 99.99)
+LAYOUT_CHUNK = 1 << 20
+
+READ_MODES = ('read', 'randread')
+WRITE_MODES = ('write', 'randwrite')  # остальные (rw, readwrite, randrw) — смешанные, по rwmixread
+
+
+# -------------------- Job-файл --------------------
+def parse_jobfile(path):
+    """(опции [global], [(имя задания, опции секции)]) в порядке файла"""
+    parser = configparser.ConfigParser(allow_no_value=True, interpolation=None, strict=False,
+                                       comment_prefixes=('#', ';'), inline_comment_prefixes=None)
+    with open(path) as f:
+        parser.read_file(f)
+    glob = {}
+    jobs = []
+    for section in parser.sections():
+        opts = {k: ('1' if v is None else v) for k, v in parser.items(section)}
+        if section == 'global':
+            glob.update(opts)
+        else:
+            jobs.append((section, opts))
+    return glob, jobs
+
+
+def _flag(opts, name):
+    return str(opts.get(name, '0')).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _job_files(name, opts, numjobs):
+    """Файл каждого воркера: filename (общий) или <directory>/<имя>.<N>.0, как у fio"""
+    directory = opts.get('directory', '.')
+    if 'filename' in opts:
+        path = os.path.join(directory, opts['filename'])
+        return [path] * numjobs
+    return [os.path.join(directory, f'{name}.{i}.0') for i in range(numjobs)]
+
+
+def _layout(path, size):
+    """Создать или дописать файл до size байт; True, если файл создан заново"""
+    created = not os.path.exists(path)
+    current = 0 if created else os.path.getsize(path)
+    if current >= size:
+        return created
+    buf = os.urandom(min(LAYOUT_CHUNK, size))
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        offset = current
+        while offset < size:
+            offset += os.pwrite(fd, buf[:min(len(buf), size - offset)], offset)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return created
+
+
+def _seconds(text):
+    """Время в записи fio ('30', '30s', '2m', '500ms') в секундах"""
+    m = re.match(r'\s*(\d+)\s*(ms|s|m|h)?', str(text).lower())
+    if not m:
+        return 0
+    return int(m.group(1)) * {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600, None: 1}[m.group(2)]
+
+
+def _open(path, write, direct):
+    flags = os.O_RDWR if write else os.O_RDONLY
+    if direct and hasattr(os, 'O_DIRECT'):
+        try:
+            return os.open(path, flags | os.O_DIRECT), True
+        except OSError:
+            pass  # tmpfs и некоторые ФС не поддерживают O_DIRECT
+    return os.open(path, flags), False
+
+
+# -------------------- Выполнение --------------------
+def _plan(rw, n, bs, mix, seed):
+    """Смещения и признак чтения для каждой из n операций"""
+    rng = np.random.default_rng(seed)
+    blocks = rng.permutation(n) if rw.startswith('rand') else np.arange(n)
+    if rw in READ_MODES:
+        reads = np.ones(n, dtype=bool)
+    elif rw in WRITE_MODES:
+        reads = np.zeros(n, dtype=bool)
+    else:
+        reads = rng.random(n) < mix
+    return (blocks * bs).tolist(), reads.tolist(), reads
+
+
+def _thread(w, fd):
+    buf = mmap.mmap(-1, w['bs'])
+    if not all(w['reads']):
+        buf.write(os.urandom(w['bs']))
+    iov = [memoryview(buf)]
+    offsets, reads, lat = w['offsets'], w['reads'], w['lat']
+    counter, limit, n, deadline = w['counter'], w['limit'], w['n'], w['deadline']
+    clock = time.perf_counter_ns
+    done = [0, 0]
+    short = [0, 0]
+    try:
+        while True:
+            i = next(counter)
+            if i >= limit:
+                break
+            now = clock()
+            if deadline and now > deadline:
+                break
+            k = i % n
+            if reads[k]:
+                got = os.preadv(fd, iov, offsets[k])
+            else:
+                got = os.pwritev(fd, iov, offsets[k])
+            lat[k] = clock() - now
+            d = 0 if reads[k] else 1
+            done[d] += 1
+            if got != w['bs']:
+                short[d] += 1
+    except OSError as e:
+        w['error'] = e.errno
+    finally:
+        iov[0].release()
+        buf.close()
+    with w['lock']:
+        for d in (0, 1):
+            w['done'][d] += done[d]
+            w['short'][d] += short[d]
+
+
+def _prepare(name, opts, index, path, seed):
+    """Состояние одного воркера: файл, план операций, массив латентностей"""
+    rw = opts.get('rw', opts.get('readwrite', 'read'))
+    bs = parse_size(opts.get('bs', opts.get('blocksize', '4k')), 4096)
+    size = parse_size(opts.get('size', '0'))
+    if size == 0 and os.path.exists(path):
+        size = os.path.getsize(path)
+    if size < bs:
+        raise ValueError(f'{name}: не задан size и нет файла {path}')
+    if 'rwmixread' in opts:
+        mix = int(opts['rwmixread']) / 100
+    else:
+        mix = 1 - int(opts.get('rwmixwrite', 50)) / 100
+    n = size // bs
+    offsets, reads, mask = _plan(rw, n, bs, mix, seed + index)
+    runtime = _seconds(opts.get('runtime', '0'))
+    return {
+        'name': name, 'path': path, 'rw': rw, 'bs': bs, 'size': n * bs, 'n': n,
+        'iodepth': int(opts.get('iodepth', 1)), 'direct': _flag(opts, 'direct'),
+        'offsets': offsets, 'reads': reads, 'mask': mask,
+        'lat': np.full(n, -1, dtype=np.int64),
+        'limit': sys.maxsize if _flag(opts, 'time_based') and runtime else n,
+        'runtime': runtime, 'deadline': 0,
+        'counter': itertools.count(), 'lock': threading.Lock(),
+        'done': [0, 0], 'short': [0, 0], 'error': 0,
+    }
+
+
+def run_jobfile(path, seed=0, bins=False):
+    """Выполнить все задания job-файла одновременно (как fio без stonewall); документ JSON в формате fio"""
+    glob, sections = parse_jobfile(path)
+    workers, created = [], set()
+    for name, section in sections:
+        opts = dict(glob, **section)
+        numjobs = int(opts.get('numjobs', 1))
+        for i, file_path in enumerate(_job_files(name, opts, numjobs)):
+            w = _prepare(name, opts, i, file_path, seed)
+            if file_path not in created and _layout(file_path, w['size']):
+                created.add(file_path)
+            w['options'] = opts
+            workers.append(w)
+
+    threads, fds = [], []
+    for w in workers:
+        fd, w['direct'] = _open(w['path'], not all(w['reads']), w['direct'])
+        fds.append(fd)
+        threads += [threading.Thread(target=_thread, args=(w, fd), daemon=True) for _ in range(w['iodepth'])]
+
+    start = time.perf_counter_ns()
+    for w in workers:
+        w['deadline'] = start + int(w['runtime'] * 10 ** 9) if w['runtime'] else 0
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed_ms = max(1, (time.perf_counter_ns() - start) // 10 ** 6)
+
+    for fd in fds:
+        os.close(fd)
+    for p in created:
+        if any(_flag(w['options'], 'unlink') for w in workers if w['path'] == p):
+            os.unlink(p)
+    return _report(glob, sections, workers, elapsed_ms, bins)
+
+
+# -------------------- JSON --------------------
+def _bins(values):
+    """Корзины латентности, как clat_ns.bins в json+ (лог-линейные, см. latency_hist)"""
+    idx, counts = np.unique(latency_hist.bucket_index(values), return_counts=True)
+    lower, _ = latency_hist.bucket_bounds(idx)
+    return {str(int(v)): int(c) for v, c in zip(lower, counts)}
+
+
+def _lat_stats(values, percentiles=False, bins=False):
+    if len(values) == 0:
+        stats = {'min': 0, 'max': 0, 'mean': 0.0, 'stddev': 0.0, 'N': 0}
+    else:
+        stats = {'min': int(values.min()), 'max': int(values.max()), 'mean': float(values.mean()),
+                 'stddev': float(values.std()), 'N': int(len(values))}
+    if percentiles:
+        points = np.percentile(values, PERCENTILES).astype(np.int64) if len(values) else np.zeros(len(PERCENTILES))
+        stats['percentile'] = {f'{p:f}': int(v) for p, v in zip(PERCENTILES, points)}
+    if bins:
+        stats['bins'] = _bins(values)
+    return stats
+
+
+def _direction(workers, d, runtime_ms, bins=False):
+    bs = workers[0]['bs']
+    ios = sum(w['done'][d] for w in workers)
+    lat = np.concatenate([w['lat'][(w['lat'] >= 0) & (w['mask'] == (d == 0))] for w in workers])
+    io_bytes = ios * bs
+    bw_bytes = io_bytes * 1000 // runtime_ms if ios else 0
+    clat = _lat_stats(lat, percentiles=True, bins=bins)
+    return {
+        'io_bytes': io_bytes, 'io_kbytes': io_bytes // 1024,
+        'bw_bytes': bw_bytes, 'bw': bw_bytes // 1024,
+        'iops': ios * 1000 / runtime_ms if ios else 0.0,
+        'runtime': runtime_ms if ios else 0,
+        'total_ios': ios, 'short_ios': sum(w['short'][d] for w in workers), 'drop_ios': 0,
+        'slat_ns': _lat_stats(np.zeros(0)),
+        'clat_ns': clat,
+        'lat_ns': {k: clat[k] for k in ('min', 'max', 'mean', 'stddev', 'N')},
+    }
+
+
+def _report(glob, sections, workers, elapsed_ms, bins=False):
+    jobs = []
+    for groupid, (name, section) in enumerate(sections):
+        mine = [w for w in workers if w['name'] == name]
+        grouped = _flag(mine[0]['options'], 'group_reporting')
+        for members in ([mine] if grouped else [[w] for w in mine]):
+            jobs.append({
+                'jobname': name, 'groupid': groupid, 'error': max(w['error'] for w in members),
+                'job options': dict(section),
+                'read': _direction(members, 0, elapsed_ms, bins),
+                'write': _direction(members, 1, elapsed_ms, bins),
+                'job_runtime': elapsed_ms, 'elapsed': -(-elapsed_ms // 1000),
+                'direct': int(all(w['direct'] for w in members)),
+            })
+    now = time.time()
+    return {'fio version': VERSION, 'timestamp': int(now), 'timestamp_ms': int(now * 1000),
+            'time': time.ctime(now), 'global options': glob, 'jobs': jobs}
+
+
+def print_summary(doc):
+    for job in doc['jobs']:
+        for d in ('read', 'write'):
+            r = job[d]
+            if r['total_ios']:
+                print(f"{job['jobname']}: {d}: IOPS={r['iops']:.0f}, BW={r['bw_bytes'] / 1048576:.1f}MiB/s, "
+                      f"clat p50={r['clat_ns']['percentile']['50.000000'] / 1000:.0f}us "
+                      f"p99={r['clat_ns']['percentile']['99.000000'] / 1000:.0f}us")
+        if not job['direct'] and _flag(dict(doc['global options'], **job['job options']), 'direct'):
+            print(f"{job['jobname']}: O_DIRECT не поддерживается, использован кэш страниц")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузка по job-файлу fio без fio')
+    parser.add_argument('jobfile')
+    parser.add_argument('--output-format', default='json', choices=('json', 'json+', 'normal'),
+                        help='json+ добавляет корзины латентности clat_ns.bins')
+    parser.add_argument('--output', default=None, help='файл JSON (по умолчанию stdout)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        doc = run_jobfile(args.jobfile, args.seed, bins=args.output_format == 'json+')
+    except (OSError, ValueError) as e:
+        print(f"loadgen: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.output_format == 'normal':
+        print_summary(doc)
+        return
+    text = json.dumps(doc, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+        print_summary(doc)
+    else:
+        print(text)
+    if any(job['error'] for job in doc['jobs']):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -26,12 +26,27 @@ LOG_FILE=""
 NUM_DEVICES=4
 DEVICE_SIZE=4G  # Увеличено с 2G до 4G
 RAID_DEVICE="/dev/md0"
+RAID_CHUNK=512  # KB
+RAID_LAYOUT="n2"
 MOUNT_POINT="${WORK_DIR}/raid_mount"
 
 # Параметры тестирования - ОПТИМИЗИРОВАНЫ
 TEST_FILE_SIZE="500M"  # Уменьшено с 1G
 FRAGMENTED_FILE_SIZE="800M"  # Уменьшено с 2G
+FRAGMENT_EXTENTS=2000  # целевое число экстентов фрагментированного файла
+FRAGMENT_DIST="fixed"  # размеры экстентов: fixed / uniform / lognormal
 NUM_RUNS=3
+RUN_SUFFIX=""  # _runN для повторов, см. main()
+LOAD_ENGINE="${LOAD_ENGINE:-auto}"  # auto / fio / loadgen
+FIO_CMD=(fio)
+SWEEP=${SWEEP:-0}  # 1 — после основных тестов перебор параметров (sweep.py)
+SWEEP_BS="4K 64K 1M"
+SWEEP_IODEPTH="1 4 16 32"
+SWEEP_NUMJOBS="1 2 4"
+DISKSTATS=${DISKSTATS:-1}  # 1 — статистика md и членов массива во время каждого теста (diskstats.py)
+DISKSTATS_INTERVAL=0.1
+LAT_LOG=${LAT_LOG:-0}  # 1 — писать логи латентности fio (write_lat_log) для latency_hist.py
+HISTORY_DB="${HISTORY_DB:-${SCRIPT_DIR}/raid_history.sqlite}"  # история запусков (history.py)
 
 # Логирование
 log() {
@@ -117,7 +132,7 @@ setup_directories() {
 # Проверка зависимостей
 check_dependencies() {
     log "Проверка зависимостей..."
-    local deps=("mdadm" "fio" "bc" "iostat" "filefrag")
+    local deps=("mdadm" "losetup" "mkfs.ext4" "python3")
     local missing=()
 
     for dep in "${deps[@]}"; do
@@ -127,16 +142,58 @@ check_dependencies() {
     done
 
     if [ ${#missing[@]} -ne 0 ]; then
-        warn "Отсутствуют: ${missing[*]}"
-        info "Установка пакетов..."
-
-        apt-get update -qq
-        apt-get install -y -qq mdadm fio bc sysstat e2fsprogs python3 python3-pip 2>&1 | tee -a "$LOG_FILE"
+        error "Отсутствуют: ${missing[*]} (пакеты mdadm, util-linux, e2fsprogs, python3)"
+    fi
 
-        log "Зависимости установлены"
-    else
-        log "Все зависимости присутствуют"
+    # Генератор нагрузки: fio, а если его нет — loadgen.py с тем же job-файлом и форматом JSON
+    if [ "$LOAD_ENGINE" = "auto" ]; then
+        if command -v fio &> /dev/null; then
+            LOAD_ENGINE="fio"
+        else
+            warn "fio не найден, нагрузка генерируется loadgen.py"
+            LOAD_ENGINE="loadgen"
+        fi
     fi
+    case "$LOAD_ENGINE" in
+        fio)
+            command -v fio &> /dev/null || error "fio не найден (LOAD_ENGINE=fio)"
+            FIO_CMD=(fio) ;;
+        loadgen)
+            FIO_CMD=(python3 "${SCRIPT_DIR}/loadgen.py") ;;
+        *)
+            error "Неизвестный LOAD_ENGINE: $LOAD_ENGINE (auto / fio / loadgen)" ;;
+    esac
+    python3 -c "import numpy" 2>/dev/null || error "Для анализа нужен NumPy (python3-numpy)"
+
+    log "Все зависимости присутствуют, генератор нагрузки: ${FIO_CMD[*]}"
+}
+
+# Конфигурация запуска для history.py; не в results, где каждый *.json — результат fio
+write_config() {
+    python3 - "${WORK_DIR}/config.json" <<PY
+import json, sys
+json.dump({
+    'kernel': '$(uname -r)',
+    'hostname': '$(hostname)',
+    'raid_level': 'raid10',
+    'raid_devices': $NUM_DEVICES,
+    'chunk_kb': $RAID_CHUNK,
+    'layout': '$RAID_LAYOUT',
+    'device_size': '$DEVICE_SIZE',
+    'test_file_size': '$TEST_FILE_SIZE',
+    'fragmented_file_size': '$FRAGMENTED_FILE_SIZE',
+    'fragment_extents': $FRAGMENT_EXTENTS,
+    'num_runs': $NUM_RUNS,
+    'engine': '$LOAD_ENGINE',
+}, open(sys.argv[1], 'w'), indent=2)
+PY
+}
+
+# Занести запуск в историю; сравнение с предыдущими запусками — в analyze_results.sh
+update_history() {
+    log "Запись в историю запусков (${HISTORY_DB})..."
+    python3 "${SCRIPT_DIR}/history.py" --db "$HISTORY_DB" ingest "$WORK_DIR" 2>&1 | tee -a "$LOG_FILE" \
+        || warn "Запуск не занесён в историю"
 }
 
 # Создание виртуальных устройств
@@ -175,8 +232,8 @@ create_raid10() {
     mdadm --create "$RAID_DEVICE" \
         --level=10 \
         --raid-devices=$NUM_DEVICES \
-        --layout=n2 \
-        --chunk=512 \
+        --layout=$RAID_LAYOUT \
+        --chunk=$RAID_CHUNK \
         "${LOOP_DEVICES[@]}" \
         --force 2>&1 | tee -a "$LOG_FILE"
 
@@ -203,7 +260,7 @@ create_filesystem() {
 run_fio_test() {
     local test_name="$1"
     local test_config="$2"
-    local output_file="${RESULTS_DIR}/${test_name}.json"
+    local output_file="${RESULTS_DIR}/${test_name}${RUN_SUFFIX}.json"
 
     info "Запуск: $test_name"
 
@@ -215,9 +272,22 @@ run_fio_test() {
 
     local temp_config="${WORK_DIR}/${test_name}.fio"
     echo "$test_config" > "$temp_config"
+    if [ "$LAT_LOG" = "1" ]; then
+        sed -i "/^\[global\]/a write_lat_log=${RESULTS_DIR}/${test_name}${RUN_SUFFIX}" "$temp_config"
+    fi
 
-    if fio "$temp_config" \
-        --output-format=json \
+    # Статистика устройств собирается обёрткой на время теста: md, затем члены в порядке массива
+    local wrapper=()
+    if [ "$DISKSTATS" = "1" ]; then
+        wrapper=(python3 "${SCRIPT_DIR}/diskstats.py" run
+            --output "${RESULTS_DIR}/${test_name}${RUN_SUFFIX}.diskstats.npz"
+            --interval "$DISKSTATS_INTERVAL"
+            --devices "$(basename "$RAID_DEVICE")" "${LOOP_DEVICES[@]##*/}" --)
+    fi
+
+    # json+ — с корзинами латентности clat_ns.bins для объединения гистограмм по прогонам
+    if ${wrapper[@]+"${wrapper[@]}"} "${FIO_CMD[@]}" "$temp_config" \
+        --output-format=json+ \
         --output="$output_file" \
         2>&1 | tee -a "$LOG_FILE"; then
         info "Тест $test_name OK"
@@ -338,46 +408,23 @@ create_fragmented_file() {
     log "=== СОЗДАНИЕ ФРАГМЕНТИРОВАННОГО ФАЙЛА ==="
 
     local target_file="${MOUNT_POINT}/fragmented_test.dat"
-    local temp_dir="${MOUNT_POINT}/temp_frag"
-
-    # Очистка старых файлов
-    rm -rf "$temp_dir" "$target_file" 2>/dev/null || true
-    mkdir -p "$temp_dir"
-
-    info "Создание фрагментированного файла..."
-
-    # Уменьшенное количество файлов
-    local num_files=200
-    local file_size=$(( (${FRAGMENTED_FILE_SIZE%M} / $num_files) ))
-
-    info "Создание $num_files файлов по ${file_size}MB..."
-    for i in $(seq 1 $num_files); do
-        dd if=/dev/urandom of="${temp_dir}/file_${i}.dat" bs=1M count=$file_size status=none 2>/dev/null
-
-        if [ $((i % 50)) -eq 0 ]; then
-            info "Создано $i/$num_files"
-        fi
-    done
-
-    info "Удаление каждого второго файла..."
-    for i in $(seq 2 2 $num_files); do
-        rm -f "${temp_dir}/file_${i}.dat"
-    done
-
-    sync
-
-    info "Создание финального файла..."
-    dd if=/dev/urandom of="$target_file" bs=1M count=${FRAGMENTED_FILE_SIZE%M} status=progress 2>&1 | tee -a "$LOG_FILE"
 
-    sync
+    rm -f "$target_file" 2>/dev/null || true
 
-    local frag_output=$(filefrag "$target_file")
-    log "Файл создан: $frag_output"
+    info "Создание файла ${FRAGMENTED_FILE_SIZE} из ${FRAGMENT_EXTENTS} экстентов..."
+    # fallocate + COLLAPSE_RANGE: число экстентов задаётся явно, не зависит от аллокатора
+    python3 "${SCRIPT_DIR}/fragment.py" "$target_file" --size "$FRAGMENTED_FILE_SIZE" \
+        --extents "$FRAGMENT_EXTENTS" --dist "$FRAGMENT_DIST" 2>&1 | tee -a "$LOG_FILE" || \
+        info "Число экстентов отличается от заданного"
 
-    echo "$frag_output" > "${RESULTS_DIR}/fragmentation_level.txt"
-    filefrag -v "$target_file" > "${RESULTS_DIR}/fragmentation_details.txt"
+    # Экстенты через FIEMAP: сводка, таблица (как filefrag -v) и массив для анализа
+    python3 "${SCRIPT_DIR}/extents.py" "$target_file" --sync \
+        --details "${RESULTS_DIR}/fragmentation_details.txt" \
+        --save "${RESULTS_DIR}/fragmentation_extents.npy" > "${RESULTS_DIR}/fragmentation_level.txt"
+    log "Файл создан: $(head -1 "${RESULTS_DIR}/fragmentation_level.txt")"
 
-    rm -rf "$temp_dir"
+    # Фрагментация всех файлов на разделе — для сопоставления с результатами fio
+    python3 "${SCRIPT_DIR}/extents.py" "$MOUNT_POINT" --csv "${RESULTS_DIR}/extents_scan.csv" | tee -a "$LOG_FILE"
 
     log "Фрагментированный файл готов"
 }
@@ -434,66 +481,24 @@ iodepth=32"
     log "Тесты на фрагментированных файлах завершены"
 }
 
-# Парсинг результатов
-parse_fio_results() {
-    log "=== АНАЛИЗ РЕЗУЛЬТАТОВ ==="
-
-    python3 - <<'PYTHON_SCRIPT'
-import json
-import os
-import sys
-from pathlib import Path
-
-results_dir = os.environ['RESULTS_DIR']
-output_csv = os.path.join(results_dir, 'summary_results.csv')
-
-json_files = list(Path(results_dir).glob('*.json'))
-
-if not json_files:
-    print("Нет JSON файлов для анализа", file=sys.stderr)
-    sys.exit(1)
-
-summary = []
-
-for json_file in json_files:
-    try:
-        with open(json_file, 'r') as f:
-            data = json.load(f)
-
-        test_name = json_file.stem
-
-        for job in data.get('jobs', []):
-            job_name = job.get('jobname', 'unknown')
+# Перебор iodepth × numjobs × bs; при прерывании повторный запуск продолжает по .sweep_progress.json
+sweep_tests() {
+    log "=== ПЕРЕБОР ПАРАМЕТРОВ ==="
 
-            read_bw = job.get('read', {}).get('bw', 0) / 1024
-            read_iops = job.get('read', {}).get('iops', 0)
-            read_lat = job.get('read', {}).get('lat_ns', {}).get('mean', 0) / 1000000
+    python3 "${SCRIPT_DIR}/sweep.py" "$RESULTS_DIR" \
+        --directory "$MOUNT_POINT" --size "$TEST_FILE_SIZE" \
+        --frag-file "${MOUNT_POINT}/fragmented_test.dat" --states baseline fragmented \
+        --bs $SWEEP_BS --iodepth $SWEEP_IODEPTH --numjobs $SWEEP_NUMJOBS \
+        --engine "$LOAD_ENGINE" 2>&1 | tee -a "$LOG_FILE" || warn "Перебор завершён с ошибками"
 
-            write_bw = job.get('write', {}).get('bw', 0) / 1024
-            write_iops = job.get('write', {}).get('iops', 0)
-            write_lat = job.get('write', {}).get('lat_ns', {}).get('mean', 0) / 1000000
-
-            summary.append({
-                'test_name': test_name,
-                'job_name': job_name,
-                'read_bw_mbs': round(read_bw, 2),
-                'read_iops': round(read_iops, 2),
-                'read_lat_ms': round(read_lat, 2),
-                'write_bw_mbs': round(write_bw, 2),
-                'write_iops': round(write_iops, 2),
-                'write_lat_ms': round(write_lat, 2)
-            })
-    except Exception as e:
-        print(f"Ошибка {json_file}: {e}", file=sys.stderr)
+    log "Перебор параметров завершен"
+}
 
-with open(output_csv, 'w') as f:
-    f.write('test_name,job_name,read_bw_mbs,read_iops,read_lat_ms,write_bw_mbs,write_iops,write_lat_ms\n')
-    for row in summary:
-        f.write(f"{row['test_name']},{row['job_name']},{row['read_bw_mbs']},{row['read_iops']},{row['read_lat_ms']},{row['write_bw_mbs']},{row['write_iops']},{row['write_lat_ms']}\n")
+# Парсинг результатов
+parse_fio_results() {
+    log "=== АНАЛИЗ РЕЗУЛЬТАТОВ ==="
 
-print(f"Результаты в {output_csv}")
-print(f"Обработано тестов: {len(summary)}")
-PYTHON_SCRIPT
+    python3 "${SCRIPT_DIR}/fio_ingest.py" "$RESULTS_DIR"
 
     log "Анализ завершен"
 }
@@ -502,147 +507,7 @@ PYTHON_SCRIPT
 generate_graphs() {
     log "=== СОЗДАНИЕ ГРАФИКОВ ==="
 
-    python3 - <<'PYTHON_SCRIPT'
-import csv
-import os
-import sys
-
-try:
-    import matplotlib
-    matplotlib.use('Agg')
-    import matplotlib.pyplot as plt
-    import numpy as np
-except ImportError:
-    print("Установка matplotlib...")
-    import subprocess
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "-q", "matplotlib", "numpy"])
-    import matplotlib
-    matplotlib.use('Agg')
-    import matplotlib.pyplot as plt
-    import numpy as np
-
-results_dir = os.environ['RESULTS_DIR']
-graphs_dir = os.environ['GRAPHS_DIR']
-csv_file = os.path.join(results_dir, 'summary_results.csv')
-
-if not os.path.exists(csv_file):
-    print(f"CSV файл не найден: {csv_file}", file=sys.stderr)
-    sys.exit(1)
-
-data = []
-with open(csv_file, 'r') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        data.append(row)
-
-if not data:
-    print("Нет данных для графиков", file=sys.stderr)
-    sys.exit(1)
-
-baseline_seq_read = [d for d in data if 'baseline_seq_read_' in d['test_name'] and 'mixed' not in d['test_name']]
-fragmented_seq_read = [d for d in data if 'fragmented_seq_read_' in d['test_name']]
-
-if baseline_seq_read and fragmented_seq_read:
-    block_sizes = []
-    baseline_bw = []
-    fragmented_bw = []
-
-    for d in sorted(baseline_seq_read, key=lambda x: x['test_name']):
-        bs = d['test_name'].split('_')[-1]
-        block_sizes.append(bs)
-        baseline_bw.append(float(d['read_bw_mbs']))
-
-    for d in sorted(fragmented_seq_read, key=lambda x: x['test_name']):
-        fragmented_bw.append(float(d['read_bw_mbs']))
-
-    x = np.arange(len(block_sizes))
-    width = 0.35
-
-    fig, ax = plt.subplots(figsize=(12, 6))
-    rects1 = ax.bar(x - width/2, baseline_bw, width, label='Нефрагментированный', color='#2ecc71')
-    rects2 = ax.bar(x + width/2, fragmented_bw, width, label='Фрагментированный', color='#e74c3c')
-
-    ax.set_xlabel('Размер блока', fontsize=12)
-    ax.set_ylabel('Пропускная способность (MB/s)', fontsize=12)
-    ax.set_title('Влияние фрагментации на последовательное чтение', fontsize=14, fontweight='bold')
-    ax.set_xticks(x)
-    ax.set_xticklabels(block_sizes)
-    ax.legend()
-    ax.grid(axis='y', alpha=0.3)
-
-    plt.tight_layout()
-    plt.savefig(os.path.join(graphs_dir, 'fragmentation_impact_sequential.png'), dpi=300)
-    print("График 1: fragmentation_impact_sequential.png")
-    plt.close()
-
-baseline_rand = [d for d in data if d['test_name'] == 'baseline_rand_read_4k']
-fragmented_rand = [d for d in data if d['test_name'] == 'fragmented_rand_read_4k']
-
-if baseline_rand and fragmented_rand:
-    categories = ['Нефрагментированный', 'Фрагментированный']
-    iops_values = [float(baseline_rand[0]['read_iops']), float(fragmented_rand[0]['read_iops'])]
-
-    fig, ax = plt.subplots(figsize=(8, 6))
-    bars = ax.bar(categories, iops_values, color=['#3498db', '#e67e22'], width=0.6)
-
-    ax.set_ylabel('IOPS', fontsize=12)
-    ax.set_title('Случайное чтение (4K): IOPS', fontsize=14, fontweight='bold')
-    ax.grid(axis='y', alpha=0.3)
-
-    for bar in bars:
-        height = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2., height,
-                f'{int(height):,}',
-                ha='center', va='bottom', fontsize=11)
-
-    plt.tight_layout()
-    plt.savefig(os.path.join(graphs_dir, 'fragmentation_impact_iops.png'), dpi=300)
-    print("График 2: fragmentation_impact_iops.png")
-    plt.close()
-
-if baseline_seq_read and fragmented_seq_read and len(baseline_bw) == len(fragmented_bw):
-    degradation = []
-
-    for i in range(len(baseline_bw)):
-        if baseline_bw[i] > 0:
-            deg = ((baseline_bw[i] - fragmented_bw[i]) / baseline_bw[i]) * 100
-            degradation.append(deg)
-        else:
-            degradation.append(0)
-
-    fig, ax = plt.subplots(figsize=(12, 6))
-    ax.plot(block_sizes, degradation, marker='o', linewidth=2, markersize=8, color='#c0392b')
-    ax.fill_between(range(len(block_sizes)), degradation, alpha=0.3, color='#e74c3c')
-
-    ax.set_xlabel('Размер блока', fontsize=12)
-    ax.set_ylabel('Деградация (%)', fontsize=12)
-    ax.set_title('Снижение производительности', fontsize=14, fontweight='bold')
-    ax.set_xticks(range(len(block_sizes)))
-    ax.set_xticklabels(block_sizes)
-    ax.grid(True, alpha=0.3)
-    ax.axhline(y=0, color='k', linestyle='-', linewidth=0.5)
-
-    plt.tight_layout()
-    plt.savefig(os.path.join(graphs_dir, 'performance_degradation.png'), dpi=300)
-    print("График 3: performance_degradation.png")
-    plt.close()
-
-seq_read_base = next((d for d in data if d['test_name'] == 'baseline_seq_read'), None)
-seq_read_frag = next((d for d in data if d['test_name'] == 'fragmented_seq_read'), None)
-
-if seq_read_base and seq_read_frag:
-    bw_base = float(seq_read_base['read_bw_mbs'])
-    bw_frag = float(seq_read_frag['read_bw_mbs'])
-
-    degradation_pct = ((bw_base - bw_frag) / bw_base * 100) if bw_base > 0 else 0
-
-    print(f"\n=== РЕЗУЛЬТАТЫ ===")
-    print(f"Baseline: {bw_base:.2f} MB/s")
-    print(f"Fragmented: {bw_frag:.2f} MB/s")
-    print(f"Деградация: {degradation_pct:.2f}%")
-
-print("\nГрафики созданы!")
-PYTHON_SCRIPT
+    python3 "${SCRIPT_DIR}/charts.py" "$RESULTS_DIR" "$GRAPHS_DIR"
 
     log "Графики созданы"
 }
@@ -743,15 +608,33 @@ main() {
     log "=== НАЧАЛО ==="
 
     check_dependencies
+    write_config
     create_loop_devices
     create_raid10
     create_filesystem
 
-    baseline_tests
+    # Повторы для оценки разброса; analyze_results.sh усредняет их по суффиксу _runN
+    for run in $(seq 1 $NUM_RUNS); do
+        RUN_SUFFIX="_run${run}"
+        log "--- Прогон ${run}/${NUM_RUNS} ---"
+        baseline_tests
+    done
+
     create_fragmented_file
-    fragmented_tests
+
+    for run in $(seq 1 $NUM_RUNS); do
+        RUN_SUFFIX="_run${run}"
+        log "--- Прогон ${run}/${NUM_RUNS} ---"
+        fragmented_tests
+    done
+    RUN_SUFFIX=""
+
+    if [ "$SWEEP" = "1" ]; then
+        sweep_tests
+    fi
 
     parse_fio_results
+    update_history
     generate_graphs
     generate_report
 
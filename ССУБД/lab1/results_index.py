@@ -0,0 +1,187 @@
+# Индекс результатов fio по сценарию, размеру блока, режиму и фрагментации.
+#
+# Имя теста (= имя JSON-файла) разбирается один раз на уникальное имя:
+#     <state>_<scenario>[_<bs>][_run<N>]
+#     baseline_seq_read_64K_run2 -> state=baseline, scenario=seq_read, run=2
+# rw, bs, iodepth и numjobs берутся из параметров задания в JSON (fio_ingest).
+# Задания одного файла сводятся в один прогон (bw и IOPS складываются,
+# латентность усредняется), после чего прогоны группируются по ключу и для
+# каждой метрики считаются среднее, стандартное отклонение и число прогонов
+# (NUM_RUNS в raid_performance_test.sh). В ключ входит и имя теста без _runN:
+# baseline_seq_read и baseline_seq_read_1M совпадают по rw/bs/iodepth/numjobs,
+# но это разные тесты, и их прогоны — не повторы одного измерения. Агрегаты для каждого набора полей
+# группировки вычисляются один раз и запоминаются в индексе.
+#
+#     index = results_index.build(fio_ingest.load(results_dir))
+#     results_index.query(index, state='baseline', scenario='seq_read')   # по bs
+#     results_index.lookup(index, state='fragmented', scenario='rand_read', bs=4096)
+#
+#     python3 results_index.py <results_dir> [--by state scenario bs]
+
+import argparse
+import re
+
+import numpy as np
+from numpy.lib import recfunctions as rfn
+
+import fio_ingest
+
+STATES = ('baseline', 'fragmented')
+GROUP_KEYS = ('state', 'scenario', 'rw', 'bs', 'iodepth', 'numjobs', 'test')
+METRICS = ('read_bw_mbs', 'read_iops', 'read_lat_ms', 'write_bw_mbs', 'write_iops', 'write_lat_ms')
+# Метрики, которые при нескольких заданиях в одном файле складываются, остальные усредняются
+ADDITIVE = ('read_bw_mbs', 'read_iops', 'write_bw_mbs', 'write_iops')
+
+RUN_DTYPE = np.dtype([
+    ('test_name', 'U128'),
+    ('test', 'U128'),
+    ('state', 'U16'),
+    ('scenario', 'U64'),
+    ('rw', 'U16'),
+    ('bs', 'i8'),
+    ('iodepth', 'i4'),
+    ('numjobs', 'i4'),
+    ('run', 'i4'),
+] + [(m, 'f8') for m in METRICS])
+
+_RUN_SUFFIX = re.compile(r'^(.*?)(?:_run(\d+))?$')
+_BS_SUFFIX = re.compile(r'_\d+[kmg]$', re.IGNORECASE)
+
+
+# -------------------- Имена тестов --------------------
+def parse_test_name(name):
+    """(test без _runN, state, scenario, run) из имени файла результата"""
+    m = _RUN_SUFFIX.match(name)
+    test, run = m.group(1), int(m.group(2) or 1)
+    state, _, rest = test.partition('_')
+    if state not in STATES:
+        state, rest = '', test
+    return test, state, _BS_SUFFIX.sub('', rest), run
+
+
+def case_name(test, state):
+    """Имя теста без состояния: общее у baseline- и fragmented-версий одного теста"""
+    return test[len(state) + 1:] if state and test.startswith(state + '_') else test
+
+
+def format_size(nbytes):
+    """4096 -> '4K', 1048576 -> '1M'"""
+    for unit, size in (('G', 1 << 30), ('M', 1 << 20), ('K', 1 << 10)):
+        if nbytes >= size and nbytes % size == 0:
+            return f'{nbytes // size}{unit}'
+    return str(nbytes)
+
+
+# -------------------- Построение --------------------
+def _collapse_jobs(records):
+    """Одна строка на файл результата: задания одного прогона сводятся вместе"""
+    names, first, inverse, counts = np.unique(records['test_name'], return_index=True,
+                                              return_inverse=True, return_counts=True)
+    runs = np.zeros(len(names), dtype=RUN_DTYPE)
+    runs['test_name'] = names
+    for field in ('rw', 'bs', 'iodepth', 'numjobs'):
+        runs[field] = records[field][first]
+    for m in METRICS:
+        total = np.bincount(inverse, weights=records[m], minlength=len(names))
+        runs[m] = total if m in ADDITIVE else total / counts
+
+    parsed = [parse_test_name(n) for n in names]
+    for i, field in enumerate(('test', 'state', 'scenario', 'run')):
+        runs[field] = [p[i] for p in parsed]
+    return runs
+
+
+def build(records):
+    """Индекс по массиву fio_ingest.RECORD_DTYPE"""
+    return {'runs': _collapse_jobs(records) if len(records) else np.zeros(0, dtype=RUN_DTYPE),
+            'groups': {}, 'members': {}}
+
+
+def aggregate(index, by=GROUP_KEYS):
+    """Группы прогонов: поля by, n, <метрика> (среднее) и <метрика>_std; порядок — по ключу"""
+    by = tuple(by)
+    if by in index['groups']:
+        return index['groups'][by]
+
+    runs = index['runs']
+    keys, inverse, counts = np.unique(rfn.repack_fields(runs[list(by)]),
+                                      return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+    dtype = [(f, RUN_DTYPE[f]) for f in by] + [('n', 'i4')]
+    dtype += [(name, 'f8') for m in METRICS for name in (m, m + '_std')]
+    groups = np.zeros(len(keys), dtype=dtype)
+    for f in by:
+        groups[f] = keys[f]
+    groups['n'] = counts
+
+    spread = np.maximum(counts - 1, 1)
+    for m in METRICS:
+        mean = np.bincount(inverse, weights=runs[m], minlength=len(keys)) / counts
+        dev = runs[m] - mean[inverse]
+        groups[m] = mean
+        groups[m + '_std'] = np.sqrt(np.bincount(inverse, weights=dev * dev, minlength=len(keys)) / spread)
+
+    index['groups'][by] = groups
+    index['members'][by] = inverse
+    return groups
+
+
+def samples(index, field, by=GROUP_KEYS):
+    """Значения field по прогонам для каждой группы aggregate(index, by), в том же порядке"""
+    groups = aggregate(index, by)
+    inverse = index['members'][tuple(by)]
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.cumsum(groups['n'])[:-1]
+    return np.split(index['runs'][field][order], bounds)
+
+
+def query(index, by=GROUP_KEYS, **criteria):
+    """Группы, у которых поля criteria равны заданным; упорядочены по ключу (bs по возрастанию)"""
+    groups = aggregate(index, by)
+    mask = np.ones(len(groups), dtype=bool)
+    for field, value in criteria.items():
+        mask &= groups[field] == value
+    return groups[mask]
+
+
+def lookup(index, by=GROUP_KEYS, **criteria):
+    """Первая подходящая группа или None"""
+    rows = query(index, by, **criteria)
+    return rows[0] if len(rows) else None
+
+
+def paired(index, field='bs', by=GROUP_KEYS, **criteria):
+    """Пары (baseline, fragmented) групп с общими значениями field, по возрастанию field"""
+    base = query(index, by, state='baseline', **criteria)
+    frag = query(index, by, state='fragmented', **criteria)
+    common = np.intersect1d(base[field], frag[field])
+    base = base[np.isin(base[field], common)]
+    frag = frag[np.isin(frag[field], common)]
+    # при нескольких группах на одно значение field берётся первая
+    _, ib = np.unique(base[field], return_index=True)
+    _, jf = np.unique(frag[field], return_index=True)
+    return base[ib], frag[jf]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сводка результатов fio по группам')
+    parser.add_argument('results_dir')
+    parser.add_argument('--by', nargs='+', default=list(GROUP_KEYS), choices=GROUP_KEYS)
+    args = parser.parse_args()
+
+    index = build(fio_ingest.load(args.results_dir))
+    groups = aggregate(index, args.by)
+    print("=" * 100)
+    print(f"Прогонов: {len(index['runs'])}, групп: {len(groups)}")
+    print("=" * 100)
+    head = ' | '.join(f'{f:>10}' for f in args.by)
+    print(f"{head} | {'n':>3} | {'read MB/s':>16} | {'read IOPS':>18} | {'write MB/s':>16}")
+    for g in groups:
+        key = ' | '.join(f"{format_size(g[f]) if f == 'bs' else g[f]:>10}" for f in args.by)
+        print(f"{key} | {g['n']:>3} | {g['read_bw_mbs']:>8.1f} ± {g['read_bw_mbs_std']:<5.1f} | "
+              f"{g['read_iops']:>9.0f} ± {g['read_iops_std']:<6.0f} | "
+              f"{g['write_bw_mbs']:>8.1f} ± {g['write_bw_mbs_std']:<5.1f}")
+
+
+if __name__ == '__main__':
+    main()
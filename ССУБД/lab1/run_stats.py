@@ -0,0 +1,217 @@
+# Статистика по повторным прогонам fio (NUM_RUNS в raid_performance_test.sh).
+#
+# Для каждой группы results_index (state, scenario, rw, bs, iodepth, numjobs,
+# test) по значениям основной метрики в прогонах считаются среднее, коэффициент
+# вариации и бутстрэп-интервал для среднего. Группы baseline и fragmented с
+# одинаковыми остальными полями сравниваются: бутстрэп-интервал для
+# деградации (baseline - fragmented) / baseline, в %; если интервал содержит
+# 0, различие не считается значимым.
+#
+# Число нужных прогонов оценивается по нормальному приближению:
+#   точность среднего:   n = (z * CV / precision)^2
+#   значимость различия: n = (z * sqrt(s_b^2 + s_f^2) / |разность|)^2
+# Дополнительные прогоны = max(0, n - уже сделано). При 2-3 прогонах
+# интервалы и оценки грубые — ими и определяется, где повторить измерения.
+#
+#     python3 run_stats.py <results_dir>                 # таблица + run_stats.csv
+#     python3 run_stats.py <results_dir> --markdown      # таблица для отчёта
+
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+
+import fio_ingest
+import results_index
+
+CSV_NAME = 'run_stats.csv'
+Z = {0.90: 1.645, 0.95: 1.960, 0.99: 2.576}
+
+# Основная метрика по режиму fio
+METRIC = {'read': 'read_bw_mbs', 'write': 'write_bw_mbs', 'randread': 'read_iops',
+          'randwrite': 'write_iops', 'randrw': 'read_iops', 'rw': 'read_bw_mbs', 'readwrite': 'read_bw_mbs'}
+UNITS = {'read_bw_mbs': 'MB/s', 'write_bw_mbs': 'MB/s', 'read_iops': 'IOPS', 'write_iops': 'IOPS'}
+
+
+# -------------------- Оценки --------------------
+def bootstrap_means(values, resamples, rng):
+    """Средние resamples бутстрэп-выборок (векторно, одной матрицей индексов)"""
+    idx = rng.integers(0, len(values), size=(resamples, len(values)))
+    return values[idx].mean(axis=1)
+
+
+def interval(draws, confidence):
+    """Процентильный интервал"""
+    tail = (1.0 - confidence) / 2 * 100
+    lo, hi = np.percentile(draws, [tail, 100 - tail])
+    return float(lo), float(hi)
+
+
+def cv(values):
+    """Коэффициент вариации (выборочное std / среднее); nan при одном прогоне"""
+    if len(values) < 2 or values.mean() == 0:
+        return float('nan')
+    return float(values.std(ddof=1) / abs(values.mean()))
+
+
+def runs_for_precision(values, precision, z):
+    """Прогонов, чтобы полуширина интервала среднего была не больше precision * среднее"""
+    c = cv(values)
+    if math.isnan(c):
+        return None
+    return max(2, math.ceil((z * c / precision) ** 2))
+
+
+def runs_for_difference(base, frag, z):
+    """Прогонов в каждой группе, чтобы наблюдаемая разность стала значимой"""
+    if len(base) < 2 or len(frag) < 2:
+        return None
+    diff = abs(base.mean() - frag.mean())
+    spread = math.sqrt(base.var(ddof=1) + frag.var(ddof=1))
+    if diff == 0:
+        return None
+    return max(2, math.ceil((z * spread / diff) ** 2))
+
+
+# -------------------- Анализ --------------------
+def analyze(index, confidence=0.95, precision=0.05, resamples=10000, seed=0):
+    """Строки сравнения: одна на тест (без состояния) и набор (rw, bs, iodepth, numjobs)"""
+    rng = np.random.default_rng(seed)
+    z = Z.get(confidence, 1.960)
+    groups = results_index.aggregate(index)
+    per_metric = {m: results_index.samples(index, m) for m in set(METRIC.values())}
+
+    pairs = {}
+    for i, g in enumerate(groups):
+        case = results_index.case_name(str(g['test']), str(g['state']))
+        key = (case, str(g['scenario']), str(g['rw']), int(g['bs']), int(g['iodepth']), int(g['numjobs']))
+        pairs.setdefault(key, {})[str(g['state'])] = i
+
+    rows = []
+    for key, states in pairs.items():
+        case, scenario, rw, bs, iodepth, numjobs = key
+        metric = METRIC.get(rw, 'read_bw_mbs')
+        row = {'test': case, 'scenario': scenario, 'rw': rw, 'bs': results_index.format_size(bs),
+               'iodepth': iodepth, 'numjobs': numjobs, 'metric': metric}
+        draws, extra = {}, []
+        for state in ('baseline', 'fragmented'):
+            if state not in states:
+                continue
+            values = per_metric[metric][states[state]]
+            draws[state] = bootstrap_means(values, resamples, rng)
+            lo, hi = interval(draws[state], confidence)
+            need = runs_for_precision(values, precision, z)
+            row.update({f'{state}_n': len(values), f'{state}_mean': float(values.mean()),
+                        f'{state}_lo': lo, f'{state}_hi': hi, f'{state}_cv': cv(values)})
+            extra.append(need - len(values) if need is not None else None)
+
+        if len(draws) == 2:
+            base = per_metric[metric][states['baseline']]
+            frag = per_metric[metric][states['fragmented']]
+            safe = np.where(draws['baseline'] != 0, draws['baseline'], np.nan)
+            deg = (draws['baseline'] - draws['fragmented']) / safe * 100
+            lo, hi = interval(deg[np.isfinite(deg)], confidence) if np.isfinite(deg).any() else (math.nan, math.nan)
+            row['degradation'] = float((base.mean() - frag.mean()) / base.mean() * 100) if base.mean() else math.nan
+            row['degradation_lo'], row['degradation_hi'] = lo, hi
+            row['significant'] = bool(lo > 0 or hi < 0)
+            if not row['significant']:
+                need = runs_for_difference(base, frag, z)
+                extra.append(need - min(len(base), len(frag)) if need is not None else None)
+
+        known = [e for e in extra if e is not None]
+        row['extra_runs'] = max(0, max(known)) if known else None
+        rows.append(row)
+    return rows
+
+
+# -------------------- Вывод --------------------
+def _fmt_ci(row, state):
+    if f'{state}_n' not in row:
+        return '—'
+    return f"{row[state + '_mean']:.1f} [{row[state + '_lo']:.1f}; {row[state + '_hi']:.1f}]"
+
+
+def _fmt_cv(row, state):
+    value = row.get(f'{state}_cv', math.nan)
+    return '—' if math.isnan(value) else f'{value * 100:.1f}%'
+
+
+def _fmt_deg(row):
+    if 'degradation' not in row:
+        return '—'
+    mark = '' if row['significant'] else ' (н/з)'
+    return f"{row['degradation']:+.1f}% [{row['degradation_lo']:+.1f}; {row['degradation_hi']:+.1f}]{mark}"
+
+
+def _fmt_extra(row):
+    return '?' if row['extra_runs'] is None else str(row['extra_runs'])
+
+
+def print_table(rows, confidence):
+    print("=" * 160)
+    print(f"Бутстрэп-интервалы {confidence:.0%}, н/з — различие не значимо")
+    print("=" * 160)
+    print(f"{'тест':>20} | {'bs':>5} | {'метрика':>12} | {'baseline':>28} | {'CV':>6} | "
+          f"{'fragmented':>28} | {'CV':>6} | {'деградация':>30} | ещё прогонов")
+    for r in rows:
+        print(f"{r['test']:>20} | {r['bs']:>5} | {r['metric']:>12} | {_fmt_ci(r, 'baseline'):>28} | "
+              f"{_fmt_cv(r, 'baseline'):>6} | {_fmt_ci(r, 'fragmented'):>28} | {_fmt_cv(r, 'fragmented'):>6} | "
+              f"{_fmt_deg(r):>30} | {_fmt_extra(r)}")
+
+
+def print_markdown(rows, confidence):
+    print(f"| Тест | Блок | Метрика | Baseline ({confidence:.0%} ДИ) | CV | Fragmented ({confidence:.0%} ДИ) | CV | "
+          f"Деградация | Ещё прогонов |")
+    print("|---|---|---|---|---|---|---|---|---|")
+    for r in rows:
+        print(f"| {r['test']} | {r['bs']} | {UNITS.get(r['metric'], r['metric'])} | {_fmt_ci(r, 'baseline')} | "
+              f"{_fmt_cv(r, 'baseline')} | {_fmt_ci(r, 'fragmented')} | {_fmt_cv(r, 'fragmented')} | "
+              f"{_fmt_deg(r)} | {_fmt_extra(r)} |")
+
+
+def write_csv(rows, path):
+    fields = ['test', 'scenario', 'rw', 'bs', 'iodepth', 'numjobs', 'metric']
+    for state in ('baseline', 'fragmented'):
+        fields += [f'{state}_{k}' for k in ('n', 'mean', 'lo', 'hi', 'cv')]
+    fields += ['degradation', 'degradation_lo', 'degradation_hi', 'significant', 'extra_runs']
+    with open(path, 'w') as f:
+        f.write(','.join(fields) + '\n')
+        for r in rows:
+            f.write(','.join('' if r.get(k) is None else str(r.get(k, '')) for k in fields) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Доверительные интервалы и число прогонов по результатам fio')
+    parser.add_argument('results_dir')
+    parser.add_argument('--confidence', type=float, default=0.95, choices=sorted(Z))
+    parser.add_argument('--precision', type=float, default=0.05,
+                        help='целевая полуширина интервала среднего, доля от среднего')
+    parser.add_argument('--resamples', type=int, default=10000)
+    parser.add_argument('--markdown', action='store_true', help='только таблица Markdown для отчёта')
+    parser.add_argument('--csv', default=None, help=f'по умолчанию <results_dir>/{CSV_NAME}')
+    args = parser.parse_args()
+
+    data = fio_ingest.load(args.results_dir)
+    if len(data) == 0:
+        print("Нет данных для анализа", file=sys.stderr)
+        sys.exit(1)
+    rows = analyze(results_index.build(data), args.confidence, args.precision, args.resamples)
+
+    if args.markdown:
+        print_markdown(rows, args.confidence)
+        return
+
+    print_table(rows, args.confidence)
+    noisy = [r for r in rows if r['extra_runs']]
+    if noisy:
+        print(f"\nНужны дополнительные прогоны (точность ±{args.precision:.0%}): " +
+              ", ".join(f"{r['scenario']} {r['bs']} +{r['extra_runs']}" for r in noisy))
+    path = args.csv or os.path.join(args.results_dir, CSV_NAME)
+    write_csv(rows, path)
+    print(f"✓ Отчёт сохранён: {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+# Перебор параметров fio: состояние × rw × bs × iodepth × numjobs.
+#
+# Точки сетки упорядочиваются так, чтобы подготовка повторялась как можно
+# реже: сначала по состоянию (baseline — файлы заданий в каталоге,
+# fragmented — один файл от fragment.py, создаётся один раз), затем по
+# numjobs по возрастанию. Имя задания во всех точках одно ('sweep'), а файлы
+# не удаляются до конца состояния, поэтому fio (или loadgen.py) размечает
+# файл sweep.N.0 только при первом появлении воркера N.
+#
+# Измерение, по которому ищется насыщение (--plateau, по умолчанию iodepth),
+# перебирается внутренним циклом. Если пропускная способность (MB/s для
+# последовательных режимов, IOPS для случайных) за patience шагов подряд
+# выросла меньше чем на threshold относительно лучшей, остальные значения
+# этого измерения для той же комбинации прочих параметров пропускаются.
+#
+# После каждой точки прогресс сохраняется в <results_dir>/.sweep_progress.json
+# (служебный файл с точкой: разбор результатов fio его пропускает);
+# повторный запуск с той же командой продолжает с места остановки (готовые
+# точки не перезапускаются, пропуски по насыщению пересчитываются).
+#
+#     python3 sweep.py <results_dir> --directory /mnt/raid --size 500M \
+#         --frag-file /mnt/raid/fragmented_test.dat --bs 4K 64K 1M --iodepth 1 4 16 32 --numjobs 1 2 4
+#     python3 sweep.py <results_dir> ... --dry-run      # только план
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import fio_ingest
+import results_index
+from run_stats import METRIC, UNITS
+
+PROGRESS_NAME = '.sweep_progress.json'
+SUMMARY_NAME = 'sweep_summary.csv'
+JOB_NAME = 'sweep'
+STATES = results_index.STATES
+DIMENSIONS = ('state', 'numjobs', 'rw', 'bs', 'iodepth')
+RW_ORDER = ('read', 'randread', 'rw', 'randrw', 'write', 'randwrite')
+
+
+# -------------------- План --------------------
+def plan(grid, plateau='iodepth'):
+    """Точки сетки в порядке выполнения: состояние и numjobs снаружи, plateau — внутренний цикл"""
+    order = [d for d in DIMENSIONS if d != plateau] + ([plateau] if plateau in DIMENSIONS else [])
+    rank = {
+        'state': lambda v: STATES.index(v),
+        'rw': lambda v: RW_ORDER.index(v) if v in RW_ORDER else len(RW_ORDER),
+        'bs': fio_ingest.parse_size,
+        'iodepth': int, 'numjobs': int,
+    }
+    points = [dict(zip(DIMENSIONS, values)) for values in itertools.product(*(grid[d] for d in DIMENSIONS))]
+    points.sort(key=lambda p: tuple(rank[d](p[d]) for d in order))
+    return points
+
+
+def point_id(p):
+    return f"{p['state']}|{p['rw']}|{p['bs']}|{p['iodepth']}|{p['numjobs']}"
+
+
+def test_name(p):
+    """Имя результата: разбирается results_index как <state>_<scenario>_<bs>"""
+    return f"{p['state']}_sweep_{p['rw']}_qd{p['iodepth']}_nj{p['numjobs']}_{p['bs']}"
+
+
+def layouts(points):
+    """Сколько раз придётся размечать файлы: новый воркер в состоянии baseline или новый файл fragmented"""
+    seen = set()
+    for p in points:
+        if p['state'] == 'fragmented':
+            seen.add(('fragmented', 0))
+        else:
+            seen.update(('baseline', i) for i in range(int(p['numjobs'])))
+    return len(seen)
+
+
+def line_key(p, plateau):
+    """Точки одной линии отличаются только значением plateau"""
+    return tuple(p[d] for d in DIMENSIONS if d != plateau)
+
+
+# -------------------- Прогресс --------------------
+def read_progress(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'points': {}}
+
+
+def write_progress(path, progress):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(progress, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def plateau_state(points, progress, plateau, threshold):
+    """{линия: (лучшее значение, шагов без роста)} по уже измеренным точкам, в порядке плана"""
+    lines = {}
+    for p in points:
+        rec = progress['points'].get(point_id(p))
+        if rec is None or rec['status'] != 'done':
+            continue
+        update_line(lines, line_key(p, plateau), rec['throughput'], threshold)
+    return lines
+
+
+def update_line(lines, key, value, threshold):
+    best, stall = lines.get(key, (None, 0))
+    if best is None or value > best * (1 + threshold):
+        lines[key] = (value, 0)
+    else:
+        lines[key] = (max(best, value), stall + 1)
+
+
+# -------------------- Выполнение --------------------
+def job_text(p, target, size, runtime):
+    """Job-файл в формате raid_performance_test.sh"""
+    lines = ['[global]']
+    if p['state'] == 'fragmented':
+        lines.append(f"filename={target['frag_file']}")
+    else:
+        lines += [f"directory={target['directory']}", f'size={size}']
+    lines += ['ioengine=libaio', 'direct=1', f"numjobs={p['numjobs']}", 'group_reporting=1']
+    if runtime:
+        lines += [f'runtime={runtime}', 'time_based=1']
+    lines += ['', f'[{JOB_NAME}]', f"rw={p['rw']}", f"bs={p['bs']}", f"iodepth={p['iodepth']}"]
+    return '\n'.join(lines) + '\n'
+
+
+def engine_command(engine):
+    if engine == 'auto':
+        engine = 'fio' if shutil.which('fio') else 'loadgen'
+    if engine == 'fio':
+        return ['fio']
+    return [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'loadgen.py')]
+
+
+def throughput(path, rw):
+    """Основная метрика точки (как в run_stats): сумма по заданиям файла"""
+    field = METRIC.get(rw, 'read_bw_mbs')
+    names = fio_ingest.RECORD_DTYPE.names
+    return sum(row[names.index(field)] for row in fio_ingest.parse_file(path))
+
+
+def run_point(p, args, command, suffix=''):
+    """Один прогон точки; значение метрики или None при ошибке"""
+    out = os.path.join(args.results_dir, f'{test_name(p)}{suffix}.json')
+    job_path = os.path.join(args.results_dir, f'.{JOB_NAME}.fio')
+    with open(job_path, 'w') as f:
+        f.write(job_text(p, {'directory': args.directory, 'frag_file': args.frag_file}, args.size, args.runtime))
+    try:
+        done = subprocess.run(command + [job_path, '--output-format=json+', f'--output={out}'])
+    finally:
+        os.remove(job_path)
+    if done.returncode != 0 or not os.path.exists(out):
+        return None
+    try:
+        return throughput(out, p['rw'])
+    except (OSError, ValueError) as e:
+        print(f"Ошибка разбора {out}: {e}", file=sys.stderr)
+        return None
+
+
+def prepare_state(state, args):
+    """Подготовка перед первой точкой состояния"""
+    if state == 'fragmented' and not os.path.exists(args.frag_file):
+        import fragment
+        print(f"Создание фрагментированного файла {args.frag_file} ({args.frag_extents} экстентов)...")
+        fragment.generate(args.frag_file, fio_ingest.parse_size(args.size), args.frag_extents, verbose=True)
+
+
+def cleanup_state(state, args, max_numjobs):
+    """Файлы заданий baseline удаляются после последней точки состояния"""
+    if state != 'baseline':
+        return
+    for i in range(max_numjobs):
+        path = os.path.join(args.directory, f'{JOB_NAME}.{i}.0')
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def sweep(points, args):
+    progress_path = os.path.join(args.results_dir, PROGRESS_NAME)
+    progress = read_progress(progress_path) if not args.restart else {'points': {}}
+    progress['grid'] = {d: sorted({str(p[d]) for p in points}) for d in DIMENSIONS}
+    lines = plateau_state(points, progress, args.plateau, args.threshold)
+    command = engine_command(args.engine)
+
+    counts = {'done': 0, 'resumed': 0, 'skipped': 0, 'failed': 0}
+    state = None
+    start = time.perf_counter()
+    for i, p in enumerate(points, 1):
+        key = point_id(p)
+        rec = progress['points'].get(key)
+        if rec is not None and rec['status'] == 'done':
+            counts['resumed'] += 1
+            continue
+        line = line_key(p, args.plateau)
+        if args.plateau in DIMENSIONS and lines.get(line, (None, 0))[1] >= args.patience:
+            counts['skipped'] += 1
+            print(f"[{i}/{len(points)}] {test_name(p)}: пропуск, насыщение по {args.plateau}")
+            continue
+
+        if p['state'] != state:
+            if state is not None:
+                cleanup_state(state, args, max(int(q['numjobs']) for q in points))
+            state = p['state']
+            prepare_state(state, args)
+
+        print(f"[{i}/{len(points)}] {test_name(p)}")
+        values = []
+        for run in range(1, args.runs + 1):
+            value = run_point(p, args, command, f'_run{run}' if args.runs > 1 else '')
+            if value is None:
+                break
+            values.append(value)
+        if len(values) < args.runs:
+            counts['failed'] += 1
+            progress['points'][key] = {'status': 'failed'}
+        else:
+            counts['done'] += 1
+            value = sum(values) / len(values)
+            progress['points'][key] = {'status': 'done', 'throughput': value, 'metric': METRIC.get(p['rw'], ''),
+                                       'test': test_name(p)}
+            update_line(lines, line, value, args.threshold)
+        write_progress(progress_path, progress)
+
+    if state is not None:
+        cleanup_state(state, args, max(int(q['numjobs']) for q in points))
+    counts['seconds'] = time.perf_counter() - start
+    return progress, counts
+
+
+def write_summary(points, progress, path):
+    with open(path, 'w') as f:
+        f.write(','.join(DIMENSIONS) + ',status,metric,throughput\n')
+        for p in points:
+            rec = progress['points'].get(point_id(p), {'status': 'skipped'})
+            f.write(','.join(str(p[d]) for d in DIMENSIONS) +
+                    f",{rec['status']},{rec.get('metric', '')},{rec.get('throughput', '')}\n")
+
+
+def print_plateaus(points, progress, plateau):
+    """Для каждой линии — значение plateau, на котором достигнут максимум"""
+    best = {}
+    for p in points:
+        rec = progress['points'].get(point_id(p))
+        if rec is None or rec['status'] != 'done':
+            continue
+        line = line_key(p, plateau)
+        if line not in best or rec['throughput'] > best[line][1]:
+            best[line] = (p[plateau], rec['throughput'], rec['metric'])
+    print(f"\n=== Максимум по {plateau} ===")
+    others = [d for d in DIMENSIONS if d != plateau]
+    for line, (value, tp, metric) in best.items():
+        label = ' '.join(f'{d}={v}' for d, v in zip(others, line))
+        print(f"  {label}: {plateau}={value} ({tp:.1f} {UNITS.get(metric, '')})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Перебор параметров fio с остановкой по насыщению и продолжением')
+    parser.add_argument('results_dir')
+    parser.add_argument('--directory', default='.', help='каталог для файлов заданий baseline')
+    parser.add_argument('--frag-file', default=None, help='фрагментированный файл (fragment.py)')
+    parser.add_argument('--frag-extents', type=int, default=2000, help='экстентов, если файл надо создать')
+    parser.add_argument('--size', default='500M')
+    parser.add_argument('--states', nargs='+', default=['baseline'], choices=STATES)
+    parser.add_argument('--rw', nargs='+', default=['read', 'randread'])
+    parser.add_argument('--bs', nargs='+', default=['4K', '64K', '1M'])
+    parser.add_argument('--iodepth', nargs='+', type=int, default=[1, 4, 16, 32])
+    parser.add_argument('--numjobs', nargs='+', type=int, default=[1, 2, 4])
+    parser.add_argument('--plateau', default='iodepth', choices=('iodepth', 'numjobs', 'bs', 'none'))
+    parser.add_argument('--threshold', type=float, default=0.05, help='минимальный относительный прирост')
+    parser.add_argument('--patience', type=int, default=1, help='шагов без прироста до остановки')
+    parser.add_argument('--runs', type=int, default=1, help='прогонов каждой точки (_runN)')
+    parser.add_argument('--runtime', default=None, help='ограничение по времени на точку (30s, 2m)')
+    parser.add_argument('--engine', default='auto', choices=('auto', 'fio', 'loadgen'))
+    parser.add_argument('--restart', action='store_true', help='начать заново, не читая прогресс')
+    parser.add_argument('--dry-run', action='store_true', help='только показать план')
+    args = parser.parse_args()
+
+    if 'fragmented' in args.states and not args.frag_file:
+        parser.error('для состояния fragmented нужен --frag-file')
+    grid = {'state': args.states, 'rw': args.rw, 'bs': args.bs, 'iodepth': args.iodepth, 'numjobs': args.numjobs}
+    points = plan(grid, args.plateau)
+    print(f"Точек: {len(points)}, разметок файлов: {layouts(points)}, насыщение по: {args.plateau}")
+
+    if args.dry_run:
+        done = read_progress(os.path.join(args.results_dir, PROGRESS_NAME))['points']
+        for p in points:
+            mark = '✓' if done.get(point_id(p), {}).get('status') == 'done' else ' '
+            print(f"  {mark} {test_name(p)}")
+        return
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    try:
+        progress, counts = sweep(points, args)
+    except KeyboardInterrupt:
+        print(f"\nПрервано. Прогресс: {os.path.join(args.results_dir, PROGRESS_NAME)}; "
+              f"повторите команду, чтобы продолжить", file=sys.stderr)
+        sys.exit(130)
+
+    print(f"Выполнено {counts['done']}, ранее {counts['resumed']}, пропущено по насыщению {counts['skipped']}, "
+          f"с ошибками {counts['failed']} за {counts['seconds']:.0f} с")
+    if args.plateau != 'none':
+        print_plateaus(points, progress, args.plateau)
+    path = os.path.join(args.results_dir, SUMMARY_NAME)
+    write_summary(points, progress, path)
+    print(f"✓ Отчёт сохранён: {path}")
+
+
+if __name__ == '__main__':
+    main()